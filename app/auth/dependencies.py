@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime, timedelta
 from typing import Annotated, Dict, Any, Optional
 
@@ -9,10 +10,12 @@ from pydantic import BaseModel
 
 from app.config import settings
 from app.db.prisma_client import get_prisma
+from app.monitoring.tracing import traced
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="ai/auth/token", auto_error=False)
+logger = logging.getLogger(__name__)
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -47,6 +50,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, u
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm="HS256")
     return encoded_jwt
 
+@traced("auth")
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Get current user from JWT token - compatible with NestJS tokens
@@ -92,7 +96,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         )
         
     except JWTError as e:
-        print(f"JWT Error: {e}")
+        logger.warning(f"JWT Error: {e}")
         raise credentials_exception
     
     async with get_prisma() as prisma:
@@ -0,0 +1,181 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from app.monitoring.metrics import get_registry
+from app.state.store import InMemoryStore, StateStore
+
+# Admission control in front of the chat pipeline.
+# At most `max_concurrency` agent runs execute at once; the rest wait in a
+# bounded queue that is served round-robin across users, so one user firing
+# many requests cannot starve everybody else. Requests beyond a user's
+# in-flight limit, or arriving when the queue is full, are rejected right away
+# with a Retry-After estimate.
+# Global concurrency is per process (it protects this worker's CPU); per-user
+# in-flight counts live in the shared store so the limit holds across workers.
+
+registry = get_registry()
+
+queue_depth = registry.gauge("chat_admission_queue_depth", "Chat requests waiting for a slot")
+in_flight = registry.gauge("chat_admission_in_flight", "Chat requests currently running")
+waiting_users = registry.gauge("chat_admission_waiting_users", "Distinct users with queued chat requests")
+rejected = registry.counter("chat_admission_rejected_total", "Rejected chat requests", labelnames=("reason",))
+wait_seconds = registry.histogram(
+    "chat_admission_wait_seconds",
+    "Time chat requests spent queued before running",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0),
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; maps to HTTP 429"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Chat request rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per-user in-flight limits plus a global bounded, fair work queue"""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        per_user_limit: int = 2,
+        max_wait: float = 30.0,
+        min_retry_after: int = 1,
+        store: Optional[StateStore] = None,
+        user_slot_ttl: float = 300.0
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.per_user_limit = per_user_limit
+        self.max_wait = max_wait
+        self.min_retry_after = min_retry_after
+        self.store = store or InMemoryStore()
+        # Bounds how long a crashed worker can leak a user's in-flight count
+        self.user_slot_ttl = user_slot_ttl
+
+        self._running = 0
+        self._queued = 0
+        # user_id -> waiters, in round-robin order
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        # Exponentially weighted average run time, used for Retry-After
+        self._avg_run_seconds = 5.0
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a new request"""
+        estimate = self._avg_run_seconds * (self._queued + 1) / max(1, self.max_concurrency)
+        return max(self.min_retry_after, math.ceil(estimate))
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "running": self._running,
+            "queued": self._queued,
+            "waiting_users": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def _publish(self):
+        queue_depth.set(self._queued)
+        in_flight.set(self._running)
+        waiting_users.set(len(self._waiters))
+
+    def _reject(self, reason: str):
+        rejected.inc(reason=reason)
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _dispatch(self):
+        """Hand free slots to waiters, one user at a time in round-robin order"""
+        while self._running < self.max_concurrency and self._waiters:
+            user_id, waiters = next(iter(self._waiters.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(user_id)
+            else:
+                del self._waiters[user_id]
+            if waiter.done():
+                # Cancelled while queued
+                continue
+            self._queued -= 1
+            self._running += 1
+            waiter.set_result(None)
+        self._publish()
+
+    async def _acquire_user(self, user_id: str):
+        """Count the request against the user's running + queued limit"""
+        key = f"admission:user:{user_id}"
+        count = await self.store.incr(key, 1, ttl=self.user_slot_ttl)
+        if count > self.per_user_limit:
+            await self._release_user(user_id)
+            self._reject("user_limit")
+
+    async def _release_user(self, user_id: str):
+        key = f"admission:user:{user_id}"
+        if await self.store.incr(key, -1) <= 0:
+            await self.store.delete(key)
+
+    async def _wait_for_slot(self, user_id: str):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        self._publish()
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted right as we gave up: hand it back
+                self._running -= 1
+                self._dispatch()
+            else:
+                waiter.cancel()
+                self._queued -= 1
+                waiters = self._waiters.get(user_id)
+                if waiters is not None:
+                    try:
+                        waiters.remove(waiter)
+                    except ValueError:
+                        pass
+                    if not waiters:
+                        del self._waiters[user_id]
+                self._publish()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("queue_timeout")
+            raise
+        finally:
+            wait_seconds.observe(time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def admit(self, user_id: str):
+        """Hold a run slot for the duration of the block, queueing fairly if needed"""
+        if self._running >= self.max_concurrency and self._queued >= self.max_queue:
+            self._reject("queue_full")
+
+        await self._acquire_user(user_id)
+        try:
+            if self._running < self.max_concurrency and not self._waiters:
+                self._running += 1
+                self._publish()
+            else:
+                await self._wait_for_slot(user_id)
+        except BaseException:
+            await self._release_user(user_id)
+            raise
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * elapsed
+            self._running -= 1
+            self._dispatch()
+            await self._release_user(user_id)
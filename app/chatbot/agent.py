@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.tools import BaseTool, ToolOutput
+
+from app.chatbot.deadline import DeadlineExceeded, bounded_timeout, remaining, within_deadline
+from app.monitoring.metrics import get_registry
+from app.monitoring.tracing import span
+from app.resilience.breaker import CircuitBreaker, CircuitOpenError
+from app.resilience.dependencies import cut_off_calls, record_cut_off
+
+# Function-calling agent loop that runs all tool calls of a turn concurrently.
+# OpenAIAgent executes a turn's tool calls one after another, so one slow
+# dependency (Tavily, Weaviate) delays every other result. Here each call gets
+# its own timeout and circuit breaker; a call that times out, fails or hits an
+# open circuit returns a short error string in its place, so the model still
+# answers with whatever the other tools returned.
+# Under a request deadline (app.chatbot.deadline) tool timeouts shrink to the
+# remaining budget, and once only `answer_reserve` seconds are left the loop
+# stops calling tools and answers from the results gathered so far.
+
+logger = logging.getLogger(__name__)
+registry = get_registry()
+
+tool_calls_total = registry.counter(
+    "agent_tool_calls_total", "Agent tool calls by outcome", labelnames=("tool", "outcome")
+)
+
+DEFAULT_TOOL_TIMEOUT = 20.0
+
+
+def parse_tool_timeouts(spec: str) -> Dict[str, float]:
+    """Parse 'internet_search=12,events_tours=8' into {'internet_search': 12.0, 'events_tours': 8.0}"""
+    timeouts = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, seconds = part.split("=", 1)
+        timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_tool_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker per tool, so failures are remembered across requests"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(f"tool.{name}", failure_threshold=3, reset_timeout=30.0)
+    return _breakers[name]
+
+
+@dataclass
+class AgentResponse:
+    response: str
+    sources: List[ToolOutput] = field(default_factory=list)
+
+
+class ParallelToolAgent:
+    """Chat loop over an LLM that supports function calling (llama_index OpenAI)"""
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        llm,
+        system_prompt: Optional[str] = None,
+        max_iterations: int = 5,
+        tool_timeout: float = DEFAULT_TOOL_TIMEOUT,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        answer_reserve: float = 8.0
+    ):
+        self.tools = {tool.metadata.name: tool for tool in tools}
+        self.llm = llm
+        self.system_prompt = system_prompt
+        self.max_iterations = max_iterations
+        self.tool_timeout = tool_timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.answer_reserve = answer_reserve
+
+    def _timeout_for(self, name: str) -> float:
+        return self.tool_timeouts.get(name, self.tool_timeout)
+
+    def _out_of_budget(self) -> bool:
+        left = remaining()
+        return left is not None and left <= self.answer_reserve
+
+    async def _call_tool(self, tool_call) -> ToolOutput:
+        name = tool_call.tool_name
+        kwargs = tool_call.tool_kwargs or {}
+        tool = self.tools.get(name)
+        if tool is None:
+            tool_calls_total.inc(tool=name, outcome="unknown")
+            return ToolOutput(content=f"error: unknown tool {name}", tool_name=name, raw_input=kwargs, raw_output=None, is_error=True)
+
+        breaker = get_tool_breaker(name)
+        configured = self._timeout_for(name)
+        timeout = bounded_timeout(configured, reserve=self.answer_reserve)
+        started = time.perf_counter()
+        try:
+            if timeout <= 0:
+                raise DeadlineExceeded()
+            breaker.check()
+            with cut_off_calls() as cut_off:
+                output = await asyncio.wait_for(tool.acall(**kwargs), timeout=timeout)
+        except CircuitOpenError as e:
+            outcome, content = "circuit_open", f"error: {e}. Answer with the other tools' results."
+        except DeadlineExceeded:
+            outcome, content = "skipped", f"error: no time left to run {name}. Answer with the other tools' results."
+        except asyncio.TimeoutError:
+            # Only a timeout of the tool's own limit counts against it (and against the
+            # dependency calls it cut off), not one cut short by the deadline
+            if timeout >= configured:
+                breaker.record_failure()
+                record_cut_off(cut_off)
+            outcome, content = "timeout", f"error: {name} timed out after {timeout:.0f}s. Answer with the other tools' results."
+        except Exception as e:
+            breaker.record_failure()
+            logger.warning("Tool call failed", exc_info=True, extra={"fields": {"tool": name}})
+            outcome, content = "error", f"error: {name} failed ({type(e).__name__}). Answer with the other tools' results."
+        else:
+            breaker.record_success()
+            tool_calls_total.inc(tool=name, outcome="ok")
+            return output
+
+        tool_calls_total.inc(tool=name, outcome=outcome)
+        logger.info(
+            "Tool call degraded",
+            extra={"fields": {"tool": name, "outcome": outcome, "seconds": round(time.perf_counter() - started, 2)}}
+        )
+        return ToolOutput(content=content, tool_name=name, raw_input=kwargs, raw_output=None, is_error=True)
+
+    async def achat(self, message: str) -> AgentResponse:
+        history: List[ChatMessage] = []
+        if self.system_prompt:
+            history.append(ChatMessage(role=MessageRole.SYSTEM, content=self.system_prompt))
+        history.append(ChatMessage(role=MessageRole.USER, content=message))
+
+        tools = list(self.tools.values())
+        sources: List[ToolOutput] = []
+        for _ in range(self.max_iterations):
+            if self._out_of_budget():
+                break
+            try:
+                response = await within_deadline(
+                    self.llm.achat_with_tools(tools, chat_history=history, allow_parallel_tool_calls=True),
+                    reserve=self.answer_reserve,
+                )
+            except DeadlineExceeded:
+                break
+            tool_calls = self.llm.get_tool_calls_from_response(response, error_on_no_tool_call=False)
+            if not tool_calls:
+                return AgentResponse(response=response.message.content or "", sources=sources)
+
+            history.append(response.message)
+            with span("tool_calls", count=len(tool_calls)):
+                outputs = await asyncio.gather(*(self._call_tool(tool_call) for tool_call in tool_calls))
+            for tool_call, output in zip(tool_calls, outputs):
+                sources.append(output)
+                history.append(ChatMessage(
+                    role=MessageRole.TOOL,
+                    content=str(output.content),
+                    additional_kwargs={"tool_call_id": tool_call.tool_id, "name": tool_call.tool_name},
+                ))
+
+        # Out of tool rounds or time: answer from what has been gathered
+        logger.info("Agent answering without further tool calls", extra={"fields": {"tool_results": len(sources)}})
+        history.append(ChatMessage(
+            role=MessageRole.USER,
+            content="Answer the question now using the tool results above; do not call more tools.",
+        ))
+        response = await within_deadline(self.llm.achat(history))
+        return AgentResponse(response=response.message.content or "", sources=sources)
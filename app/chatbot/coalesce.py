@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import re
+import unicodedata
+from typing import Awaitable, Callable, Dict, Generic, Tuple, TypeVar
+
+from app.chatbot.tools.auto_retriever import normalize_query
+from app.monitoring.metrics import get_registry
+
+# Single-flight coalescing of identical chat questions.
+# During spikes (a festival announcement, a viral post) many users ask the same
+# thing within seconds. A question that needs nothing user-specific — no chat
+# history, no past conversations, no "my booking" — is answered once: the first
+# request runs the pipeline, identical requests arriving while it runs wait for
+# its result, and every request still persists the answer to its own session.
+# Coalescing is per process; with several workers each runs at most one copy.
+
+logger = logging.getLogger(__name__)
+registry = get_registry()
+
+coalesced_requests = registry.counter(
+    "chat_coalesced_total", "Chat answers by single-flight role", labelnames=("role",)
+)
+
+T = TypeVar("T")
+
+# Questions about the user's own data or earlier conversations can't be shared.
+# Matched on folded text, so casual typing without diacritics ("lan truoc ban goi y") counts too.
+PERSONAL_CUES = re.compile(
+    r"\b(?:cua toi|cua minh|cua em|toi da|minh da|em da|da dat|dat cho|lich cua|lich trinh cua"
+    r"|chuyen di cua|booking|lan truoc|hom truoc|hom qua|vua nay|ban da|ban vua|nhu tren|o tren"
+    r"|ten toi|ten minh|toi la ai)\b"
+    r"|\b(?:my|mine|i booked|i have booked|my booking|last time|earlier|you said|you suggested|above)\b"
+)
+
+
+def fold_text(text: str) -> str:
+    """Lowercase without diacritics ("Lần trước" -> "lan truoc"), for matching casual typing"""
+    text = unicodedata.normalize("NFD", (text or "").lower().replace("đ", "d"))
+    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    return " ".join(re.sub(r"[^\w\s]+", " ", text).split())
+
+
+def needs_personal_context(question: str) -> bool:
+    return bool(PERSONAL_CUES.search(fold_text(question)))
+
+
+def coalesce_key(question: str, personal: bool) -> str:
+    return f"{'personal' if personal else 'public'}:{normalize_query(question)}"
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """At most one in-flight run per key; concurrent callers share its result or exception"""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Run factory() for key, or join the run already in flight; returns (result, shared)"""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            # The run belongs to no single caller: it inherits the first caller's
+            # context (deadline included) and survives that caller going away
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        coalesced_requests.inc(role="follower" if shared else "leader")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller left (disconnected, timed out): nobody needs the answer
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -1,8 +1,12 @@
+import logging
 from typing import List, Dict, Optional, Any
 from datetime import datetime, date
+import asyncio
 import json
 from prisma.models import Trip, Event, Tour, Agency, Location, TripParticipants, SaveEvent
-from app.db.prisma_client import prisma
+from app.db.prisma_client import prisma, count_by
+
+logger = logging.getLogger(__name__)
 
 
 class ChatbotDatabaseService:
@@ -66,7 +70,7 @@ class ChatbotDatabaseService:
                 for trip in trips
             ]
         except Exception as e:
-            print(f"Error searching trips: {e}")
+            logger.error(f"Error searching trips: {e}")
             return []
     
     @staticmethod
@@ -80,8 +84,7 @@ class ChatbotDatabaseService:
                     }
                 },
                 include={
-                    "location": True,
-                    "participants": {"include": {"user": True}}
+                    "location": True
                 },
                 order_by={"startDate": "desc"}
             )
@@ -99,7 +102,7 @@ class ChatbotDatabaseService:
                 for trip in trips
             ]
         except Exception as e:
-            print(f"Error getting user trips: {e}")
+            logger.error(f"Error getting user trips: {e}")
             return []
     
     # ==================== EVENT FUNCTIONS ====================
@@ -159,7 +162,7 @@ class ChatbotDatabaseService:
                 for event in events
             ]
         except Exception as e:
-            print(f"Error searching events: {e}")
+            logger.error(f"Error searching events: {e}")
             return []
     
     @staticmethod
@@ -190,7 +193,7 @@ class ChatbotDatabaseService:
                 for se in saved_events
             ]
         except Exception as e:
-            print(f"Error getting saved events: {e}")
+            logger.error(f"Error getting saved events: {e}")
             return []
     
     # ==================== TOUR FUNCTIONS ====================
@@ -268,7 +271,7 @@ class ChatbotDatabaseService:
                 for tour in tours
             ]
         except Exception as e:
-            print(f"Error searching tours: {e}")
+            logger.error(f"Error searching tours: {e}")
             return []
     
     @staticmethod
@@ -279,14 +282,16 @@ class ChatbotDatabaseService:
                 where={"id": tour_id},
                 include={
                     "agency": True,
-                    "location": True,
-                    "bookings": True
+                    "location": True
                 }
             )
             
             if not tour:
                 return {}
             
+            # Bookings are only counted, never hydrated
+            booking_count = await prisma.tourbooking.count(where={"tourId": tour_id})
+            
             return {
                 "id": tour.id,
                 "title": tour.title,
@@ -294,8 +299,8 @@ class ChatbotDatabaseService:
                 "price": tour.price,
                 "duration": f"{tour.duration} days",
                 "max_capacity": tour.maxCapacity,
-                "current_bookings": len(tour.bookings),
-                "available_spots": tour.maxCapacity - len(tour.bookings),
+                "current_bookings": booking_count,
+                "available_spots": tour.maxCapacity - booking_count,
                 "images": tour.images,
                 "itinerary": json.loads(tour.itinerary) if tour.itinerary else None,
                 "includes": json.loads(tour.includes) if tour.includes else None,
@@ -311,7 +316,7 @@ class ChatbotDatabaseService:
                 "location": tour.location.name if tour.location else None
             }
         except Exception as e:
-            print(f"Error getting tour details: {e}")
+            logger.error(f"Error getting tour details: {e}")
             return {}
     
     # ==================== AGENCY FUNCTIONS ====================
@@ -340,6 +345,7 @@ class ChatbotDatabaseService:
                 take=limit,
                 order_by={"createdAt": "desc"}
             )
+            tour_counts = await count_by(prisma.tour, "agencyId", [agency.id for agency in agencies])
             
             return [
                 {
@@ -351,7 +357,7 @@ class ChatbotDatabaseService:
                     "phone": agency.phoneNumber,
                     "address": agency.address,
                     "logo": agency.logo,
-                    "tours_count": len(agency.tours),
+                    "tours_count": tour_counts.get(agency.id, 0),
                     "sample_tours": [
                         {
                             "id": tour.id,
@@ -364,7 +370,7 @@ class ChatbotDatabaseService:
                 for agency in agencies
             ]
         except Exception as e:
-            print(f"Error searching agencies: {e}")
+            logger.error(f"Error searching agencies: {e}")
             return []
     
     # ==================== GENERAL STATS FUNCTIONS ====================
@@ -394,7 +400,7 @@ class ChatbotDatabaseService:
                 "verification_rate": round((verified_agencies / total_agencies * 100), 2) if total_agencies > 0 else 0
             }
         except Exception as e:
-            print(f"Error getting statistics: {e}")
+            logger.error(f"Error getting statistics: {e}")
             return {}
     
     @staticmethod
@@ -403,24 +409,28 @@ class ChatbotDatabaseService:
         try:
             # This would require aggregation - simplified version
             locations = await prisma.location.find_many(
-                include={
-                    "trips": True,
-                    "tours": True,
-                    "events": {"include": {"event": True}}
-                },
                 take=limit
             )
+            location_ids = [location.id for location in locations]
+            trip_counts, tour_counts, event_counts = await asyncio.gather(
+                count_by(prisma.trip, "locationId", location_ids),
+                count_by(prisma.tour, "locationId", location_ids),
+                count_by(prisma.eventlocation, "locationId", location_ids),
+            )
             
             # Calculate popularity score
             popular_locations = []
             for location in locations:
-                score = len(location.trips) + len(location.tours) + len(location.events)
+                trips_count = trip_counts.get(location.id, 0)
+                tours_count = tour_counts.get(location.id, 0)
+                events_count = event_counts.get(location.id, 0)
+                score = trips_count + tours_count + events_count
                 if score > 0:
                     popular_locations.append({
                         "name": location.name,
-                        "trips_count": len(location.trips),
-                        "tours_count": len(location.tours),
-                        "events_count": len(location.events),
+                        "trips_count": trips_count,
+                        "tours_count": tours_count,
+                        "events_count": events_count,
                         "popularity_score": score
                     })
             
@@ -429,7 +439,7 @@ class ChatbotDatabaseService:
             return popular_locations[:limit]
             
         except Exception as e:
-            print(f"Error getting popular destinations: {e}")
+            logger.error(f"Error getting popular destinations: {e}")
             return []
 
 
@@ -1,32 +1,63 @@
+import logging
 from typing import List, Dict, Optional
 from datetime import datetime
 import pytz
 import warnings
 from prisma.models import Chat, User, TitleChat
 from app.db.prisma_client import prisma  # Import your prisma client
+from app.config import settings
+
+logger = logging.getLogger(__name__)
 
 warnings.filterwarnings("ignore", category=ResourceWarning)
 
 
-async def get_recent_chat_history(title_chat_id: str) -> List[dict]:
-    """Fetch the 5 most recent chat messages by title chat ID"""
+async def get_recent_chat_history(title_chat_id: str, limit: Optional[int] = None) -> List[dict]:
+    """Fetch the most recent chat messages (the prompt window) by title chat ID"""
     if not title_chat_id:
         return []
 
     try:
-        # Fetch only the 5 most recent chats, sorted descending
+        # Older turns are carried by the rolling summary, see get_conversation_summary
         chats = await prisma.chat.find_many(
             where={"titleChatId": title_chat_id},
             order={"createdAt": "desc"},
-            take=4
+            take=limit or settings.CHAT_HISTORY_WINDOW
         )
 
         # Return in chronological order
         return [chat.dict() for chat in reversed(chats)]
     except Exception as e:
-        print(f"Error fetching chat history: {e}")
+        logger.error(f"Error fetching chat history: {e}")
         return []
 
+async def get_conversation_summary(title_chat_id: str) -> str:
+    """Fetch the rolling summary of the turns older than the history window"""
+    if not title_chat_id:
+        return ""
+
+    try:
+        title_chat = await prisma.titlechat.find_unique(where={"id": title_chat_id})
+        return (title_chat.summary or "") if title_chat else ""
+    except Exception as e:
+        logger.error(f"Error fetching conversation summary: {e}")
+        return ""
+
+async def has_earlier_context(title_chat_id: str) -> bool:
+    """Whether the session has messages before the current question, or a summary of them"""
+    if not title_chat_id:
+        return False
+
+    try:
+        # The current question is already stored when the answer is generated
+        messages = await prisma.chat.count(where={"titleChatId": title_chat_id}, take=2)
+        if messages > 1:
+            return True
+        return bool(await get_conversation_summary(title_chat_id))
+    except Exception as e:
+        logger.error(f"Error checking chat context: {e}")
+        return True
+
 async def get_title_chat_with_messages(title_chat_id: str) -> Dict:
     """Fetch title chat with all its messages"""
     try:
@@ -42,7 +73,7 @@ async def get_title_chat_with_messages(title_chat_id: str) -> Dict:
         
         return title_chat.dict()
     except Exception as e:
-        print(f"Error fetching title chat: {e}")
+        logger.error(f"Error fetching title chat: {e}")
         return {}
 
 
@@ -79,7 +110,7 @@ async def get_user_info(user_id: str) -> dict:
             "updatedAt": user.updatedAt
         }
     except Exception as e:
-        print(f"Error fetching user info: {e}")
+        logger.error(f"Error fetching user info: {e}")
         return {}
 
 
@@ -92,7 +123,7 @@ async def get_user_by_email(email: str) -> dict:
         
         return user.dict()
     except Exception as e:
-        print(f"Error fetching user by email: {e}")
+        logger.error(f"Error fetching user by email: {e}")
         return {}
 
 
@@ -107,7 +138,7 @@ async def create_title_chat(user_id: str, title: str) -> Dict:
         )
         return title_chat.dict()
     except Exception as e:
-        print(f"Error creating title chat: {e}")
+        logger.error(f"Error creating title chat: {e}")
         return {}
 
 
@@ -128,7 +159,7 @@ async def create_chat_message(title_chat_id: str, role: str, content: str) -> Di
         )
         return chat.dict()
     except Exception as e:
-        print(f"Error creating chat message: {e}")
+        logger.error(f"Error creating chat message: {e}")
         return {}
 
 
@@ -143,7 +174,7 @@ async def get_user_title_chats(user_id: str, limit: int = 10) -> List[Dict]:
         )
         return [tc.dict() for tc in title_chats]
     except Exception as e:
-        print(f"Error fetching user title chats: {e}")
+        logger.error(f"Error fetching user title chats: {e}")
         return []
 
 
@@ -156,7 +187,7 @@ async def update_title_chat(title_chat_id: str, title: str) -> bool:
         )
         return True
     except Exception as e:
-        print(f"Error updating title chat: {e}")
+        logger.error(f"Error updating title chat: {e}")
         return False
 
 
@@ -171,7 +202,7 @@ async def delete_title_chat(title_chat_id: str, user_id: str) -> bool:
         )
         return True
     except Exception as e:
-        print(f"Error deleting title chat: {e}")
+        logger.error(f"Error deleting title chat: {e}")
         return False
 
 
@@ -210,6 +241,6 @@ async def get_chat_statistics(user_id: str) -> Dict:
             "assistant_messages": assistant_messages
         }
     except Exception as e:
-        print(f"Error getting chat statistics: {e}")
+        logger.error(f"Error getting chat statistics: {e}")
         return {}
 
@@ -0,0 +1,96 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.chatbot.executor import run_blocking
+from app.db.prisma_client import prisma
+from llm_integration.embedding_client import get_embed_model
+
+# Long-range conversational memory: every persisted Chat message is embedded
+# (in a background job, batched per turn) into the ChatEmbedding table, and the
+# agent can recall a user's own past messages by similarity. Vectors live in
+# Postgres through pgvector, so recall works without Weaviate.
+
+logger = logging.getLogger(__name__)
+
+EMBED_DIM = 768
+MEMORY_CONTENT_MAX_CHARS = 2000
+
+
+def _vector_literal(vector: List[float]) -> str:
+    """pgvector text input format, cast with ::vector in SQL"""
+    return "[" + ",".join(f"{value:.6f}" for value in vector) + "]"
+
+
+async def embed_chat_messages(chat_ids: List[str]) -> int:
+    """Embed the given messages (skipping already embedded ones); returns the number stored"""
+    if not chat_ids:
+        return 0
+
+    chats = await prisma.chat.find_many(
+        where={'id': {'in': chat_ids}, 'embedding': {'is': None}, 'titleChatId': {'not': None}},
+        include={'titleChat': True}
+    )
+    chats = [chat for chat in chats if chat.titleChat and chat.content and chat.content.strip()]
+    if not chats:
+        return 0
+
+    texts = [' '.join(chat.content.split())[:MEMORY_CONTENT_MAX_CHARS] for chat in chats]
+    # One batched forward pass for the whole turn, off the event loop
+    vectors = await run_blocking(get_embed_model().get_text_embedding_batch, texts)
+
+    rows = []
+    args = []
+    for chat, text, vector in zip(chats, texts, vectors):
+        base = len(args)
+        rows.append(
+            f"(${base + 1}, ${base + 2}, ${base + 3}, ${base + 4}::\"ChatRole\", ${base + 5}, ${base + 6}::vector, ${base + 7}::timestamp)"
+        )
+        args.extend([
+            chat.id, chat.titleChat.userId, chat.titleChatId, chat.role, text,
+            _vector_literal(vector), chat.createdAt.replace(tzinfo=None).isoformat(),
+        ])
+
+    stored = await prisma.execute_raw(
+        'INSERT INTO "ChatEmbedding" ("chatId", "userId", "titleChatId", "role", "content", "embedding", "createdAt") '
+        f'VALUES {", ".join(rows)} ON CONFLICT ("chatId") DO NOTHING',
+        *args
+    )
+    return stored
+
+
+async def search_chat_memory(
+    user_id: str,
+    query: str,
+    k: int = 5,
+    exclude_session_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    role: Optional[str] = None
+) -> List[Dict]:
+    """Top-k most similar past messages of one user, newest first on ties"""
+    if not user_id or not query:
+        return []
+
+    query_vector = await run_blocking(get_embed_model().get_query_embedding, query)
+
+    conditions = ['"userId" = $2']
+    args: list = [_vector_literal(query_vector), user_id]
+    if exclude_session_id:
+        args.append(exclude_session_id)
+        conditions.append(f'"titleChatId" IS DISTINCT FROM ${len(args)}')
+    if since:
+        args.append(since.replace(tzinfo=None).isoformat())
+        conditions.append(f'"createdAt" >= ${len(args)}::timestamp')
+    if role:
+        args.append(role.upper())
+        conditions.append(f'"role" = ${len(args)}::"ChatRole"')
+    args.append(k)
+
+    rows = await prisma.query_raw(
+        'SELECT "chatId", "titleChatId", "role", "content", "createdAt", '
+        '1 - ("embedding" <=> $1::vector) AS "score" '
+        f'FROM "ChatEmbedding" WHERE {" AND ".join(conditions)} '
+        f'ORDER BY "embedding" <=> $1::vector, "createdAt" DESC LIMIT ${len(args)}',
+        *args
+    )
+    return rows
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+# Request-wide time budget for the chat pipeline.
+# The router opens a deadline; every stage below it (query expansion, agent
+# rounds, tool calls) reads the remaining budget from this context variable and
+# shortens its own timeout, skips optional work, or stops calling tools and
+# answers with what it has. Tasks spawned by the request inherit the deadline.
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("chat_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out; maps to HTTP 504"""
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the answer was ready"""
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Run the block under a budget of `seconds` (never extending an outer deadline)"""
+    expires_at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(expires_at if outer is None else min(outer, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, None when no deadline is set"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def bounded_timeout(timeout: float, reserve: float = 0.0) -> float:
+    """`timeout`, shortened so the call ends `reserve` seconds before the deadline"""
+    left = remaining()
+    if left is None:
+        return timeout
+    return max(0.0, min(timeout, left - reserve))
+
+
+async def within_deadline(awaitable: Awaitable[T], reserve: float = 0.0) -> T:
+    """Await with whatever budget is left (minus reserve); raises DeadlineExceeded"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    budget = left - reserve
+    if budget <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("no time left in the request budget")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=budget)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"request budget exhausted after waiting {budget:.1f}s")
+
+
+async def cancel_on_disconnect(request, awaitable: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """
+    Await `awaitable` while watching the client connection.
+
+    If the client disconnects first, the work is cancelled (outstanding LLM and
+    tool tasks included) and ClientDisconnected is raised.
+    """
+    work = asyncio.ensure_future(awaitable)
+
+    async def watch():
+        while not await request.is_disconnected():
+            await asyncio.sleep(poll_interval)
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        done, _ = await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if work in done:
+            return work.result()
+        if watcher.exception() is not None:
+            # Can't tell whether the client is still there: just finish the work
+            logger.warning("Disconnect watcher failed", exc_info=watcher.exception())
+            return await work
+        work.cancel()
+        await asyncio.gather(work, return_exceptions=True)
+        raise ClientDisconnected()
+    finally:
+        watcher.cancel()
+        if not work.done():
+            work.cancel()
@@ -1,13 +1,23 @@
 import asyncio
 import uuid
-from typing import Dict, Any, List, Optional, AsyncGenerator
+from typing import Dict, Any, List, Optional, AsyncGenerator, Tuple
 from datetime import datetime, timedelta
 import logging
+import time
 
 
 
 # Import your existing get_answer function
-from app.chatbot.service import get_answer  # Update this import path
+from app.chatbot.service import get_answer, get_faq_answer  # Update this import path
+from app.chatbot.admission import AdmissionController
+from app.chatbot.coalesce import SingleFlight, coalesce_key
+from app.chatbot.database.chat_history_service import has_earlier_context
+from app.chatbot.deadline import DeadlineExceeded
+from app.chatbot.routing import FAQ, PERSONAL, RESEARCH, SMALL_TALK, RouteDecision, classify, route_stats, small_talk_reply
+from app.config import settings
+from app.resilience.breaker import CircuitOpenError
+from app.state.store import get_store
+from app.chatbot.tools.compact import collect_cards, expand_card_ids
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +29,29 @@ class ChatbotEngine:
     
     def __init__(self):
         """Initialize the ChatbotEngine"""
-        self.active_sessions = {}
+        # Session activity lives in the shared store so every worker sees it
+        self.store = get_store()
+        # Caps concurrent agent runs and queues the rest fairly across users
+        self.admission = AdmissionController(
+            max_concurrency=settings.CHAT_MAX_CONCURRENCY,
+            max_queue=settings.CHAT_MAX_QUEUE,
+            per_user_limit=settings.CHAT_PER_USER_INFLIGHT,
+            max_wait=settings.CHAT_MAX_QUEUE_WAIT_SECONDS,
+            store=self.store,
+        )
+        # Identical questions that need nothing user-specific share one agent run
+        self.single_flight = SingleFlight()
         logger.info("ChatbotEngine initialized")
     
+    def admit(self, user_id: str):
+        """
+        Reserve a run slot for a user's chat request
+        
+        Use as `async with engine.admit(user_id):` around the whole request so a
+        rejection (AdmissionRejected) happens before anything is persisted.
+        """
+        return self.admission.admit(user_id)
+    
     async def chat(
         self, 
         user_id: str, 
@@ -42,38 +72,78 @@ class ChatbotEngine:
             Dict[str, Any]: Response containing the answer and metadata
         """
         try:
-            print(f"Processing chat message from user {user_id} in session {session_id}")
-            # Call your existing get_answer function
-            response = await get_answer(
-                question=message,
-                chat_id=session_id,
-                user_id=user_id
-            )
+            logger.debug("Processing chat message", extra={"fields": {"user_id": user_id, "session_id": session_id}})
+            started = time.perf_counter()
+            # Small talk and general FAQs are answered without the tool-calling agent
+            decision = classify(message) if settings.CHAT_ROUTING_ENABLED else RouteDecision(RESEARCH)
+            # A follow-up ("còn visa thì sao?") leans on earlier turns, which only the agent sees
+            in_context = decision.route in (FAQ, RESEARCH) and await has_earlier_context(session_id)
+            if decision.route == FAQ and in_context:
+                decision = RouteDecision(RESEARCH, language=decision.language)
+            if decision.route == SMALL_TALK:
+                response, cards = small_talk_reply(decision), {}
+            elif decision.route == FAQ:
+                response, _ = await self.single_flight.do(
+                    f"faq:{coalesce_key(message, personal=False)}",
+                    lambda: get_faq_answer(message, decision.intent),
+                )
+                cards = {}
+            elif decision.route == PERSONAL or in_context:
+                response, cards = await self._answer(message, session_id, user_id)
+            else:
+                (response, cards), shared = await self.single_flight.do(
+                    coalesce_key(message, personal=False),
+                    lambda: self._answer(message, None, None, personal=False),
+                )
+                if shared:
+                    logger.info("Chat answer shared with an identical question", extra={"fields": {"user_id": user_id, "session_id": session_id}})
+            route_stats.record(decision.route, time.perf_counter() - started)
             
             # Track session activity
-            self.active_sessions[session_id] = {
-                'user_id': user_id,
-                'last_activity': datetime.now(),
-                'message_count': self.active_sessions.get(session_id, {}).get('message_count', 0) + 1
-            }
+            await self._track_session(session_id, user_id)
             
             # Return structured response
             return {
                 'response': response,
                 'session_id': session_id,
                 'sources': self._extract_sources(response),  # Optional: extract source information
+                'cards': expand_card_ids(response, cards),
                 'timestamp': datetime.now().isoformat(),
                 'metadata': {
                     'user_id': user_id,
                     'session_id': session_id,
+                    'route': decision.route,
                     'processing_time': None  # Could be added if you track timing
                 }
             }
             
+        except DeadlineExceeded:
+            logger.warning("Chat request ran out of time", extra={"fields": {"user_id": user_id, "session_id": session_id}})
+            raise
+        except CircuitOpenError:
+            logger.warning("Chat dependency unavailable", extra={"fields": {"user_id": user_id, "session_id": session_id}})
+            raise
         except Exception as e:
-            logger.error(f"Error in chat processing: {str(e)}")
+            logger.exception("Error in chat processing", extra={"fields": {"user_id": user_id, "session_id": session_id}})
             raise Exception(f"Failed to process chat message: {str(e)}")
     
+    async def _answer(
+        self,
+        message: str,
+        session_id: Optional[str],
+        user_id: Optional[str],
+        personal: bool = True
+    ) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+        """Run get_answer, collecting the full cards behind the short ids the database tool hands to the agent"""
+        with collect_cards() as cards:
+            response = await get_answer(
+                question=message,
+                chat_id=session_id,
+                user_id=user_id,
+                personal=personal
+            )
+        return response, cards
+    
     async def chat_stream(
         self, 
         user_id: str, 
@@ -121,7 +191,17 @@ class ChatbotEngine:
                 'timestamp': datetime.now().isoformat()
             }
     
-    def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def _track_session(self, session_id: str, user_id: str):
+        """Record session activity in the shared store; the TTL expires idle sessions"""
+        key = f"session:{session_id}"
+        info = await self.store.get_json(key) or {}
+        await self.store.set_json(key, {
+            'user_id': user_id,
+            'last_activity': datetime.now().isoformat(),
+            'message_count': info.get('message_count', 0) + 1
+        }, ttl=settings.CHAT_SESSION_TTL_SECONDS)
+    
+    async def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
         Get information about a specific session
         
@@ -131,9 +211,9 @@ class ChatbotEngine:
         Returns:
             Optional[Dict[str, Any]]: Session information or None if not found
         """
-        return self.active_sessions.get(session_id)
+        return await self.store.get_json(f"session:{session_id}")
     
-    def get_active_sessions(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+    async def get_active_sessions(self, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get active sessions, optionally filtered by user
         
@@ -143,32 +223,31 @@ class ChatbotEngine:
         Returns:
             Dict[str, Any]: Active sessions information
         """
-        if user_id:
-            return {
-                session_id: info 
-                for session_id, info in self.active_sessions.items() 
-                if info['user_id'] == user_id
-            }
-        return self.active_sessions.copy()
+        sessions = {}
+        for key in await self.store.keys("session:"):
+            info = await self.store.get_json(key)
+            if info and (not user_id or info['user_id'] == user_id):
+                sessions[key[len("session:"):]] = info
+        return sessions
     
-    def cleanup_inactive_sessions(self, max_age_hours: int = 24):
+    async def cleanup_inactive_sessions(self, max_age_hours: int = 24):
         """
         Clean up inactive sessions older than max_age_hours
         
+        Sessions also expire on their own after CHAT_SESSION_TTL_SECONDS.
+        
         Args:
             max_age_hours (int): Maximum age in hours before cleanup
         """
         cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
         
-        sessions_to_remove = [
-            session_id for session_id, info in self.active_sessions.items()
-            if info['last_activity'] < cutoff_time
-        ]
-        
-        for session_id in sessions_to_remove:
-            del self.active_sessions[session_id]
+        removed = 0
+        for session_id, info in (await self.get_active_sessions()).items():
+            if datetime.fromisoformat(info['last_activity']) < cutoff_time:
+                await self.store.delete(f"session:{session_id}")
+                removed += 1
             
-        logger.info(f"Cleaned up {len(sessions_to_remove)} inactive sessions")
+        logger.info(f"Cleaned up {removed} inactive sessions")
     
     def _extract_sources(self, response: str) -> Optional[List[Dict[str, Any]]]:
         """
@@ -211,7 +290,7 @@ class ChatbotEngine:
             
             return {
                 'status': 'healthy',
-                'active_sessions': len(self.active_sessions),
+                'active_sessions': len(await self.get_active_sessions()),
                 'timestamp': datetime.now().isoformat(),
                 'test_response_received': bool(test_response.get('response'))
             }
@@ -239,7 +318,7 @@ class AsyncChatbotEngine(ChatbotEngine):
         """Async context manager exit"""
         logger.info("Exiting ChatbotEngine context")
         # Cleanup resources if needed
-        self.cleanup_inactive_sessions()
+        await self.cleanup_inactive_sessions()
 
 
 # Factory function for easy instantiation
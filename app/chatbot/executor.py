@@ -0,0 +1,25 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+
+# Dedicated pool for blocking work on the chat path (local embedding model,
+# sync vector store client). Keeping it separate from the loop's default
+# executor bounds how many CPU-heavy calls run at once and keeps them from
+# starving unrelated to_thread users.
+
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_EXECUTOR_WORKERS,
+    thread_name_prefix="chat-blocking",
+)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking callable on the chat executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    # Copy the context so tracing spans opened inside nest under the caller
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(blocking_executor, call)
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from prisma.errors import UniqueViolationError
+
+from app.chatbot.deadline import cancel_on_disconnect
+from app.config import settings
+from app.db.prisma_client import prisma
+from app.jobs.queue import enqueue, register_job
+from app.monitoring.metrics import get_registry
+
+# Idempotency keys for POST /chatbot/chat.
+# Mobile clients retry on flaky networks; without a key every retry stores
+# another user message and runs the agent again. With an `Idempotency-Key`
+# header the first request claims the key (a ChatIdempotencyKey row) and its
+# run is detached from the connection, so a dropped client doesn't cancel it.
+# A retry with the same key then
+#   - replays the stored response once the run has completed,
+#   - attaches to the run while it is still going (awaited in this process,
+#     polled from the table when another worker owns it).
+# A failed run releases its key so the next retry computes afresh; the run has
+# already deleted the question and the new session it stored (see
+# router.process_chat_message), so the retry doesn't duplicate them. Keys expire
+# after IDEMPOTENCY_TTL_SECONDS and are deleted by the idempotency_sweep job, which
+# runs once per IDEMPOTENCY_SWEEP_SECONDS period: each period's job carries a
+# dedupe key, so however many worker processes schedule it, one row exists.
+
+logger = logging.getLogger(__name__)
+registry = get_registry()
+
+idempotent_requests = registry.counter(
+    "chat_idempotency_total", "Chat requests carrying an Idempotency-Key", labelnames=("outcome",)
+)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request; maps to HTTP 422"""
+
+
+class IdempotencyInProgress(Exception):
+    """The run owning the key is still going elsewhere and didn't finish in time; maps to HTTP 409"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def request_fingerprint(message: str, session_id: Optional[str]) -> str:
+    return hashlib.sha256(json.dumps([message, session_id], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# Runs owned by this process, so retries landing here await them directly
+_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+def _abandoned(row) -> bool:
+    """IN_PROGRESS for longer than any run may take: its process died mid-run"""
+    stale_after = timedelta(seconds=settings.CHAT_DEADLINE_SECONDS * 2)
+    return row.status == 'IN_PROGRESS' and row.updatedAt < _utcnow() - stale_after
+
+
+async def _claim(user_id: str, key: str, fingerprint: str):
+    """Create the key row; returns None when claimed, else the existing (live) row"""
+    while True:
+        try:
+            await prisma.chatidempotencykey.create(data={
+                'userId': user_id,
+                'key': key,
+                'requestHash': fingerprint,
+                'expiresAt': _utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+            })
+            return None
+        except UniqueViolationError:
+            pass
+
+        existing = await prisma.chatidempotencykey.find_unique(where={'userId_key': {'userId': user_id, 'key': key}})
+        if existing is None:
+            continue  # released (failed run) or swept meanwhile
+        if existing.expiresAt <= _utcnow() or _abandoned(existing):
+            await prisma.chatidempotencykey.delete_many(
+                where={'userId': user_id, 'key': key, 'updatedAt': existing.updatedAt}
+            )
+            continue
+        if existing.requestHash != fingerprint:
+            raise IdempotencyKeyReused(key)
+        return existing
+
+
+async def _execute(user_id: str, key: str, run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    try:
+        result = await run()
+        await prisma.chatidempotencykey.update_many(
+            where={'userId': user_id, 'key': key},
+            data={'status': 'COMPLETED', 'response': json.dumps(result, ensure_ascii=False, default=str)},
+        )
+        return result
+    except BaseException:
+        # Nothing was stored: let the next retry compute again
+        await prisma.chatidempotencykey.delete_many(where={'userId': user_id, 'key': key, 'status': 'IN_PROGRESS'})
+        raise
+    finally:
+        _inflight.pop((user_id, key), None)
+
+
+def _retrieve_outcome(task: asyncio.Task):
+    """The run outlives its caller: read its exception so a failure after a disconnect is logged once"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(
+            "Idempotent chat run failed",
+            exc_info=task.exception(),
+            extra={"fields": {"error": type(task.exception()).__name__}}
+        )
+
+
+async def _wait_for_other_worker(user_id: str, key: str) -> Dict[str, Any]:
+    """Poll the row of a run owned by another process until it completes or is released"""
+    give_up_at = asyncio.get_running_loop().time() + settings.CHAT_DEADLINE_SECONDS
+    while asyncio.get_running_loop().time() < give_up_at:
+        await asyncio.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+        row = await prisma.chatidempotencykey.find_unique(where={'userId_key': {'userId': user_id, 'key': key}})
+        if row is None:
+            raise IdempotencyInProgress(key)  # the run failed; a new retry will compute it
+        if row.status == 'COMPLETED':
+            return json.loads(row.response)
+    raise IdempotencyInProgress(key)
+
+
+async def run_idempotent(
+    user_id: str,
+    key: str,
+    fingerprint: str,
+    run: Callable[[], Awaitable[Dict[str, Any]]],
+    request=None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Run `run()` at most once per (user, key); returns (response, replayed).
+
+    `run` must not watch the client connection itself: it keeps going when the
+    client disconnects, only this caller's wait is cancelled.
+    """
+    existing = await _claim(user_id, key, fingerprint)
+    if existing is not None and existing.status == 'COMPLETED':
+        idempotent_requests.inc(outcome="replayed")
+        return json.loads(existing.response), True
+
+    if existing is None:
+        idempotent_requests.inc(outcome="executed")
+        task = asyncio.ensure_future(_execute(user_id, key, run))
+        task.add_done_callback(_retrieve_outcome)
+        _inflight[(user_id, key)] = task
+    else:
+        idempotent_requests.inc(outcome="attached")
+        task = _inflight.get((user_id, key))
+        if task is None:
+            waiter = _wait_for_other_worker(user_id, key)
+            return (await cancel_on_disconnect(request, waiter) if request else await waiter), True
+
+    waiter = asyncio.shield(task)
+    return (await cancel_on_disconnect(request, waiter) if request else await waiter), existing is not None
+
+
+def _sweep_period(at: datetime) -> int:
+    return int(at.timestamp() // settings.IDEMPOTENCY_SWEEP_SECONDS)
+
+
+async def _schedule_sweep(period: int):
+    """Enqueue the sweep of one period, due at its start; a no-op when it already exists"""
+    due_in = period * settings.IDEMPOTENCY_SWEEP_SECONDS - _utcnow().timestamp()
+    await enqueue(
+        "idempotency_sweep", {'period': period}, delay=max(0.0, due_in), dedupe_key=f"idempotency_sweep:{period}"
+    )
+
+
+@register_job("idempotency_sweep")
+async def sweep_idempotency_keys_job(payload: Dict[str, Any]):
+    """Schedule the next period's sweep, then delete expired idempotency keys"""
+    # Scheduled first, so a sweep that fails for good doesn't end the chain
+    await _schedule_sweep(payload.get('period', _sweep_period(_utcnow())) + 1)
+    deleted = await prisma.chatidempotencykey.delete_many(where={'expiresAt': {'lt': _utcnow()}})
+    logger.info("Idempotency keys swept", extra={"fields": {"deleted": deleted}})
+
+
+async def schedule_idempotency_sweep():
+    """Make sure this period's and the next period's sweeps exist (called at startup by every worker)"""
+    period = _sweep_period(_utcnow())
+    await _schedule_sweep(period)
+    await _schedule_sweep(period + 1)
@@ -0,0 +1,117 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from llama_index.core import PromptTemplate
+
+from app.chatbot.database.chat_memory_service import embed_chat_messages
+from app.chatbot.prompts.summary import summary_prompt
+from app.chatbot.prompts.title import title_prompt
+from app.config import settings
+from app.db.prisma_client import prisma
+from app.jobs.queue import register_job
+from llm_integration.openai_client import get_llmTitle
+
+# Post-processing that runs after a chat reply has been sent (see app.jobs.queue)
+
+logger = logging.getLogger(__name__)
+
+TITLE_MAX_CHARS = 80
+SUMMARY_MESSAGE_MAX_CHARS = 1500
+
+
+def clean_title(text: str) -> str:
+    """Normalise an LLM title: one line, no wrapping quotes or trailing period"""
+    title = ' '.join((text or '').split()).strip().strip('"\'“”').rstrip('.').strip()
+    return title[:TITLE_MAX_CHARS]
+
+
+@register_job("chat_title")
+async def generate_chat_title_job(payload: Dict[str, Any]):
+    """Replace the placeholder title of a new session with an LLM-written one"""
+    prompt = PromptTemplate(title_prompt())
+    response = await get_llmTitle().apredict(
+        prompt,
+        question=payload['question'][:1000],
+        answer=payload.get('answer', '')[:1000],
+    )
+    title = clean_title(response)
+    if not title:
+        return
+
+    # Only overwrite the placeholder, never a title the user renamed meanwhile
+    updated = await prisma.titlechat.update_many(
+        where={'id': payload['session_id'], 'title': payload['placeholder']},
+        data={'title': title}
+    )
+    logger.debug("Chat title generated", extra={"fields": {"session_id": payload['session_id'], "updated": updated}})
+
+
+@register_job("chat_volume")
+async def record_chat_volume_job(payload: Dict[str, Any]):
+    """
+    Recount one day's sessions and messages for the dashboard.
+
+    The counters are derived from the TitleChat and Chat rows rather than
+    incremented, so a retried or duplicated job cannot count a turn twice.
+    """
+    day = datetime.fromisoformat(payload['date']).replace(tzinfo=timezone.utc)
+    created = {'createdAt': {'gte': day, 'lt': day + timedelta(days=1)}}
+    sessions = await prisma.titlechat.count(where=created)
+    messages = await prisma.chat.count(where=created)
+    await prisma.chatdailystat.upsert(
+        where={'date': day},
+        data={
+            'create': {'date': day, 'sessions': sessions, 'messages': messages},
+            'update': {'sessions': sessions, 'messages': messages},
+        }
+    )
+
+
+@register_job("chat_summary")
+async def summarize_chat_job(payload: Dict[str, Any]):
+    """Fold the messages that left the prompt window into the session's rolling summary"""
+    session_id = payload['session_id']
+    title_chat = await prisma.titlechat.find_unique(where={'id': session_id})
+    if not title_chat:
+        return
+
+    where = {'titleChatId': session_id}
+    if title_chat.summarizedUntil:
+        where['createdAt'] = {'gt': title_chat.summarizedUntil}
+    pending = await prisma.chat.find_many(where=where, order={'createdAt': 'asc'})
+
+    # The newest messages are sent verbatim, only what falls out of the window is summarized.
+    # The next question takes one window slot, so keep WINDOW - 1 messages out of the summary.
+    keep = max(settings.CHAT_HISTORY_WINDOW - 1, 0)
+    delta = pending[:-keep] if keep else pending
+    if not delta:
+        return
+
+    messages = "\n".join(
+        f"{'customer' if chat.role == 'USER' else 'assistant'}: {' '.join(chat.content.split())[:SUMMARY_MESSAGE_MAX_CHARS]}"
+        for chat in delta
+    )
+    summary = await get_llmTitle().apredict(
+        PromptTemplate(summary_prompt()),
+        summary=title_chat.summary or "(none)",
+        messages=messages,
+        max_words=settings.CHAT_SUMMARY_MAX_WORDS,
+    )
+
+    # Conditional on the previous watermark so a concurrent run cannot fold the same delta twice
+    updated = await prisma.titlechat.update_many(
+        where={'id': session_id, 'summarizedUntil': title_chat.summarizedUntil},
+        data={'summary': summary.strip(), 'summarizedUntil': delta[-1].createdAt}
+    )
+    logger.debug(
+        "Conversation summary updated",
+        extra={"fields": {"session_id": session_id, "folded_messages": len(delta), "updated": updated}}
+    )
+
+
+@register_job("chat_embed")
+async def embed_chat_job(payload: Dict[str, Any]):
+    """Add a turn's messages to the user's conversational memory index"""
+    stored = await embed_chat_messages(payload['chat_ids'])
+    logger.debug("Chat messages embedded", extra={"fields": {"count": stored}})
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+import pytz
+
+from app.chatbot.prompts.system import system_prompt
+from app.chatbot.prompts.template import prompt_instructions, prompt_template
+from app.config import settings
+from app.monitoring.metrics import get_registry
+
+# Prompt layout for OpenAI's automatic prompt caching.
+# The provider caches the longest previously seen request prefix (tool schemas,
+# then messages), so the agent request is assembled as
+#   static prefix:  tool schemas | system prompt + message-format instructions
+#   volatile tail:  one user message with date/time, summary, history,
+#                   customer info, similar questions and the question
+# Nothing that changes per request, per user or per process (the clock
+# included) may appear in the prefix. prefix_monitor fingerprints the prefix of
+# every request and warns when it drifts; test/test_prompt_assembly.py checks it
+# against the live tool set.
+
+logger = logging.getLogger(__name__)
+registry = get_registry()
+
+prefix_variants = registry.gauge(
+    "prompt_prefix_variants", "Distinct static prompt prefixes seen by this process"
+)
+
+def local_now() -> datetime:
+    return datetime.now(pytz.timezone(settings.TIMEZONE))
+
+
+@lru_cache(maxsize=1)
+def static_system_prompt() -> str:
+    """System prompt plus the message-format instructions, built once per process"""
+    return system_prompt().rstrip() + "\n" + prompt_instructions()
+
+
+@dataclass
+class VolatileContext:
+    question: str
+    conversation_summary: str = ""
+    history: Any = field(default_factory=list)
+    user_info: Any = field(default_factory=dict)
+    similar_questions: List[str] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)  # extra sections before the question, e.g. unavailable tools
+    now: Optional[datetime] = None
+
+
+def render_user_message(context: VolatileContext) -> str:
+    """The per-request tail: everything that changes between requests, question last"""
+    now = context.now or local_now()
+    message = prompt_template().format(
+        current_datetime=now.strftime("%A %Y-%m-%d %H:%M") + f" ({settings.TIMEZONE})",
+        conversation_summary=context.conversation_summary,
+        formatted_history=str(context.history),
+        formatted_user=str(context.user_info),
+        similar_question="\n".join(context.similar_questions),
+        notes="".join(note + "\n----------------------------------------\n" for note in context.notes),
+        question=context.question,
+    )
+    return message
+
+
+def tool_schemas(tools: Sequence) -> List[Dict[str, Any]]:
+    return [tool.metadata.to_openai_tool() for tool in tools]
+
+
+def prefix_fingerprint(tools: Sequence, system: Optional[str] = None) -> str:
+    """sha256 of the cacheable prefix: tool schemas and system prompt, byte for byte"""
+    payload = json.dumps(tool_schemas(tools), ensure_ascii=False, sort_keys=True)
+    payload += "\n" + (system if system is not None else static_system_prompt())
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PrefixMonitor:
+    """Counts distinct prefixes per tool set; a second one for the same tools means the prefix drifted"""
+
+    def __init__(self):
+        self._seen: Dict[tuple, str] = {}
+        self._variants = set()
+        self._lock = threading.Lock()
+
+    def observe(self, tools: Sequence) -> str:
+        names = tuple(tool.metadata.name for tool in tools)
+        fingerprint = prefix_fingerprint(tools)
+        with self._lock:
+            previous = self._seen.get(names)
+            self._seen[names] = fingerprint
+            self._variants.add(fingerprint)
+            variants = len(self._variants)
+        prefix_variants.set(variants)
+        if previous is not None and previous != fingerprint:
+            logger.warning("Static prompt prefix changed", extra={"fields": {"tools": list(names)}})
+        return fingerprint
+
+
+prefix_monitor = PrefixMonitor()
+
@@ -0,0 +1,13 @@
+def summary_prompt() -> str:
+    template = """
+    You maintain a running summary of a travel chat between a customer and Vonder, a Vietnam tourism assistant.
+    Update the existing summary with the new messages. Keep facts that matter for later turns: destinations, dates, budget,
+    number of travellers, preferences, and the tours, events or places that were recommended (keep their names and ids such as [TO1]).
+    Drop greetings and small talk. Write in the customer's language, at most {max_words} words, as short bullet points.
+    Existing summary:
+    {summary}
+    New messages:
+    {messages}
+    Updated summary:
+    """
+    return template
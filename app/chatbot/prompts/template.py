@@ -1,23 +1,41 @@
+def prompt_instructions():
+    """How to read the customer message; static, appended to the system prompt"""
+    instructions = """
+### Customer Message Format:
+Each customer message is laid out in these sections, separated by lines of dashes:
+- Current Date and Time: today's date and the local time in Vietnam; use it for "today", "this weekend", upcoming plans.
+- Conversation Summary: summary of the earlier part of this conversation (blank for new conversations).
+- Chat History: the most recent messages between you and the customer.
+- Customer Information: the available information about the customer (blank if none).
+  Do not use the customer's personal information in your response unless the customer explicitly requests it.
+- Similar Questions: four rephrasings of the question to help you answer more accurately (may be blank).
+- Customer Question: the question the customer just entered (it may contain spelling or grammatical errors). Answer this question.
+"""
+
+    return instructions
+
+
 def prompt_template():
     template = """
 ----------------------------------------
+### Current Date and Time:
+{current_datetime}
+----------------------------------------
+### Conversation Summary:
+{conversation_summary}
+----------------------------------------
 ### Chat History:
-Below is the previous chat history between you and the customer:
 {formatted_history}
 ----------------------------------------
 ### Customer Information:
-Below is the available information about the customer (if none, this section will be blank):
 {formatted_user}
-**Note:** Do not use the customer's personal information in your response unless the customer explicitly requests it.
-----------------------------------------
-### Customer Question:
-This is the question the customer just entered (it may contain spelling or grammatical errors):
-{question}
 ----------------------------------------
 ### Similar Questions:
-Four similar questions are listed to help you answer more accurately:
 {similar_question}
 ----------------------------------------
+{notes}### Customer Question:
+{question}
+----------------------------------------
 ### Answer: 
 """
 
@@ -0,0 +1,10 @@
+def title_prompt() -> str:
+    template = """
+    You write short titles for travel chat conversations.
+    Write a title of at most 6 words that captures what the customer is asking about, in the same language as the customer.
+    Do not use quotes, emojis or a trailing period. Return only the title.
+    Customer message: {question}
+    Assistant answer: {answer}
+    Title:
+    """
+    return template
@@ -1,11 +1,24 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from app.auth.dependencies import get_current_user
 from app.chatbot.engine import ChatbotEngine
+from app.chatbot.admission import AdmissionRejected
+from app.chatbot.idempotency import (
+    IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, IdempotencyInProgress, IdempotencyKeyReused,
+    request_fingerprint, run_idempotent,
+)
+from app.chatbot.deadline import ClientDisconnected, DeadlineExceeded, cancel_on_disconnect, deadline
+from app.config import settings
+from app.resilience.breaker import CircuitOpenError
+from app.monitoring.tracing import span
+from app.jobs.queue import enqueue_many
 from fastapi.requests import Request
+from fastapi.responses import Response
 import logging
+import time
 
 router = APIRouter(prefix="/chatbot", tags=["chatbot"])
 # Set up logging for debugging
@@ -25,6 +38,7 @@ class ChatResponse(BaseModel):
     response: str
     sessionId: str
     sources: Optional[List[Dict[str, Any]]] = None
+    cards: Optional[List[Dict[str, Any]]] = None
 
 class ChatHistoryItem(BaseModel):
     id: str
@@ -73,108 +87,226 @@ def generate_chat_title(message: str) -> str:
         title += '...'
     return title if title else 'New Chat'
 
+async def discard_unanswered_turn(prisma, user_message_id: str, new_session_id: Optional[str]):
+    """Delete what a turn stored before its run: the question, and the session if the turn created it"""
+    try:
+        if new_session_id:
+            # Its messages go with it (onDelete: Cascade)
+            await prisma.titlechat.delete_many(where={'id': new_session_id})
+        else:
+            await prisma.chat.delete_many(where={'id': user_message_id})
+    except Exception:
+        logger.exception("Failed to discard an unanswered chat turn", extra={"fields": {"session_id": new_session_id}})
+
+async def process_chat_message(
+    current_user: Dict[str, Any],
+    message_content: str,
+    session_id: Optional[str],
+    received_at: float,
+    request_body: Optional[Request] = None
+) -> ChatResponse:
+    """
+    Store the question, answer it and store the answer
+
+    The run is cancelled when `request_body`'s client disconnects; pass None to
+    let it finish regardless (idempotent requests, whose retries pick it up).
+    """
+    from app.db.prisma_client import get_prisma 
+    async with chatbot_engine.admit(current_user['id']), get_prisma() as prisma: 
+        title_chat_id = session_id 
+        placeholder_title = None
+         
+        # If no sessionId provided, create a new chat session 
+        if not session_id: 
+            placeholder_title = generate_chat_title(message_content)
+            new_title_chat = await prisma.titlechat.create( 
+                data={ 
+                    'title': placeholder_title, 
+                    'userId': current_user['id']  # Use dict access, not attribute
+                } 
+            ) 
+            title_chat_id = new_title_chat.id 
+            logger.debug("Created new chat session", extra={"fields": {"session_id": title_chat_id}})
+        else: 
+            # Verify the session belongs to the user 
+            existing_title_chat = await prisma.titlechat.find_first( 
+                where={ 
+                    'id': session_id, 
+                    'userId': current_user['id']  # Use dict access, not attribute
+                } 
+            ) 
+             
+            if not existing_title_chat: 
+                raise HTTPException( 
+                    status_code=status.HTTP_404_NOT_FOUND, 
+                    detail="Chat session not found or access denied" 
+                ) 
+         
+        # Save user message 
+        with span("persistence"):
+            user_message = await prisma.chat.create( 
+                data={ 
+                    'role': 'USER', 
+                    'content': message_content, 
+                    'titleChatId': title_chat_id 
+                } 
+            ) 
+         
+        try:
+            # Generate AI response using chatbot engine, within what is left of the
+            # request budget and cancelled as soon as the client goes away (if watched)
+            with deadline(settings.CHAT_DEADLINE_SECONDS - (time.monotonic() - received_at)):
+                answer = chatbot_engine.chat( 
+                    current_user['id'],  # Pass the resolved user object
+                    message_content,  # Use the extracted message content
+                    session_id=title_chat_id 
+                )
+                response_data = await (cancel_on_disconnect(request_body, answer) if request_body else answer)
+
+            with span("persistence"):
+                # Save AI response 
+                ai_message = await prisma.chat.create( 
+                    data={ 
+                        'role': 'ASSISTANT', 
+                        'content': response_data["response"], 
+                        'titleChatId': title_chat_id 
+                    } 
+                ) 
+        except BaseException:
+            # A turn is stored whole or not at all: a failed run (504, 503, 500) or one
+            # cancelled because the client left must not leave an unanswered question, or
+            # a new empty session, behind (the next question would read as a follow-up).
+            # Shielded so the cleanup finishes even when this task is being cancelled.
+            await asyncio.shield(
+                discard_unanswered_turn(prisma, user_message.id, title_chat_id if placeholder_title else None)
+            )
+            raise
+             
+        with span("persistence"):
+            # Update the TitleChat updatedAt timestamp 
+            await prisma.titlechat.update( 
+                where={'id': title_chat_id}, 
+                data={'updatedAt': datetime.now()} 
+            ) 
+
+        # Title generation, summaries, memory embeddings and counters run after the reply is sent
+        jobs = [
+            ('chat_volume', {'date': datetime.utcnow().date().isoformat()}),
+            ('chat_embed', {'chat_ids': [user_message.id, ai_message.id]}),
+        ]
+        if placeholder_title:
+            jobs.append(('chat_title', {
+                'session_id': title_chat_id,
+                'placeholder': placeholder_title,
+                'question': message_content,
+                'answer': response_data["response"],
+            }))
+        else:
+            # Older turns roll into the session summary once they leave the history window
+            jobs.append(('chat_summary', {'session_id': title_chat_id}))
+        await enqueue_many(jobs)
+         
+        return ChatResponse( 
+            id=ai_message.id, 
+            response=response_data["response"], 
+            sessionId=title_chat_id, 
+            sources=response_data.get("sources"),
+            cards=response_data.get("cards") or None
+        )
+
 # ---------- Endpoints ----------
 @router.post("/chat", response_model=ChatResponse) 
 async def send_chat_message(
     request_body: Request,
+    response: Response,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ): 
+    received_at = time.monotonic()
     # Parse the request body properly
     raw_data = await request_body.json()
-    print(f"Raw request data: {raw_data}")
     
     # Extract the nested message data
     message_data = raw_data.get('message', {})
     message_content = message_data.get('message', '')
     session_id = message_data.get('sessionId')  # This might be None
     
-    print(f"Received message: {message_content}")
-    print(f"Session ID: {session_id}")
-    
     """Send a chat message and get AI response""" 
-    from app.db.prisma_client import get_prisma 
-    print(f"Current user: {current_user}")
+    logger.info(
+        "Chat message received",
+        extra={"fields": {"user_id": current_user['id'], "session_id": session_id, "message": message_content}}
+    )
     
     if not message_content:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Message content is required"
         )
+
+    idempotency_key = request_body.headers.get(IDEMPOTENCY_HEADER)
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+        )
     
     try: 
-        async with get_prisma() as prisma: 
-            title_chat_id = session_id 
-             
-            # If no sessionId provided, create a new chat session 
-            if not session_id: 
-                print("No sessionId provided, creating a new chat session")
-                new_title_chat = await prisma.titlechat.create( 
-                    data={ 
-                        'title': generate_chat_title(message_content), 
-                        'userId': current_user['id']  # Use dict access, not attribute
-                    } 
-                ) 
-                title_chat_id = new_title_chat.id 
-                print(f"Created new chat session with ID: {title_chat_id}")
-            else: 
-                # Verify the session belongs to the user 
-                existing_title_chat = await prisma.titlechat.find_first( 
-                    where={ 
-                        'id': session_id, 
-                        'userId': current_user['id']  # Use dict access, not attribute
-                    } 
-                ) 
-                 
-                if not existing_title_chat: 
-                    raise HTTPException( 
-                        status_code=status.HTTP_404_NOT_FOUND, 
-                        detail="Chat session not found or access denied" 
-                    ) 
-                print(f"Using existing chat session with ID: {title_chat_id}")
-             
-            # Save user message 
-            user_message = await prisma.chat.create( 
-                data={ 
-                    'role': 'USER', 
-                    'content': message_content, 
-                    'titleChatId': title_chat_id 
-                } 
-            ) 
-             
-            # Generate AI response using chatbot engine 
-            response_data = await chatbot_engine.chat( 
-                current_user['id'],  # Pass the resolved user object
-                message_content,  # Use the extracted message content
-                session_id=title_chat_id 
-            ) 
-             
-            # Save AI response 
-            ai_message = await prisma.chat.create( 
-                data={ 
-                    'role': 'ASSISTANT', 
-                    'content': response_data["response"], 
-                    'titleChatId': title_chat_id 
-                } 
-            ) 
-             
-            # Update the TitleChat updatedAt timestamp 
-            await prisma.titlechat.update( 
-                where={'id': title_chat_id}, 
-                data={'updatedAt': datetime.now()} 
-            ) 
-             
-            return ChatResponse( 
-                id=ai_message.id, 
-                response=response_data["response"], 
-                sessionId=title_chat_id, 
-                sources=response_data.get("sources") 
-            ) 
+        if idempotency_key:
+            async def run():
+                chat_response = await process_chat_message(current_user, message_content, session_id, received_at)
+                return chat_response.model_dump(mode="json")
+
+            # A retry with the same key replays the stored response or waits for the running one
+            response_data, replayed = await run_idempotent(
+                current_user['id'],
+                idempotency_key,
+                request_fingerprint(message_content, session_id),
+                run,
+                request=request_body,
+            )
+            if replayed:
+                response.headers["Idempotent-Replayed"] = "true"
+            return ChatResponse(**response_data)
+
+        return await process_chat_message(current_user, message_content, session_id, received_at, request_body)
              
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many chat requests in progress, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ClientDisconnected:
+        # Nobody is waiting for the answer: the run was cancelled and the question (and the
+        # session, if this turn created it) deleted again by process_chat_message
+        logger.info("Client disconnected, chat cancelled", extra={"fields": {"user_id": current_user['id'], "session_id": session_id}})
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except DeadlineExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The assistant took too long to answer, please try again"
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The assistant is temporarily unavailable, please try again shortly",
+            headers={"Retry-After": str(max(1, int(e.retry_in)))}
+        )
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{IDEMPOTENCY_HEADER} was already used for a different request"
+        )
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": "2"}
+        )
     except HTTPException: 
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e: 
-        print(f"Error in chat endpoint: {str(e)}")  # Add logging
+        logger.exception("Error in chat endpoint", extra={"fields": {"user_id": current_user['id'], "session_id": session_id}})
         raise HTTPException( 
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Error processing chat: {str(e)}" 
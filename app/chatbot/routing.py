@@ -0,0 +1,158 @@
+import logging
+import re
+import threading
+from collections import Counter as Tally
+from dataclasses import dataclass
+from typing import Optional
+
+from app.chatbot.coalesce import fold_text, needs_personal_context
+from app.chatbot.tools.gazetteer import gazetteer
+from app.monitoring.metrics import get_registry
+
+# Local routing ahead of the agent.
+# Every message used to pay for query expansion plus a tool-calling agent run,
+# "xin chào" and "cảm ơn" included. Messages are now classified with cheap
+# local rules into
+#   small_talk - greetings, thanks, goodbyes, "who are you": answered from templates
+#   faq        - general Vietnam travel facts (visa, currency, plugs, ...): one LLM call, no tools
+#   personal   - the user's own trips, bookings, earlier conversations: full agent
+#   research   - everything else: full agent
+# Anything ambiguous falls through to the agent, so a wrong guess costs latency, never an answer.
+# A FAQ cue tied to a place ("tip ăn uống ở Hà Nội", "ATM ở Hội An") is research:
+# places are looked up in the gazetteer, like the database tool does.
+
+logger = logging.getLogger(__name__)
+registry = get_registry()
+
+SMALL_TALK = "small_talk"
+FAQ = "faq"
+PERSONAL = "personal"
+RESEARCH = "research"
+ROUTES = (SMALL_TALK, FAQ, PERSONAL, RESEARCH)
+
+route_requests = registry.counter(
+    "chat_route_total", "Chat messages per route", labelnames=("route",)
+)
+route_share = registry.gauge(
+    "chat_route_share", "Share of this process's chat messages on each route", labelnames=("route",)
+)
+route_duration = registry.histogram(
+    "chat_route_duration_seconds", "Time to answer a chat message, per route", labelnames=("route",)
+)
+
+SMALL_TALK_MAX_WORDS = 8
+
+
+# Matched against the whole folded message (only filler words around it)
+SMALL_TALK_PATTERNS = {
+    "greeting": re.compile(r"^(?:xin chao|chao|hello|hi|hey|alo|good (?:morning|afternoon|evening))(?: (?:ban|vonder|em|anh|chi|ad|admin|shop|there|you|nhe|nha|a))*$"),
+    "thanks": re.compile(r"^(?:cam on|cam on nhieu|cam on ban|thank you|thanks|thank|thx|tks|ok cam on|ok thanks)(?: (?:ban|nhieu|nhe|nha|a|so much|a lot|very much|you))*$"),
+    "goodbye": re.compile(r"^(?:tam biet|bye|goodbye|bye bye|hen gap lai|see you)(?: (?:ban|nhe|nha|a|later|again))*$"),
+    "identity": re.compile(r"^(?:ban la ai|ban ten gi|who are you|what is your name|what s your name|ban co the lam gi|ban lam duoc gi|what can you do|how can you help(?: me)?)$"),
+    "how_are_you": re.compile(r"^(?:ban (?:co )?khoe khong|ban the nao|how are you|how are you doing|how s it going)$"),
+}
+
+# General travel facts that need no tool: topic -> cue (folded text)
+FAQ_TOPICS = {
+    "visa": re.compile(r"\b(?:visa|thi thuc|e visa|evisa|mien thi thuc)\b"),
+    "currency": re.compile(r"\b(?:currency|tien te|dong viet nam|vnd|doi tien|exchange money|money exchange|atm)\b"),
+    "power plug": re.compile(r"\b(?:plug|o cam|phich cam|dien ap|voltage|adapter)\b"),
+    "tipping": re.compile(r"\b(?:tip|tipping|tien boa|tien tip)\b"),
+    "sim card": re.compile(r"\b(?:sim|sim card|esim|mobile data|4g|5g)\b"),
+    "emergency numbers": re.compile(r"\b(?:emergency|khan cap|so cap cuu|cap cuu|113|114|115)\b"),
+    "time zone": re.compile(r"\b(?:time zone|timezone|mui gio|gmt|utc)\b"),
+    "language": re.compile(r"\b(?:what language|ngon ngu|speak english|noi tieng anh)\b"),
+}
+# A FAQ cue is ignored when the question is tied to a place, date or offer: the agent handles those
+FAQ_EXCLUDE = re.compile(
+    r"\b(?:tour|tours|booking|dat|lich|event|su kien|le hoi|festival|gia|price|khach san|hotel"
+    r"|thang|month|ngay|tuan|week|hom nay|today|tomorrow|ngay mai|\d{1,2}[/-]\d{1,2})\b"
+)
+FAQ_MAX_WORDS = 25
+
+TEMPLATES = {
+    "greeting": {
+        "vi": "Xin chào! Mình là Vonder, trợ lý du lịch Việt Nam. Bạn đang muốn khám phá địa điểm, sự kiện hay tìm tour ở đâu?",
+        "en": "Hello! I'm Vonder, your Vietnam travel assistant. Which places, events or tours would you like to explore?",
+    },
+    "thanks": {
+        "vi": "Không có gì! Nếu bạn cần thêm gợi ý về địa điểm, lịch trình hay tour, cứ hỏi mình nhé.",
+        "en": "You're welcome! Ask me any time you need more ideas for places, itineraries or tours.",
+    },
+    "goodbye": {
+        "vi": "Tạm biệt và chúc bạn có chuyến đi thật vui! Hẹn gặp lại bạn.",
+        "en": "Goodbye and have a wonderful trip! See you next time.",
+    },
+    "identity": {
+        "vi": "Mình là Vonder, trợ lý du lịch Việt Nam. Mình có thể gợi ý điểm đến, món ăn, sự kiện, tìm tour phù hợp "
+              "và xem lịch trình, chuyến đi bạn đã lên kế hoạch.",
+        "en": "I'm Vonder, a Vietnam travel assistant. I can suggest destinations, food and events, find tours that fit you, "
+              "and look up the trips you have planned.",
+    },
+    "how_are_you": {
+        "vi": "Mình rất khỏe, cảm ơn bạn! Hôm nay bạn muốn tìm hiểu về chuyến đi nào?",
+        "en": "I'm doing great, thanks for asking! What trip are you thinking about today?",
+    },
+}
+
+VIETNAMESE_HINT = re.compile(r"[ăâđêôơưàáảãạèéẻẽẹìíỉĩịòóỏõọùúủũụỳýỷỹỵ]")
+VIETNAMESE_WORDS = re.compile(r"\b(?:chao|cam on|ban|tam biet|khong|gi|nhe|nha|la ai)\b")
+
+
+def detect_language(text: str) -> str:
+    if VIETNAMESE_HINT.search((text or "").lower()) or VIETNAMESE_WORDS.search(fold_text(text)):
+        return "vi"
+    return "en"
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    intent: Optional[str] = None  # small-talk kind or FAQ topic
+    language: str = "en"
+
+
+def classify(message: str) -> RouteDecision:
+    language = detect_language(message)
+    folded = fold_text(message)
+    words = len(folded.split())
+
+    if words <= SMALL_TALK_MAX_WORDS:
+        for intent, pattern in SMALL_TALK_PATTERNS.items():
+            if pattern.match(folded):
+                return RouteDecision(SMALL_TALK, intent, language)
+
+    if needs_personal_context(message):
+        return RouteDecision(PERSONAL, language=language)
+
+    if words <= FAQ_MAX_WORDS and not FAQ_EXCLUDE.search(folded):
+        topic = next((name for name, pattern in FAQ_TOPICS.items() if pattern.search(folded)), None)
+        if topic and not gazetteer.extract(message):
+            return RouteDecision(FAQ, topic, language)
+
+    return RouteDecision(RESEARCH, language=language)
+
+
+def small_talk_reply(decision: RouteDecision) -> str:
+    return TEMPLATES[decision.intent][decision.language]
+
+
+class RouteStats:
+    """In-process route tally behind the chat_route_share gauge"""
+
+    def __init__(self):
+        self._counts = Tally()
+        self._lock = threading.Lock()
+
+    def record(self, route: str, seconds: float):
+        route_requests.inc(route=route)
+        route_duration.observe(seconds, route=route)
+        with self._lock:
+            self._counts[route] += 1
+            total = sum(self._counts.values())
+            shares = {name: self._counts[name] / total for name in ROUTES}
+        for name, share in shares.items():
+            route_share.set(round(share, 4), route=name)
+
+
+route_stats = RouteStats()
@@ -1,46 +1,52 @@
+import asyncio
 import json
+import logging
 import os
 import csv
 from dotenv import load_dotenv
 import time as tm
 from datetime import date, time, datetime
-import nest_asyncio
-from llama_index.agent.openai import OpenAIAgent
+from typing import List, Literal, Optional
 
 from llama_index.core.llms import ChatMessage
 from llama_index.core.tools import BaseTool, FunctionTool
 from llama_index.core import PromptTemplate
 from pydantic import BaseModel, Field
 
-from app.chatbot.database.chat_history_service import get_recent_chat_history, format_chat_history, get_user_info
-from app.chatbot.prompts.template import prompt_template
-from app.chatbot.prompts.system import system_prompt
+from app.chatbot.database.chat_history_service import get_recent_chat_history, get_conversation_summary, format_chat_history, get_user_info
+from app.chatbot.agent import ParallelToolAgent, parse_tool_timeouts
+from app.chatbot.deadline import bounded_timeout, remaining, within_deadline
+from app.chatbot.prompts.faq import faq_prompt
+from app.chatbot.prompts.assembly import VolatileContext, prefix_monitor, render_user_message, static_system_prompt
 from app.chatbot.prompts.transform import transform_prompt
-from app.chatbot.tools.tools import RetrieveDatabaseTool, RetrieveDataTool, RetrieveInternetTool
+from app.chatbot.tools.tools import RetrieveDatabaseTool, RetrieveDataTool, RetrieveInternetTool, RetrieveChatMemoryTool
 from llm_integration.openai_client import get_llmAgent, get_llmTransform
+from app.config import settings
+from app.monitoring.llm import install_llm_tracing
+from app.monitoring.tracing import span, traced
+from app.resilience.dependencies import OPENAI, get_dependency_breaker, unavailable_tools
 
-nest_asyncio.apply()
+install_llm_tracing()
 
 load_dotenv()
-template = prompt_template()
+logger = logging.getLogger(__name__)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 class RetrieveModel(BaseModel):
     query: str = Field(..., description="The user's query in natural language.")
 
 class ScheduleRetrieveModel(BaseModel):
-    query: str = Field(..., description="The user's query in natural language.")
-    filter_start_date: date = Field(
-        ..., description="Start date of the schedule event in format YYYY-MM-DD"
-    )
-    filter_start_time: time = Field(
-        ..., description="Start time of the schedule event in format HH:MM"
+    # Date phrases in the query ("tháng 7", "next weekend", "Tết") are resolved by the
+    # tool itself; the filters are only for dates the query doesn't spell out
+    query: str = Field(..., description="The user's query in natural language, including any time phrase as written.")
+    entity_type: Optional[Literal["trip", "event", "tour", "agency", "location", "general"]] = Field(
+        None, description="What to look up; inferred from the query when omitted."
     )
-    filter_end_date: date = Field(
-        ..., description="End date of the schedule event in format YYYY-MM-DD"
+    filter_start_date: Optional[date] = Field(
+        None, description="Start of the date range in format YYYY-MM-DD, only when the query has no time phrase"
     )
-    filter_end_time: time = Field(
-        ..., description="End time of the schedule event in format HH:MM"
+    filter_end_date: Optional[date] = Field(
+        None, description="End of the date range in format YYYY-MM-DD, only when the query has no time phrase"
     )
 
 
@@ -50,18 +56,65 @@ descriptionData = (
     "recommended travel activities, and tips for travelers in Vietnam."
 )
 
+# Tool descriptions are part of the cached prompt prefix: keep them free of anything
+# that changes (the current date and time are in the customer message instead)
 descriptionDatabase = (
-    f"Use this tool to retrieve tours, locations and user-specific schedules, tour bookings, and planned events. "
-    f"Helpful for checking what the user has planned. Today's date is {date.today().strftime('%Y-%m-%d')}, "
-    f"and the current time is {datetime.now().strftime('%H:%M')} (used to reference current or upcoming plans)."
+    "Use this tool to retrieve tours, locations and user-specific schedules, tour bookings, and planned events. "
+    "Helpful for checking what the user has planned; use the current date and time given in the customer "
+    "message to reference current or upcoming plans. "
+    "Results are compact rows keyed by short ids (e.g. TO1, EV2); cite the id in brackets, like [TO1], "
+    "when you recommend an item so the app can show its details."
+)
+
+descriptionMemory = (
+    "Use this tool to recall what the user and you said in their earlier chat sessions, "
+    "e.g. when they refer to 'the tour you suggested last week' or to plans discussed before. "
+    "Only searches this user's own past messages."
 )
 
 descriptionInternet = (
     "Use this tool to search the internet for travel-relate tips, weather, locations, tourist attractions,..."
 )
 # Create tools
+# Built once: identical objects every request keep the tool schemas byte-stable
+retrieveDataTool = FunctionTool.from_defaults(
+    async_fn=traced("tool.attraction_tourisms_and_events_in_vietnam")(RetrieveDataTool),
+    name="attraction_tourisms_and_events_in_vietnam",
+    description=descriptionData,
+    fn_schema=RetrieveModel,
+)
+retrieveDatabaseTool = FunctionTool.from_defaults(
+    async_fn=traced("tool.events_tours")(RetrieveDatabaseTool),
+    name="events_tours",
+    description=descriptionDatabase,
+    fn_schema=ScheduleRetrieveModel,
+)
+retrieveInternetTool = FunctionTool.from_defaults(
+    async_fn=traced("tool.internet_search")(RetrieveInternetTool),
+    name="internet_search",
+    description=descriptionInternet,
+    fn_schema=RetrieveModel,
+)
 
-async def get_answer(question: str, chat_id: str, user_id: str) -> str:
+
+def build_tools(chat_id: Optional[str], user_id: Optional[str], personal: bool = True) -> List[BaseTool]:
+    """Agent tools in a fixed order; the per-user memory tool goes last so the shared tools stay a common prefix"""
+    tools: List[BaseTool] = [retrieveDataTool, retrieveDatabaseTool, retrieveInternetTool]
+    if personal:
+        async def recall_past_conversations(query: str) -> str:
+            # Bound to the caller so the model can never read another user's history
+            return await RetrieveChatMemoryTool(query, user_id=user_id, exclude_session_id=chat_id)
+
+        tools.append(FunctionTool.from_defaults(
+            async_fn=traced("tool.past_conversations")(recall_past_conversations),
+            name="past_conversations",
+            description=descriptionMemory,
+            fn_schema=RetrieveModel,
+        ))
+    return tools
+
+
+async def get_answer(question: str, chat_id: Optional[str], user_id: Optional[str], personal: bool = True) -> str:
     """
     Hàm lấy câu trả lời cho một câu hỏi (không dùng stream)
     
@@ -69,67 +122,58 @@ async def get_answer(question: str, chat_id: str, user_id: str) -> str:
         question (str): Câu hỏi của người dùng
         chat_id (str): ID phiên chat
         user_id (str): ID người dùng
+        personal (bool): False khi câu trả lời không phụ thuộc người dùng (không dùng lịch sử
+            chat, thông tin người dùng hay công cụ past_conversations), để nhiều phiên dùng chung
         
     Returns:
         str: Câu trả lời hoàn chỉnh từ agent
     """
     
+    # Without the LLM there is no answer: fail fast while its circuit is open
+    get_dependency_breaker(OPENAI).fail_fast()
     chat = get_llmAgent()
 
-    retrieveDataTool = FunctionTool.from_defaults(
-        fn=RetrieveDataTool,
-        name="attraction_tourisms_and_events_in_vietnam",
-        description=descriptionData,
-        fn_schema=RetrieveModel,
-    )
-    retrieveDatabaseTool = FunctionTool.from_defaults(
-        fn=RetrieveDatabaseTool,
-        name="events_tours",
-        description=descriptionDatabase,
-        fn_schema=RetrieveModel,
-    )
-
-    retrieveInternetTool = FunctionTool.from_defaults(
-        fn=RetrieveInternetTool,
-        name="internet_search",
-        description=descriptionInternet,
-        fn_schema=RetrieveModel,
-    )
-
-    tools = [retrieveDataTool, retrieveDatabaseTool, retrieveInternetTool]
-    print("Tools initialized:", tools)
-    # Initialize the OpenAIAgent with the tools and LLM
-    print("Initializing OpenAIAgent with tools and LLM")
-    # Ensure the system prompt is set
-    agent = OpenAIAgent.from_tools(
+    tools = build_tools(chat_id, user_id, personal)
+    # Tools whose backing service is down are left out, and the model is told why
+    down = unavailable_tools(tool.metadata.name for tool in tools)
+    if down:
+        tools = [tool for tool in tools if tool.metadata.name not in down]
+        logger.info("Tools unavailable", extra={"fields": {"chat_id": chat_id, "tools": down}})
+    # Tool calls of a turn run concurrently, each with its own timeout and circuit breaker
+    agent = ParallelToolAgent(
         tools,
         llm=chat,
-        verbose=True,
-        system_prompt=system_prompt(),
-        api_key=OPENAI_API_KEY,
+        system_prompt=static_system_prompt(),
+        max_iterations=settings.AGENT_MAX_ITERATIONS,
+        tool_timeout=settings.TOOL_TIMEOUT_SECONDS,
+        tool_timeouts=parse_tool_timeouts(settings.TOOL_TIMEOUTS),
+        answer_reserve=settings.CHAT_ANSWER_RESERVE_SECONDS,
     )
-    print("OpenAIAgent initialized successfully")
     # Ensure the agent is ready
     # Prompt to generate similar queries
     query_gen_prompt = PromptTemplate(question)
     llm = get_llmTransform()
 
-    # Lấy lịch sử chat gần đây
-    print("Fetching recent chat history and user info")
     # Lấy lịch sử chat và thông tin người dùng
-    history = await get_recent_chat_history(chat_id)
-    
-    print("Chat history fetched:", history)
+    if personal:
+        with span("history_fetch"):
+            history, conversation_summary = await asyncio.gather(
+                get_recent_chat_history(chat_id),
+                get_conversation_summary(chat_id),
+            )
+        
+        # Lấy thông tin người dùng
+        with span("user_info"):
+            user_info = await get_user_info(user_id)
+    else:
+        history, conversation_summary, user_info = [], "", {}
+
     chat_history = format_chat_history(history)
-    print("Formatted chat history:", chat_history)
-    
-    print("Fetching user info for user_id:", user_id)
-    # Lấy thông tin người dùng
-    user_info = await get_user_info(user_id)
+    logger.debug("Chat history fetched", extra={"fields": {"chat_id": chat_id, "history_messages": len(history)}})
     
-    def generate_queries(query: str, llm, num_queries: int = 4):
+    async def generate_queries(query: str, llm, num_queries: int = 4):
         query_gen_prompt = PromptTemplate(transform_prompt())
-        response = llm.predict(
+        response = await llm.apredict(
             query_gen_prompt, num_queries=num_queries, query=query
         )
         # assume LLM proper put each query on a newline
@@ -137,35 +181,56 @@ async def get_answer(question: str, chat_id: str, user_id: str) -> str:
         return queries
 
     # Tạo các câu hỏi tương tự từ câu hỏi gốc
-    print("Generating similar queries for the question:", question)
-    queries = generate_queries(question, llm)
-    
-    print("Similar queries generated:", queries)
-    # Kiểm tra nếu không có câu hỏi tương tự nào được tạo ra
-
-    # Tạo prompt chính cho agent
-    prompt = PromptTemplate(
-        template=template,
-        function_mappings={
-            "formatted_history": lambda: str(chat_history),
-            "formatted_user": lambda: str(user_info),
-            "question": lambda: question,
-            "similar_question": lambda: "\n".join(queries),
-        },
-    )
-
-    rendered_prompt = prompt.template.format(
-        formatted_history=prompt.function_mappings["formatted_history"](),
-        formatted_user=prompt.function_mappings["formatted_user"](),
-        question=prompt.function_mappings["question"](),
-        similar_question=prompt.function_mappings["similar_question"](),
+    # Optional step: skipped when the request budget is already short, capped otherwise
+    left = remaining()
+    if left is not None and left < settings.CHAT_EXPANSION_MIN_BUDGET_SECONDS:
+        queries = []
+    else:
+        with span("query_expansion") as expansion_span:
+            try:
+                queries = await asyncio.wait_for(
+                    generate_queries(question, llm),
+                    timeout=bounded_timeout(settings.CHAT_EXPANSION_TIMEOUT_SECONDS, reserve=settings.CHAT_ANSWER_RESERVE_SECONDS),
+                )
+            except asyncio.TimeoutError:
+                expansion_span.set_attribute("skipped", "timeout")
+                queries = []
+
+    # Tạo prompt chính cho agent: the static prefix (tools, system prompt) is shared
+    # by every request, everything request-specific goes into this one message
+    notes = []
+    if down:
+        notes.append(
+            "### Unavailable Tools:\n"
+            f"These tools are temporarily unavailable and cannot be called: {', '.join(down)}. "
+            "Answer with the other tools and what you know; if the answer really needs them, "
+            "tell the customer that this information cannot be looked up right now."
+        )
+    rendered_prompt = render_user_message(VolatileContext(
+        question=question,
+        conversation_summary=conversation_summary,
+        history=chat_history,
+        user_info=user_info,
+        similar_questions=queries,
+        notes=notes,
+    ))
+    prefix_monitor.observe(tools)
+    logger.debug(
+        "Prompt rendered",
+        extra={"fields": {"chat_id": chat_id, "prompt": rendered_prompt, "prompt_chars": len(rendered_prompt)}}
     )
-    print("Rendered prompt:", rendered_prompt)
     # Gọi agent để lấy câu trả lời
-    print("Calling agent to get the response for the question")
-    response = await agent.achat(rendered_prompt)
+    with span("agent") as agent_span:
+        response = await agent.achat(rendered_prompt)
+        agent_span.set_attribute("tool_calls", len(response.sources))
 
     return response.response
 
-    
-    
+
+async def get_faq_answer(question: str, topic: str) -> str:
+    """Answer a general travel question (visa, currency, ...) with a single LLM call and no tools"""
+    get_dependency_breaker(OPENAI).fail_fast()
+    with span("faq_answer", topic=topic):
+        return await within_deadline(
+            get_llmAgent().apredict(PromptTemplate(faq_prompt()), topic=topic, question=question)
+        )
@@ -0,0 +1,106 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from llama_index.core.retrievers import VectorIndexAutoRetriever
+from llama_index.core.schema import QueryBundle
+from llama_index.core.vector_stores.types import VectorStoreQuerySpec
+
+from app.monitoring.metrics import get_registry
+
+# VectorIndexAutoRetriever spends an LLM call per query just to turn it into
+# metadata filters over title / document_title / date / source. Most tourism
+# questions carry no such intent, so:
+#   - queries without filter cues skip the LLM (the spec is the query, no filters)
+#   - inferred specs are memoized by normalized query
+
+registry = get_registry()
+
+spec_requests = registry.counter(
+    "retrieval_spec_total", "Auto-retriever query spec lookups", labelnames=("outcome",)
+)
+
+# Cues that a query restricts date, source or document: years, dates, recency, named sources.
+# Matched on the lowercased query with its diacritics: folding would turn "năm" (year)
+# into "nam" as in "Việt Nam" / "miền Nam".
+FILTER_CUES = re.compile(
+    r"\b(?:19|20)\d{2}\b"
+    r"|\b\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?\b"
+    r"|\b(?:tháng|thang|năm|ngày|ngay|gần đây|gan day|mới nhất|moi nhat|cập nhật|cap nhat"
+    r"|nguồn|nguon|bài viết|bai viet|tài liệu|tai lieu|trang web)\b"
+    r"|\b(?:month|year|recent|latest|updated?|since|before|after|source|article|document|website)\b"
+    r"|\b[\w-]+\.(?:com|vn|net|org|gov)\b"
+    r"|\b(?:wikipedia|vnexpress|tuoitre|thanhnien|vietnamtourism|tripadvisor)\b"
+)
+
+
+def normalize_query(query: str) -> str:
+    """NFC, lowercase, collapse whitespace and punctuation; diacritics are kept (they change meaning)"""
+    text = unicodedata.normalize("NFC", (query or "").lower())
+    return " ".join(re.sub(r"[^\w./-]+", " ", text).split())
+
+
+def has_filter_intent(query: str) -> bool:
+    return bool(FILTER_CUES.search(normalize_query(query)))
+
+
+class SpecCache:
+    """Thread-safe LRU of inferred query specs with a TTL"""
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._specs: "OrderedDict[str, Tuple[float, VectorStoreQuerySpec]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[VectorStoreQuerySpec]:
+        with self._lock:
+            entry = self._specs.get(key)
+            if entry is None:
+                return None
+            stored_at, spec = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._specs[key]
+                return None
+            self._specs.move_to_end(key)
+            return spec.model_copy(deep=True)
+
+    def put(self, key: str, spec: VectorStoreQuerySpec):
+        with self._lock:
+            self._specs[key] = (time.monotonic(), spec.model_copy(deep=True))
+            self._specs.move_to_end(key)
+            while len(self._specs) > self.max_entries:
+                self._specs.popitem(last=False)
+
+
+spec_cache = SpecCache()
+
+
+class CachedVectorIndexAutoRetriever(VectorIndexAutoRetriever):
+    """VectorIndexAutoRetriever with a rule-based fast path and memoized filter inference"""
+
+    def _cached_spec(self, query_bundle: QueryBundle) -> Tuple[Optional[VectorStoreQuerySpec], str]:
+        if not has_filter_intent(query_bundle.query_str):
+            spec_requests.inc(outcome="fast_path")
+            return VectorStoreQuerySpec(query=query_bundle.query_str, filters=[], top_k=None), ""
+        key = normalize_query(query_bundle.query_str)
+        spec = spec_cache.get(key)
+        spec_requests.inc(outcome="hit" if spec is not None else "miss")
+        return spec, key
+
+    def generate_retrieval_spec(self, query_bundle: QueryBundle, **kwargs: Any) -> VectorStoreQuerySpec:
+        spec, key = self._cached_spec(query_bundle)
+        if spec is None:
+            spec = super().generate_retrieval_spec(query_bundle, **kwargs)
+            spec_cache.put(key, spec)
+        return spec
+
+    async def agenerate_retrieval_spec(self, query_bundle: QueryBundle, **kwargs: Any) -> VectorStoreQuerySpec:
+        spec, key = self._cached_spec(query_bundle)
+        if spec is None:
+            spec = await super().agenerate_retrieval_spec(query_bundle, **kwargs)
+            spec_cache.put(key, spec)
+        return spec
@@ -0,0 +1,93 @@
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.db.prisma_client import prisma
+from app.monitoring.tracing import span
+
+# Date-aware tour availability.
+# "Tours to Đà Lạt next week with seats" is answered by one query over
+# TourDeparture (one row per Tour.startDates element, maintained by a trigger):
+# departures inside the window are a range scan on ("startDate", "tourId"),
+# joined to their tour, filtered by place, and kept when the seats left
+#   maxCapacity - sum(participants of CONFIRMED bookings)
+# cover the party size asked for ("cho 4 người", "2 adults"), one seat otherwise.
+
+# "4 người", "2-3 khách", "6 people", "2 adults"; a range asks for its upper end
+PARTY_SIZE = re.compile(
+    r"\b(\d{1,2})(?:\s*-\s*(\d{1,2}))?\s*"
+    r"(?:người|nguoi|khách|khach|thành viên|pax|people|persons?|adults?|guests?|travell?ers?)\b",
+    re.IGNORECASE,
+)
+
+
+def party_size(text: str) -> int:
+    """Seats the question asks for; 1 when it doesn't say"""
+    match = PARTY_SIZE.search(text or "")
+    if not match:
+        return 1
+    return max(1, int(match.group(2) or match.group(1)))
+
+
+def _utc(value: datetime) -> str:
+    """Prisma stores DateTime as UTC timestamps without a zone"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+async def find_available_tours(
+    start: datetime,
+    end: datetime,
+    place_filters: Optional[Dict] = None,
+    query: Optional[str] = None,
+    seats: int = 1,
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Tours departing between start and end with at least `seats` seats left.
+
+    Rows are {"tourId", "startDates" (departures in the window, ascending),
+    "seatsLeft"}, soonest departure first. Place filters work as in the
+    retrieve_* queries; without them `query` is matched against title,
+    description and location name.
+    """
+    args: list = [_utc(start), _utc(end)]
+    conditions = ['d."startDate" BETWEEN $1::timestamp AND $2::timestamp']
+
+    place_filters = place_filters or {}
+    if place_filters:
+        places = []
+        if 'location_ids' in place_filters:
+            args.append(place_filters['location_ids'])
+            places.append(f't."locationId" = ANY(${len(args)}::text[])')
+        if 'provinces' in place_filters:
+            args.append(place_filters['provinces'])
+            places.append(f't."province"::text = ANY(${len(args)}::text[])')
+            places.append(f'l."province"::text = ANY(${len(args)}::text[])')
+        conditions.append(f'({" OR ".join(places)})')
+    elif query:
+        args.append(f"%{query}%")
+        conditions.append(
+            f'(t."title" ILIKE ${len(args)} OR t."description" ILIKE ${len(args)} OR l."name" ILIKE ${len(args)})'
+        )
+
+    args.append(seats)
+    seats_param = len(args)
+    args.append(limit)
+
+    sql = (
+        'SELECT t."id" AS "tourId", array_agg(d."startDate" ORDER BY d."startDate") AS "startDates", '
+        't."maxCapacity" - COALESCE(b."booked", 0) AS "seatsLeft" '
+        'FROM "TourDeparture" d '
+        'JOIN "Tour" t ON t."id" = d."tourId" '
+        'LEFT JOIN "Location" l ON l."id" = t."locationId" '
+        'LEFT JOIN LATERAL (SELECT SUM("participants") AS "booked" FROM "TourBooking" '
+        'WHERE "tourId" = t."id" AND "status" = \'CONFIRMED\') b ON TRUE '
+        f'WHERE {" AND ".join(conditions)} '
+        f'AND t."maxCapacity" - COALESCE(b."booked", 0) >= ${seats_param} '
+        'GROUP BY t."id", t."maxCapacity", b."booked" '
+        f'ORDER BY MIN(d."startDate") LIMIT ${len(args)}'
+    )
+    with span("db.tour_availability", seats=seats, places=bool(place_filters)):
+        return await prisma.query_raw(sql, *args)
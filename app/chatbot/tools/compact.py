@@ -0,0 +1,140 @@
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+# core/ai/tools/compact.py
+# Compact encoding of database tool results for the agent context.
+# The model only sees dense rows keyed by short ids (e.g. TO1, EV2); the full
+# cards are kept in a request-scoped side-channel so the router can expand the
+# ids the answer refers to into rich cards for the frontend.
+
+DESCRIPTION_MAX_CHARS = 160
+
+# Short id prefix and the columns rendered for each entity type
+COLUMNS = {
+    'trip': ('TR', ['name', 'start_date', 'end_date', 'location', 'province', 'hotel_name', 'participants_count', 'description']),
+    'event': ('EV', ['name', 'start_date', 'end_date', 'locations', 'description']),
+    'tour': ('TO', ['title', 'price', 'duration', 'next_departure', 'seats_left', 'location', 'province', 'agency_name', 'category', 'description']),
+    'agency': ('AG', ['name', 'verified', 'total_tours', 'phone_number', 'website', 'description']),
+    'location': ('LO', ['name', 'province', 'district', 'total_trips', 'total_tours']),
+}
+
+SHORT_ID_PATTERN = re.compile(r'\b(?:TR|EV|TO|AG|LO)\d+\b')
+
+_cards: ContextVar[Optional[Dict[str, Dict[str, Any]]]] = ContextVar("tool_result_cards", default=None)
+
+
+@contextmanager
+def collect_cards():
+    """Open a request-scoped side-channel that receives the full result cards"""
+    cards: Dict[str, Dict[str, Any]] = {}
+    token = _cards.set(cards)
+    try:
+        yield cards
+    finally:
+        _cards.reset(token)
+
+
+def expand_card_ids(text: str, cards: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the full cards for the short ids referenced in text, in order of appearance"""
+    if not text or not cards:
+        return []
+
+    expanded = []
+    seen = set()
+    for short_id in SHORT_ID_PATTERN.findall(text):
+        if short_id in cards and short_id not in seen:
+            seen.add(short_id)
+            expanded.append({'ref': short_id, **cards[short_id]})
+    return expanded
+
+
+def clip(text: Optional[str], max_chars: int = DESCRIPTION_MAX_CHARS) -> Optional[str]:
+    """Collapse whitespace and cut text to max_chars"""
+    if not text:
+        return text
+    text = ' '.join(str(text).split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip() + '…'
+
+
+def _cell(value: Any) -> str:
+    """Render one value for a row cell"""
+    if value is None or value == '' or value == []:
+        return ''
+    if isinstance(value, bool):
+        return 'y' if value else 'n'
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, str) and len(value) >= 10 and value[4:5] == '-' and value[7:8] == '-':
+        # ISO datetimes -> date only, the time is almost never useful to the model
+        value = value[:10]
+    return str(value).replace('|', '/').replace('\n', ' ')
+
+
+def _short_id_for(item: Dict[str, Any], prefix: str, cards: Dict[str, Dict[str, Any]]) -> str:
+    """Reuse the short id of an already seen row, otherwise allocate the next one for prefix"""
+    for short_id, card in cards.items():
+        if card.get('id') is not None and card.get('id') == item.get('id') and card.get('type') == item.get('type'):
+            return short_id
+    count = sum(1 for key in cards if key.startswith(prefix)) + 1
+    return f"{prefix}{count}"
+
+
+def encode_results(results: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+    """
+    Encode formatted tool results as a compact table.
+
+    Returns the text for the agent and the short id -> full card map. When a
+    side-channel is open (see collect_cards) the cards are registered there too.
+    """
+    cards = _cards.get()
+    if cards is None:
+        cards = {}
+    encoded_cards: Dict[str, Dict[str, Any]] = {}
+
+    errors = [item['error'] for item in results if 'error' in item]
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in results:
+        if 'error' in item:
+            continue
+        item_type = item.get('type')
+        if item_type not in COLUMNS:
+            continue
+        groups.setdefault(item_type, []).append(item)
+
+    lines = []
+    for item_type, items in groups.items():
+        prefix, columns = COLUMNS[item_type]
+        # Skip columns that are empty for every row of this group
+        columns = [column for column in columns if any(_cell(item.get(column)) for item in items)]
+        lines.append(f"{item_type}: ref|" + '|'.join(columns))
+        for item in items:
+            short_id = _short_id_for(item, prefix, cards)
+            card = {key: value for key, value in item.items() if value is not None}
+            cards[short_id] = card
+            encoded_cards[short_id] = card
+
+            cells = []
+            for column in columns:
+                value = item.get(column)
+                if column == 'description':
+                    value = clip(value)
+                cells.append(_cell(value))
+            lines.append(short_id + '|' + '|'.join(cells))
+
+    for error in errors:
+        lines.append(f"error: {error}")
+
+    if not lines:
+        return "No results", encoded_cards
+
+    return "\n".join(lines), encoded_cards
+
+
+def encode_tool_results(results: List[Dict[str, Any]]) -> str:
+    """Encode tool results and only return the text for the agent"""
+    text, _ = encode_results(results)
+    return text
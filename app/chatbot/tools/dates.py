@@ -0,0 +1,339 @@
+import calendar
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable, List, Optional, Tuple
+
+import pytz
+
+from app.config import settings
+
+# Deterministic date-expression parser for the database tool.
+# Questions like "sự kiện ở Huế tháng 7", "tour cuối tuần này", "events next
+# weekend" or "đi đâu dịp Tết" carry a date range the agent would otherwise have
+# to work out with an extra round of model reasoning (and often gets the year
+# wrong). Phrases are matched on the lowercased question with diacritics folded
+# ("tháng" -> "thang", same length, so spans map back to the original text) and
+# resolved against today's date in settings.TIMEZONE (Asia/Ho_Chi_Minh).
+# Ranges are inclusive calendar days.
+
+# Mùng 1 Tết (Lunar New Year's day); the lunar calendar has no closed form
+TET_DATES = {
+    2024: date(2024, 2, 10), 2025: date(2025, 1, 29), 2026: date(2026, 2, 17),
+    2027: date(2027, 2, 6), 2028: date(2028, 1, 26), 2029: date(2029, 2, 13),
+    2030: date(2030, 2, 3), 2031: date(2031, 1, 23), 2032: date(2032, 2, 11),
+    2033: date(2033, 1, 31), 2034: date(2034, 2, 19), 2035: date(2035, 2, 8),
+}
+# The holiday around it: from two days before (28-29 Tết) to mùng 4
+TET_BEFORE_DAYS = 2
+TET_AFTER_DAYS = 3
+
+UPCOMING_DAYS = 30  # "sắp tới" without an end: the tool still needs a bounded, indexed range
+
+EN_MONTHS = {name.lower(): index for index, name in enumerate(calendar.month_name) if name}
+EN_MONTHS.update({name.lower(): index for index, name in enumerate(calendar.month_abbr) if name})
+EN_WEEKDAYS = {name.lower(): index for index, name in enumerate(calendar.day_name)}
+# "thứ 2" is Monday ... "thứ 7" Saturday, "chủ nhật" Sunday
+VI_WEEKDAYS = {"thu 2": 0, "thu hai": 0, "thu 3": 1, "thu ba": 1, "thu 4": 2, "thu tu": 2,
+               "thu 5": 3, "thu nam": 3, "thu 6": 4, "thu sau": 4, "thu 7": 5, "thu bay": 5,
+               "chu nhat": 6, "cn": 6}
+
+
+@dataclass
+class DateRange:
+    start: date
+    end: date
+    phrase: str  # the matched text, as written in the question
+
+    def to_datetimes(self) -> Tuple[datetime, datetime]:
+        """Start of the first day and end of the last day, in the local timezone"""
+        tz = pytz.timezone(settings.TIMEZONE)
+        return tz.localize(datetime.combine(self.start, time.min)), tz.localize(datetime.combine(self.end, time.max))
+
+
+def today_local() -> date:
+    return datetime.now(pytz.timezone(settings.TIMEZONE)).date()
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics character by character, keeping every index in place"""
+    folded = []
+    for ch in (text or "").lower():
+        if ch == "đ":
+            folded.append("d")
+            continue
+        base = unicodedata.normalize("NFD", ch)[0]
+        folded.append(base if len(base) == 1 else ch)
+    return "".join(folded)
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _next_month_start(day: date, months: int = 1) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _upcoming_month(today: date, month: int, year: Optional[int]) -> Tuple[date, date]:
+    """A bare month means its next occurrence: "tháng 3" asked in October is next March"""
+    if year is None:
+        year = today.year if month >= today.month else today.year + 1
+    return _month_range(year, month)
+
+
+def _year(value: Optional[str], today: date) -> Optional[int]:
+    if not value:
+        return None
+    year = int(value)
+    return year + 2000 if year < 100 else year
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _day_month(today: date, day: str, month: str, year: Optional[str]) -> Optional[date]:
+    """dd/mm[/yyyy]; without a year, the next occurrence from today"""
+    explicit = _year(year, today)
+    value = _safe_date(explicit or today.year, int(month), int(day))
+    if value and explicit is None and value < today:
+        value = _safe_date(today.year + 1, int(month), int(day))
+    return value
+
+
+def _tet(today: date, year: Optional[int]) -> Optional[Tuple[date, date]]:
+    if year is None:
+        # The next Tết that hasn't ended yet
+        for candidate in sorted(TET_DATES):
+            if TET_DATES[candidate] + timedelta(days=TET_AFTER_DAYS) >= today:
+                year = candidate
+                break
+    first_day = TET_DATES.get(year)
+    if first_day is None:
+        return None
+    return first_day - timedelta(days=TET_BEFORE_DAYS), first_day + timedelta(days=TET_AFTER_DAYS)
+
+
+def _weekday(today: date, weekday: int, modifier: str) -> date:
+    days_ahead = (weekday - today.weekday()) % 7
+    if modifier in ("sau", "toi", "next"):
+        # "thứ 7 tuần sau" / "next saturday": that day in the following week
+        return _week_start(today) + timedelta(days=7 + weekday)
+    return today + timedelta(days=days_ahead)
+
+
+MONTH_WORDS = "|".join(sorted(EN_MONTHS, key=len, reverse=True))
+WEEKDAY_WORDS = "|".join(sorted(EN_WEEKDAYS, key=len, reverse=True))
+VI_WEEKDAY_WORDS = "|".join(sorted((re.escape(k) for k in VI_WEEKDAYS), key=len, reverse=True))
+YEAR = r"(?:19|20)\d{2}"
+
+Resolver = Callable[[re.Match, date], Optional[Tuple[date, date]]]
+
+# Most specific first: the first pattern that matches and resolves wins
+PATTERNS: List[Tuple[re.Pattern, Resolver]] = []
+
+
+def _pattern(regex: str):
+    def register(resolver: Resolver) -> Resolver:
+        PATTERNS.append((re.compile(regex), resolver))
+        return resolver
+    return register
+
+
+# Day/month always with "/": "1-2 người", "tour 3-4 ngày" are not dates
+@_pattern(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\s*(?:den|toi|-|–|to|until|and)\s*(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+def _explicit_range(m, today):
+    start = _day_month(today, m.group(1), m.group(2), m.group(3))
+    end_year = m.group(6) or m.group(3) or (str(start.year) if start else None)
+    end = _safe_date(_year(end_year, today), int(m.group(5)), int(m.group(4))) if start else None
+    if start and end and end < start:
+        end = _safe_date(end.year + 1, end.month, end.day)
+    return (start, end) if start and end else None
+
+
+@_pattern(r"\b(" + YEAR + r")-(\d{1,2})-(\d{1,2})\b")
+def _iso_date(m, today):
+    day = _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    return (day, day) if day else None
+
+
+@_pattern(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+def _day_month_date(m, today):
+    if m.group(3) is None and not 1 <= int(m.group(2)) <= 12:
+        return None
+    day = _day_month(today, m.group(1), m.group(2), m.group(3))
+    return (day, day) if day else None
+
+
+@_pattern(r"\btet\s+(?:duong lich|tay)\b|\bnew year'?s? (?:day|eve)\b")
+def _solar_new_year(m, today):
+    year = today.year + 1 if (today.month, today.day) > (1, 1) else today.year
+    return date(year, 1, 1), date(year, 1, 1)
+
+
+@_pattern(r"\b(?:tet(?:\s+nguyen dan|\s+am lich)?|lunar new year)(?:\s+(?:nam\s+)?(" + YEAR + r"))?\b")
+def _lunar_new_year(m, today):
+    return _tet(today, _year(m.group(1), today))
+
+
+@_pattern(r"\b(?:giang sinh|noel|christmas)\b")
+def _christmas(m, today):
+    year = today.year if today <= date(today.year, 12, 25) else today.year + 1
+    return date(year, 12, 24), date(year, 12, 25)
+
+
+@_pattern(r"\b(?:cuoi tuan|weekend)\s*(nay|sau|toi|truoc)?\b|\b(this|next|last)\s+weekend\b")
+def _weekend(m, today):
+    modifier = m.group(1) or m.group(2) or "nay"
+    saturday = _week_start(today) + timedelta(days=5)
+    if modifier in ("sau", "toi", "next"):
+        saturday += timedelta(days=7)
+    elif modifier in ("truoc", "last"):
+        saturday -= timedelta(days=7)
+    return saturday, saturday + timedelta(days=1)
+
+
+# Not "mùa thu năm nay" (autumn this year)
+@_pattern(r"(?<!mua )\b(" + VI_WEEKDAY_WORDS + r")\s*(?:tuan\s*)?(nay|sau|toi)?\b")
+def _vi_weekday(m, today):
+    day = _weekday(today, VI_WEEKDAYS[m.group(1)], m.group(2) or "nay")
+    return day, day
+
+
+@_pattern(r"\b(?:(this|next|on)\s+)?(" + WEEKDAY_WORDS + r")\b")
+def _en_weekday(m, today):
+    day = _weekday(today, EN_WEEKDAYS[m.group(2)], m.group(1) or "this")
+    return day, day
+
+
+@_pattern(r"\bthang\s+(1[0-2]|0?[1-9])(?:\s*(?:nam\s+|/|-)\s*(" + YEAR + r"))?\b")
+def _vi_month(m, today):
+    return _upcoming_month(today, int(m.group(1)), _year(m.group(2), today))
+
+
+@_pattern(r"\b(?:in\s+)?(" + MONTH_WORDS + r")\.?(?:\s+(" + YEAR + r"))?\b")
+def _en_month(m, today):
+    if m.group(1) in ("may", "mar") and not (m.group(0).startswith("in ") or m.group(2)):
+        return None  # "may" / "mar" are usually not months without "in" or a year
+    return _upcoming_month(today, EN_MONTHS[m.group(1)], _year(m.group(2), today))
+
+
+@_pattern(r"\b(?:trong\s+)?(\d{1,3})\s+(ngay|tuan|days?|weeks?)\s+(?:toi|sap toi|nua|ahead|to come)\b|\b(?:next|in the next)\s+(\d{1,3})\s+(days?|weeks?)\b")
+def _next_n(m, today):
+    count = int(m.group(1) or m.group(3))
+    unit = m.group(2) or m.group(4)
+    days = count * 7 if unit.startswith(("tuan", "week")) else count
+    return today, today + timedelta(days=days)
+
+
+@_pattern(r"\b(hom nay|today|tonight|toi nay)\b")
+def _today(m, today):
+    return today, today
+
+
+@_pattern(r"\b(ngay mai|tomorrow)\b")
+def _tomorrow(m, today):
+    day = today + timedelta(days=1)
+    return day, day
+
+
+@_pattern(r"\b(ngay kia|ngay mot|day after tomorrow)\b")
+def _day_after_tomorrow(m, today):
+    day = today + timedelta(days=2)
+    return day, day
+
+
+@_pattern(r"\b(?:tuan\s*(nay|sau|toi|truoc)|(this|next|last)\s+week)\b")
+def _week(m, today):
+    modifier = m.group(1) or m.group(2)
+    start = _week_start(today)
+    if modifier in ("sau", "toi", "next"):
+        start += timedelta(days=7)
+    elif modifier in ("truoc", "last"):
+        start -= timedelta(days=7)
+    return start, start + timedelta(days=6)
+
+
+@_pattern(r"\b(?:thang\s*(nay|sau|toi|truoc)|(this|next|last)\s+month)\b")
+def _month(m, today):
+    modifier = m.group(1) or m.group(2)
+    first = date(today.year, today.month, 1)
+    if modifier in ("sau", "toi", "next"):
+        first = _next_month_start(today)
+    elif modifier in ("truoc", "last"):
+        first = _next_month_start(today, -1)
+    return _month_range(first.year, first.month)
+
+
+@_pattern(r"\b(?:nam\s*(nay|sau|toi|truoc)|(this|next|last)\s+year)\b")
+def _relative_year(m, today):
+    modifier = m.group(1) or m.group(2)
+    year = today.year + (1 if modifier in ("sau", "toi", "next") else -1 if modifier in ("truoc", "last") else 0)
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+# Not "Việt Nam 2025" / "miền Nam 2025"
+@_pattern(r"(?<!viet )(?<!mien )\b(?:nam|in|year)\s+(" + YEAR + r")\b")
+def _explicit_year(m, today):
+    year = int(m.group(1))
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+@_pattern(r"\b(sap toi|sap dien ra|toi day|upcoming|coming up|soon)\b")
+def _upcoming(m, today):
+    return today, today + timedelta(days=UPCOMING_DAYS)
+
+
+def parse_date_range(text: str, today: Optional[date] = None) -> Optional[DateRange]:
+    """The first date expression in `text` resolved to a range, or None"""
+    if not text:
+        return None
+    today = today or today_local()
+    folded = fold(text)
+    for pattern, resolver in PATTERNS:
+        for match in pattern.finditer(folded):
+            resolved = resolver(match, today)
+            if resolved:
+                start, end = resolved
+                return DateRange(start=start, end=end, phrase=text[match.start():match.end()].strip())
+    return None
+
+
+# Words that are left once the date is gone from "sự kiện nào vào cuối tuần này?",
+# but say nothing a name or description would contain (folded)
+STOP_WORDS = {
+    "su", "kien", "le", "hoi", "tour", "tours", "chuyen", "di", "du", "lich", "trinh", "hoat", "dong",
+    "co", "gi", "nao", "khong", "o", "dau", "nhung", "cac", "tim", "cho", "minh", "toi", "nhe", "a", "nay",
+    "event", "events", "festival", "festivals", "trip", "trips", "what", "which", "any", "are", "is",
+    "there", "find", "show", "me", "the", "to", "do",
+}
+
+
+def strip_phrase(text: str, phrase: str) -> str:
+    """
+    The question without the date phrase (and the connecting word before it),
+    for text search; empty when only stop words are left
+    """
+    if not phrase:
+        return text
+    index = text.find(phrase)
+    if index < 0:
+        return text
+    head = re.sub(
+        r"(?:(?:^|\s+)(?:vào|vao|trong|dịp|dip|từ|tu|in|on|during|for|from|ngày|ngay))?\s*$",
+        "", text[:index], flags=re.IGNORECASE
+    )
+    rest = " ".join((head + " " + text[index + len(phrase):]).split())
+    if all(word in STOP_WORDS for word in re.findall(r"\w+", fold(rest))):
+        return ""
+    return rest
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from prisma.enums import Province
+
+from app.chatbot.tools.dates import fold
+from app.config import settings
+from app.db.prisma_client import prisma
+from app.monitoring.metrics import get_registry
+
+# In-memory gazetteer of Vietnamese places for the database tool.
+# The retrieve_* queries used to run `contains` with the whole question against
+# names, so "tour du lịch Sapa tháng 7" matched nothing. Place names are now
+# looked up locally in a token trie built from
+#   - the Province enum ("HO_CHI_MINH" is "ho chi minh" once folded),
+#   - ALIASES: cities, islands and spellings people use for a province ("Sài Gòn", "TPHCM", "Sapa"),
+#   - Location rows (by name),
+# all diacritic-folded, so "Đà Lạt", "da lat" and "DA LAT" are one key, plus
+# ACCENTED_ALIASES, kept with their diacritics. A lookup walks the question's
+# tokens once (folded and as written) and returns the longest matches; the tools
+# then filter on locationId / province columns instead of scanning text.
+# Location rows are reloaded incrementally (updatedAt > last sync) at most every
+# GAZETTEER_REFRESH_SECONDS; deleted rows are found by comparing the table's ids
+# with the ids synced so far.
+
+logger = logging.getLogger(__name__)
+registry = get_registry()
+
+gazetteer_entries = registry.gauge(
+    "gazetteer_entries", "Place names indexed by the gazetteer", labelnames=("kind",)
+)
+gazetteer_refreshes = registry.counter(
+    "gazetteer_refresh_total", "Gazetteer reloads from the database", labelnames=("mode",)
+)
+
+LOCATION = "location"
+PROVINCE = "province"
+
+# Folded alias -> Province; the enum names themselves need no entry
+ALIASES: Dict[str, str] = {
+    "hcm": "HO_CHI_MINH", "tphcm": "HO_CHI_MINH", "tp hcm": "HO_CHI_MINH", "tp ho chi minh": "HO_CHI_MINH",
+    "thanh pho ho chi minh": "HO_CHI_MINH", "sai gon": "HO_CHI_MINH", "saigon": "HO_CHI_MINH",
+    "ho chi minh city": "HO_CHI_MINH", "hcmc": "HO_CHI_MINH",
+    "hanoi": "HA_NOI",
+    "co do hue": "THUA_THIEN_HUE",
+    "danang": "DA_NANG", "hoi an": "QUANG_NAM", "cu lao cham": "QUANG_NAM",
+    "da lat": "LAM_DONG", "dalat": "LAM_DONG",
+    "sapa": "LAO_CAI", "sa pa": "LAO_CAI", "fansipan": "LAO_CAI",
+    "nha trang": "KHANH_HOA", "cam ranh": "KHANH_HOA",
+    "vung tau": "BA_RIA_VUNG_TAU",
+    "phu quoc": "KIEN_GIANG", "ha tien": "KIEN_GIANG",
+    "ha long": "QUANG_NINH", "halong": "QUANG_NINH", "vinh ha long": "QUANG_NINH",
+    "cat ba": "HAI_PHONG",
+    "mui ne": "BINH_THUAN", "phan thiet": "BINH_THUAN",
+    "phong nha": "QUANG_BINH", "ke bang": "QUANG_BINH",
+    "trang an": "NINH_BINH", "tam coc": "NINH_BINH",
+    "quy nhon": "BINH_DINH", "tuy hoa": "PHU_YEN",
+    "buon ma thuot": "DAK_LAK", "pleiku": "GIA_LAI",
+    "moc chau": "SON_LA", "mai chau": "HOA_BINH", "mu cang chai": "YEN_BAI",
+    "dong van": "HA_GIANG", "tay ninh": "TAY_NINH", "nui ba den": "TAY_NINH",
+    "mekong": "CAN_THO", "cai rang": "CAN_THO",
+}
+# Aliases whose folded form is an everyday phrase ("có tổ chức" folds to "co to
+# chuc", "my son", "con dao" is a knife): matched only as written, with diacritics
+ACCENTED_ALIASES: Dict[str, str] = {
+    "huế": "THUA_THIEN_HUE", "mỹ sơn": "QUANG_NAM", "cô tô": "QUANG_NINH",
+    "côn đảo": "BA_RIA_VUNG_TAU", "lý sơn": "QUANG_NGAI",
+}
+
+# Location names that are this short (one token) are too likely to be ordinary words
+MIN_SINGLE_TOKEN_LENGTH = 4
+
+TOKEN = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class Place:
+    kind: str  # LOCATION or PROVINCE
+    id: str  # Location.id, or the Province value
+    name: str
+    province: Optional[str] = None
+
+
+@dataclass
+class PlaceMatch:
+    phrase: str  # as written in the question
+    places: Tuple[Place, ...]
+
+
+def _tokens(text: str) -> List[str]:
+    return TOKEN.findall(fold(unicodedata.normalize("NFC", text or "")))
+
+
+def _enum_value(value) -> str:
+    return getattr(value, "value", value)
+
+
+class _Node:
+    __slots__ = ("children", "places")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.places: Set[Place] = set()
+
+
+class Gazetteer:
+    """Token trie over folded place names; lookups never touch the database"""
+
+    def __init__(self):
+        self._root = _Node()
+        self._locations: Dict[str, Tuple[Place, Tuple[str, ...]]] = {}
+        self._row_ids: Set[str] = set()  # every Location row synced, indexed or not
+        self._lock = threading.Lock()
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._synced_at: Optional[datetime] = None
+        self._checked_at = 0.0
+        for value in Province:
+            self._add_province(_enum_value(value))
+        self._report()
+
+    # ---------- Index ----------
+
+    def _insert(self, key: Tuple[str, ...], place: Place):
+        node = self._root
+        for token in key:
+            node = node.children.setdefault(token, _Node())
+        node.places.add(place)
+
+    def _discard(self, key: Tuple[str, ...], place: Place):
+        path = [self._root]
+        for token in key:
+            node = path[-1].children.get(token)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].places.discard(place)
+        # Prune branches left without places
+        for depth in range(len(key), 0, -1):
+            node = path[depth]
+            if node.places or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+
+    def _add_province(self, province: str):
+        place = Place(PROVINCE, province, province.replace("_", " ").title(), province)
+        self._insert(tuple(province.lower().split("_")), place)
+        for alias, target in ALIASES.items():
+            if target == province:
+                self._insert(tuple(alias.split()), place)
+        for alias, target in ACCENTED_ALIASES.items():
+            if target == province:
+                self._insert(tuple(TOKEN.findall(unicodedata.normalize("NFC", alias))), place)
+
+    def _upsert_location(self, location):
+        self._remove_location(location.id)
+        key = tuple(_tokens(location.name))
+        if not key or (len(key) == 1 and len(key[0]) < MIN_SINGLE_TOKEN_LENGTH):
+            return
+        place = Place(LOCATION, location.id, location.name, _enum_value(location.province))
+        self._insert(key, place)
+        self._locations[location.id] = (place, key)
+
+    def _remove_location(self, location_id: str):
+        entry = self._locations.pop(location_id, None)
+        if entry is not None:
+            place, key = entry
+            self._discard(key, place)
+
+    def _report(self):
+        gazetteer_entries.set(len(self._locations), kind=LOCATION)
+        gazetteer_entries.set(len(Province), kind=PROVINCE)
+
+    # ---------- Refresh ----------
+
+    async def refresh(self, full: bool = False):
+        """Load Location rows changed since the last sync (all of them when `full`)"""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            since = None if full else self._synced_at
+            deleted: Set[str] = set()
+            if since is not None:
+                # updatedAt can't tell deletes; a delete plus an insert keeps the count, so compare ids
+                ids = await prisma.query_raw('SELECT "id" FROM "Location"')
+                deleted = self._row_ids - {row['id'] for row in ids}
+            rows = await prisma.location.find_many(
+                where={'updatedAt': {'gt': since}} if since else {},
+                order=[{'updatedAt': 'asc'}],
+            )
+            with self._lock:
+                if since is None:
+                    for location_id in list(self._locations):
+                        self._remove_location(location_id)
+                    self._row_ids.clear()
+                for location_id in deleted:
+                    self._remove_location(location_id)
+                    self._row_ids.discard(location_id)
+                for row in rows:
+                    self._upsert_location(row)
+                    self._row_ids.add(row.id)
+                if rows or since is None:
+                    self._synced_at = rows[-1].updatedAt if rows else None
+                self._checked_at = time.monotonic()
+            self._report()
+            gazetteer_refreshes.inc(mode="incremental" if since else "full")
+            logger.info("Gazetteer refreshed", extra={"fields": {
+                "mode": "incremental" if since else "full",
+                "changed": len(rows),
+                "deleted": len(deleted),
+                "locations": len(self._locations),
+            }})
+
+    async def ensure_fresh(self):
+        """Refresh when the last sync is older than GAZETTEER_REFRESH_SECONDS; errors keep the old index"""
+        if time.monotonic() - self._checked_at < settings.GAZETTEER_REFRESH_SECONDS:
+            return
+        try:
+            await self.refresh()
+        except Exception as e:
+            self._checked_at = time.monotonic()  # don't retry on every question while the database is down
+            logger.error(f"Gazetteer refresh failed: {e}")
+
+    # ---------- Lookup ----------
+
+    def extract(self, text: str) -> List[PlaceMatch]:
+        """Longest non-overlapping place names in `text`, left to right"""
+        text = unicodedata.normalize("NFC", text or "")
+        lowered = text.lower()  # fold() keeps every index, so spans line up with both
+        spans = [(m.group(), lowered[m.start():m.end()], m.start(), m.end()) for m in TOKEN.finditer(fold(text))]
+        matches = []
+        with self._lock:
+            index = 0
+            while index < len(spans):
+                nodes, best = [self._root], None
+                for end in range(index, len(spans)):
+                    # Folded keys and accented aliases live in the same trie
+                    keys = {spans[end][0], spans[end][1]}
+                    nodes = [node.children[key] for node in nodes for key in keys if key in node.children]
+                    if not nodes:
+                        break
+                    places = set().union(*(node.places for node in nodes))
+                    if places:
+                        best = (end, tuple(sorted(places, key=lambda p: (p.kind, p.id))))
+                if best is None:
+                    index += 1
+                    continue
+                end, places = best
+                matches.append(PlaceMatch(text[spans[index][2]:spans[end][3]], places))
+                index = end + 1
+        return matches
+
+
+def place_filters(matches: Iterable[PlaceMatch]) -> Dict[str, List[str]]:
+    """
+    {'location_ids': [...], 'provinces': [...]} for the retrieve_* queries.
+
+    A phrase naming a province or an alias ("Sài Gòn", "Đà Lạt") filters on the
+    province, even when a Location row has the same name: tours and trips there
+    are attached to many locations. Other phrases filter on the Location rows.
+    """
+    location_ids, provinces = [], []
+    for match in matches:
+        named = [place.id for place in match.places if place.kind == PROVINCE]
+        if not named:
+            location_ids.extend(p.id for p in match.places if p.id not in location_ids)
+        provinces.extend(p for p in named if p not in provinces)
+    filters = {}
+    if location_ids:
+        filters['location_ids'] = location_ids
+    if provinces:
+        filters['provinces'] = provinces
+    return filters
+
+
+gazetteer = Gazetteer()
@@ -0,0 +1,96 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+# Local cross-encoder reranking for knowledge-base retrieval.
+# Instead of asking the LLM to infer metadata filters (VectorIndexAutoRetriever),
+# the "rerank" retrieval mode over-fetches candidates with plain hybrid search
+# and scores every (query, passage) pair with a small multilingual cross-encoder
+# on the CPU. Scores are cached per (query, passage) so repeated questions and
+# overlapping candidate sets skip the model entirely.
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """sentence-transformers CrossEncoder, loaded on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import CrossEncoder
+                _model = CrossEncoder(settings.RERANK_MODEL, max_length=settings.RERANK_MAX_LENGTH, device="cpu")
+    return _model
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+class ScoreCache:
+    """Thread-safe LRU of cross-encoder scores keyed by (normalized query, passage hash)"""
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, text: str) -> Tuple[str, str]:
+        return _normalize_query(query), hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def put(self, key: Tuple[str, str], score: float):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+
+score_cache = ScoreCache(settings.RERANK_CACHE_SIZE)
+
+
+def rerank_nodes(query: str, nodes: List, top_n: int) -> List:
+    """
+    Reorder retrieved NodeWithScore items by cross-encoder relevance and keep top_n.
+
+    Blocking (model inference): call it from the blocking executor.
+    """
+    if not nodes:
+        return []
+
+    texts = [item.node.get_content() for item in nodes]
+    keys = [score_cache.key(query, text) for text in texts]
+    scores = [score_cache.get(key) for key in keys]
+
+    missing = [index for index, score in enumerate(scores) if score is None]
+    if missing:
+        # All uncached pairs go through the model in one batched call
+        predicted = get_cross_encoder().predict(
+            [(query, texts[index]) for index in missing],
+            batch_size=settings.RERANK_BATCH_SIZE,
+            show_progress_bar=False,
+        )
+        for index, score in zip(missing, predicted):
+            scores[index] = float(score)
+            score_cache.put(keys[index], scores[index])
+
+    ranked = sorted(zip(nodes, scores), key=lambda pair: pair[1], reverse=True)[:top_n]
+    for item, score in ranked:
+        item.score = score
+    logger.debug("Reranked candidates", extra={"fields": {"candidates": len(nodes), "scored": len(missing)}})
+    return [item for item, _ in ranked]
@@ -1,6 +1,5 @@
 from datetime import date, time
 import json
-from llama_index.tools.tavily_research import TavilyToolSpec
 from llama_index.core.tools import FunctionTool
 from llama_index.core.vector_stores import (
     VectorStoreInfo,
@@ -11,15 +10,13 @@ from llama_index.core.vector_stores import (
     FilterOperator,
 )
 from typing import List, Dict, Any, Optional
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta, timezone
 from pydantic import BaseModel
 from llama_index.core.retrievers import VectorIndexRetriever
 from llama_index.core.query_engine import RetrieverQueryEngine
-from llama_index.llms.openai import OpenAI
 from llama_index.core.retrievers import VectorIndexAutoRetriever
 from llama_index.core import Settings
 import weaviate
-from llama_index.core.agent import FunctionCallingAgent
 from app.db.prisma_client import prisma  # Import your prisma client
 
 
@@ -27,28 +24,39 @@ from fastapi import Depends
 from llama_index.core import Settings
 import csv
 from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
-from llama_index.vector_stores.weaviate import WeaviateVectorStore
 from IPython.display import Markdown, display
 from fastapi import Depends
 from typing import List, Tuple, Any
 from pydantic import BaseModel, Field
-import datetime
 import yaml
 import os
 # core/ai/tools/tools.py
 from llm_integration.embedding_client import get_embed_model
-from llm_integration.weaviate_client import get_weaviate_client
+from app.vector.store import get_vector_store
 from llm_integration.openai_client import get_llmRetriever
+from llm_integration.tavily_client import get_tavily_client
 from llama_index.core.response.notebook_utils import display_source_node
-from app.db.prisma_client import prisma
+from app.db.prisma_client import prisma, count_by
+from app.chatbot.tools.compact import encode_tool_results, clip
+from app.chatbot.tools.availability import find_available_tours, party_size
+from app.chatbot.tools.dates import parse_date_range, strip_phrase
+from app.chatbot.tools.gazetteer import gazetteer, place_filters as build_place_filters
+from app.chatbot.executor import run_blocking
+from app.chatbot.tools.rerank import rerank_nodes
+from app.chatbot.tools.auto_retriever import CachedVectorIndexAutoRetriever
+from app.config import settings
+from app.monitoring.tracing import span
+from app.chatbot.database.chat_memory_service import search_chat_memory
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 Settings.embed_model = get_embed_model()
 
 # hardcode top k for now
 top_k = 4
 
-client = get_weaviate_client()
-
 # define vector store info describing schema of vector store
 vector_store_info = VectorStoreInfo(
     content_info="Chứa những thông tin về các địa điểm, tips, các địa điểm ở Việt Nam",
@@ -85,29 +93,64 @@ vector_store_info = VectorStoreInfo(
 )
 
 
-def RetrieveDataTool(query: str = None, embed_model = Depends(get_embed_model)) :
-    """
-    Hàm truy vấn thông tin về các địa điểm du lịch ở Việt Nam từ cơ sở dữ liệu vector store Weaviate.
-    """
-    # Define the vector store
+_loaded_index = None
+
+
+def get_loaded_index():
+    """VectorStoreIndex over the VietnamTourism collection (VECTOR_BACKEND), built once per process"""
+    global _loaded_index
+    if _loaded_index is None:
+        _loaded_index = VectorStoreIndex.from_vector_store(get_vector_store("VietnamTourism"))
+    return _loaded_index
 
-    vector_store = WeaviateVectorStore(
-        weaviate_client=client, index_name="VietnamTourism", text_key="content"
-    )
 
-    loaded_index = VectorStoreIndex.from_vector_store(vector_store)
+def format_retrieved_nodes(nodes) -> str:
+    """Format retrieved nodes as numbered lines with text, source and date"""
+    formatted_strings = []
     
-    """Auto retrieval function.
+    for i, item in enumerate(nodes):
+        text = item.text
+        source = (item.metadata.get("source") or item.metadata.get("src_url") or "no source")# Lấy source từ metadata
+        date = item.metadata.get("date", "no date")       # Lấy date từ metadata
+        
+        # Định dạng chuỗi
+        formatted_string = f"{i + 1}. {text} (Source: {source}, Updated date: {date})"
+        formatted_strings.append(formatted_string)
 
-    Performs auto-retrieval from a vector database, and then applies a set of filters.
+    # Kết quả là danh sách các chuỗi định dạng
+    return "\n".join(formatted_strings)
+
+
+async def RetrieveDataTool(query: str = None) -> str:
+    """
+    Hàm truy vấn thông tin về các địa điểm du lịch ở Việt Nam từ vector store (Weaviate hoặc pgvector, theo VECTOR_BACKEND).
 
+    Performs auto-retrieval from a vector database, and then applies a set of filters.
     """
     query = query or "Query"
 
+    if settings.RETRIEVAL_MODE == "rerank":
+        # No filter-inference LLM call: over-fetch with hybrid search, rerank locally
+        retriever = VectorIndexRetriever(
+            get_loaded_index(),
+            vector_store_query_mode="hybrid",
+            alpha=0.4,
+            similarity_top_k=settings.RERANK_CANDIDATES,
+        )
+
+        def retrieve_and_rerank():
+            candidates = retriever.retrieve(query)
+            with span("rerank", candidates=len(candidates)):
+                return rerank_nodes(query, candidates, top_k)
+
+        response = await run_blocking(retrieve_and_rerank)
+        return format_retrieved_nodes(response)
+
     llm = get_llmRetriever()
     
-    retriever = VectorIndexAutoRetriever(
-        loaded_index,
+    # Filter inference is skipped for queries without filter cues and memoized otherwise
+    retriever = CachedVectorIndexAutoRetriever(
+        get_loaded_index(),
         vector_store_info=vector_store_info,
         llm = llm,
         vector_store_query_mode="hybrid", 
@@ -116,40 +159,50 @@ def RetrieveDataTool(query: str = None, embed_model = Depends(get_embed_model))
         enable_reranking=True,
     )
 
-    response = retriever.retrieve(query)
+    # The query is embedded with the local model and searched through the sync
+    # vector store API: run it on the blocking executor, not on the event loop
+    response = await run_blocking(retriever.retrieve, query)
         
-    # Format response as a string with text, source, and date
+    return format_retrieved_nodes(response)
+
+
+async def RetrieveInternetTool(query: str) -> str:
+    """
+    Tìm kiếm thông tin trên internet
+    """
+    # Search Tavily directly: no nested agent, no extra LLM round trip
+    response = await get_tavily_client().search(query, max_results=5)
+
     formatted_strings = []
-    
-    for i, item in enumerate(response):
-        text = item.text
-        source = (item.metadata.get("source") or item.metadata.get("src_url") or "no source")# Lấy source từ metadata
-        date = item.metadata.get("date", "no date")       # Lấy date từ metadata
-        
-        # Định dạng chuỗi
-        formatted_string = f"{i + 1}. {text} (Source: {source}, Updated date: {date})"
-        formatted_strings.append(formatted_string)
+    for i, item in enumerate(response.get("results", [])):
+        content = clip(item.get("content"), 500)
+        formatted_strings.append(f"{i + 1}. {item.get('title', '')}: {content} (Source: {item.get('url', 'no source')})")
+
+    return "\n".join(formatted_strings) or "No results"
 
-    # Kết quả là danh sách các chuỗi định dạng
-    result = "\n".join(formatted_strings)
-    
-    # write_to_next_empty_row(["RetrieveLifeBloodTool", result])
-    return result
 
 
-def RetrieveInternetTool(query: str) :
+async def RetrieveChatMemoryTool(query: str, user_id: str, exclude_session_id: Optional[str] = None) -> str:
     """
-    Tìm kiếm thông tin trên internet
+    Tìm lại các tin nhắn cũ của chính người dùng (các phiên chat trước) theo độ tương đồng
+
+    Args:
+        query: Nội dung cần nhớ lại, vd: "tour bạn gợi ý tuần trước"
+        user_id: ID của người dùng, kết quả chỉ gồm tin nhắn của người này
+        exclude_session_id: Bỏ qua phiên hiện tại (đã có trong lịch sử chat)
     """
-    tavily_tool = TavilyToolSpec(
-        api_key=os.environ["TAVILY_API_KEY"],
-    )
-    agent = FunctionCallingAgent.from_tools(
-        tavily_tool.to_tool_list(),
-        llm=OpenAI(model="gpt-4o-mini", temperature=0.1, api_key=os.environ["OPENAI_API_KEY"], verbose=True),
-    )
-    return agent.chat(query)
+    try:
+        rows = await search_chat_memory(user_id, query, k=top_k + 2, exclude_session_id=exclude_session_id)
+    except Exception as e:
+        logger.exception("Chat memory search failed")
+        return f"error: Chat memory search failed: {e}"
 
+    lines = []
+    for row in rows:
+        speaker = "customer" if row["role"] == "USER" else "assistant"
+        day = str(row["createdAt"])[:10]
+        lines.append(f"[{day}] {speaker}: {clip(row['content'], 400)}")
+    return "\n".join(lines) or "No results"
 
 
 class DatabaseQuery(BaseModel):
@@ -198,7 +251,7 @@ async def RetrieveDatabaseTool(
     user_id: Optional[str] = None,
     entity_type: Optional[str] = None,
     limit: int = 10
-) -> List[Dict[str, Any]]:
+) -> str:
     """
     Truy vấn cơ sở dữ liệu để lấy thông tin về trips, events, tours, agencies, locations, etc.
     
@@ -213,7 +266,7 @@ async def RetrieveDatabaseTool(
         limit: Số lượng kết quả tối đa
     
     Returns:
-        List[Dict]: Danh sách các kết quả truy vấn
+        str: Bảng kết quả rút gọn, mỗi dòng được đánh dấu bằng một id ngắn (vd: TO1)
     """
     
     # Parse query to determine intent and entity type
@@ -222,28 +275,45 @@ async def RetrieveDatabaseTool(
     if not entity_type:
         entity_type = parsed_intent.get('entity_type', 'trip')
     
-    # Build datetime filters
-    datetime_filters = build_datetime_filters(
-        filter_start_date, filter_start_time,
-        filter_end_date, filter_end_time
-    )
+    # A date phrase in the question ("tháng 7", "cuối tuần này", "Tết") is resolved
+    # locally and wins over dates the model filled in; the phrase itself is dropped
+    # from the text search since no name or description contains it, and a rest of
+    # only stop words ("sự kiện nào vào tháng 7?") searches no text at all
+    date_range = parse_date_range(query)
+    if date_range:
+        start_datetime, end_datetime = date_range.to_datetimes()
+        datetime_filters = {'start_datetime': start_datetime, 'end_datetime': end_datetime}
+        query = strip_phrase(query, date_range.phrase)
+    else:
+        datetime_filters = build_datetime_filters(
+            _as_date(filter_start_date), _as_time(filter_start_time),
+            _as_date(filter_end_date), _as_time(filter_end_time)
+        )
+
+    # Place names resolve to Location rows / provinces through the in-memory gazetteer;
+    # when one is found the query filters on those columns instead of matching text
+    await gazetteer.ensure_fresh()
+    place_filters = build_place_filters(gazetteer.extract(query))
     
     try:
         if entity_type.lower() == 'trip':
-            return await retrieve_trips(query, user_id, datetime_filters, limit)
+            results = await retrieve_trips(query, user_id, datetime_filters, limit, place_filters)
         elif entity_type.lower() == 'event':
-            return await retrieve_events(query, user_id, datetime_filters, limit)
+            results = await retrieve_events(query, user_id, datetime_filters, limit, place_filters)
         elif entity_type.lower() == 'tour':
-            return await retrieve_tours(query, datetime_filters, limit)
+            results = await retrieve_tours(query, datetime_filters, limit, place_filters)
         elif entity_type.lower() == 'agency':
-            return await retrieve_agencies(query, limit)
+            results = await retrieve_agencies(query, limit)
         elif entity_type.lower() == 'location':
-            return await retrieve_locations(query, limit)
+            results = await retrieve_locations(query, limit, place_filters)
         else:
-            return await retrieve_general(query, user_id, datetime_filters, limit)
+            results = await retrieve_general(query, user_id, datetime_filters, limit, place_filters)
             
     except Exception as e:
-        return [{"error": f"Database query failed: {str(e)}"}]
+        results = [{"error": f"Database query failed: {str(e)}"}]
+
+    # Dense rows keyed by short ids instead of verbose dicts
+    return encode_tool_results(results)
 
 def parse_query_intent(query: str) -> Dict[str, Any]:
     """
@@ -266,6 +336,25 @@ def parse_query_intent(query: str) -> Dict[str, Any]:
     
     return {'entity_type': 'general'}
 
+def _as_date(value) -> Optional[date]:
+    """Tool arguments arrive as JSON strings ("2025-07-01"); unparseable values are ignored"""
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _as_time(value) -> Optional[time]:
+    if value is None or isinstance(value, time):
+        return value
+    try:
+        return time.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
 def build_datetime_filters(start_date, start_time, end_date, end_time):
     """
     Xây dựng bộ lọc datetime
@@ -282,7 +371,9 @@ def build_datetime_filters(start_date, start_time, end_date, end_time):
     
     return filters
 
-async def retrieve_trips(query: str, user_id: Optional[str], datetime_filters: Dict, limit: int) -> List[Dict]:
+async def retrieve_trips(
+    query: str, user_id: Optional[str], datetime_filters: Dict, limit: int, place_filters: Optional[Dict] = None
+) -> List[Dict]:
     """
     Truy vấn thông tin về trips sử dụng Prisma
     """
@@ -298,19 +389,27 @@ async def retrieve_trips(query: str, user_id: Optional[str], datetime_filters: D
                 }
             }
         
-        # Add datetime filters
+        # Add datetime filters: anything overlapping the range, so a festival
+        # running 28/6-3/7 is found for "tháng 7"
         if 'start_datetime' in datetime_filters:
-            where_conditions['startDate'] = {
+            where_conditions['endDate'] = {
                 'gte': datetime_filters['start_datetime']
             }
         
         if 'end_datetime' in datetime_filters:
-            where_conditions['endDate'] = {
+            where_conditions['startDate'] = {
                 'lte': datetime_filters['end_datetime']
             }
         
-        # Add text search
-        if query:
+        # Add place filters, or text search when the query names no known place
+        place_filters = place_filters or {}
+        if place_filters:
+            where_conditions['OR'] = []
+            if 'location_ids' in place_filters:
+                where_conditions['OR'].append({'locationId': {'in': place_filters['location_ids']}})
+            if 'provinces' in place_filters:
+                where_conditions['OR'].append({'location': {'province': {'in': place_filters['provinces']}}})
+        elif query:
             where_conditions['OR'] = [
                 {'name': {'contains': query, 'mode': 'insensitive'}},
                 {'description': {'contains': query, 'mode': 'insensitive'}},
@@ -319,24 +418,26 @@ async def retrieve_trips(query: str, user_id: Optional[str], datetime_filters: D
                 }}
             ]
         
-        # Execute Prisma query
+        # Execute Prisma query, participants are only counted so they are not included
         trips = await prisma.trip.find_many(
             where=where_conditions,
             include={
-                'location': True,
-                'participants': True
+                'location': True
             },
             order=[{'createdAt': 'desc'}],
             take=limit
         )
+        participant_counts = await count_by(prisma.tripparticipants, 'tripId', [trip.id for trip in trips])
         
-        return format_trip_results(trips)
+        return format_trip_results(trips, participant_counts)
         
     except Exception as e:
-        print(f"Error retrieving trips: {e}")
+        logger.error(f"Error retrieving trips: {e}")
         return []
 
-async def retrieve_events(query: str, user_id: Optional[str], datetime_filters: Dict, limit: int) -> List[Dict]:
+async def retrieve_events(
+    query: str, user_id: Optional[str], datetime_filters: Dict, limit: int, place_filters: Optional[Dict] = None
+) -> List[Dict]:
     """
     Truy vấn thông tin về events sử dụng Prisma
     """
@@ -345,25 +446,37 @@ async def retrieve_events(query: str, user_id: Optional[str], datetime_filters:
         
         # Add user filter through saved events
         if user_id:
-            where_conditions['saveEvents'] = {
+            where_conditions['user'] = {
                 'some': {
                     'userId': user_id
                 }
             }
         
-        # Add datetime filters
+        # Add datetime filters: anything overlapping the range, so a festival
+        # running 28/6-3/7 is found for "tháng 7"
         if 'start_datetime' in datetime_filters:
-            where_conditions['startDate'] = {
+            where_conditions['endDate'] = {
                 'gte': datetime_filters['start_datetime']
             }
         
         if 'end_datetime' in datetime_filters:
-            where_conditions['endDate'] = {
+            where_conditions['startDate'] = {
                 'lte': datetime_filters['end_datetime']
             }
         
-        # Add text search
-        if query:
+        # Add place filters, or text search when the query names no known place
+        place_filters = place_filters or {}
+        if place_filters:
+            where_conditions['OR'] = []
+            if 'location_ids' in place_filters:
+                where_conditions['OR'].append({'locations': {
+                    'some': {'locationId': {'in': place_filters['location_ids']}}
+                }})
+            if 'provinces' in place_filters:
+                where_conditions['OR'].append({'locations': {
+                    'some': {'location': {'province': {'in': place_filters['provinces']}}}
+                }})
+        elif query:
             where_conditions['OR'] = [
                 {'name': {'contains': query, 'mode': 'insensitive'}},
                 {'description': {'contains': query, 'mode': 'insensitive'}}
@@ -373,7 +486,7 @@ async def retrieve_events(query: str, user_id: Optional[str], datetime_filters:
         events = await prisma.event.find_many(
             where=where_conditions,
             include={
-                'eventLocation': {
+                'locations': {
                     'include': {
                         'location': True
                     }
@@ -386,18 +499,30 @@ async def retrieve_events(query: str, user_id: Optional[str], datetime_filters:
         return format_event_results(events)
         
     except Exception as e:
-        print(f"Error retrieving events: {e}")
+        logger.error(f"Error retrieving events: {e}")
         return []
 
-async def retrieve_tours(query: str, datetime_filters: Dict, limit: int) -> List[Dict]:
+async def retrieve_tours(query: str, datetime_filters: Dict, limit: int, place_filters: Optional[Dict] = None) -> List[Dict]:
     """
     Truy vấn thông tin về tours sử dụng Prisma
     """
+    if datetime_filters:
+        return await retrieve_available_tours(query, datetime_filters, limit, place_filters)
+
     try:
         where_conditions = {}
         
-        # Add text search
-        if query:
+        # Add place filters, or text search when the query names no known place
+        place_filters = place_filters or {}
+        if place_filters:
+            where_conditions['OR'] = []
+            if 'location_ids' in place_filters:
+                where_conditions['OR'].append({'locationId': {'in': place_filters['location_ids']}})
+            if 'provinces' in place_filters:
+                # Tours carry their own province; older ones only through their location
+                where_conditions['OR'].append({'province': {'in': place_filters['provinces']}})
+                where_conditions['OR'].append({'location': {'province': {'in': place_filters['provinces']}}})
+        elif query:
             where_conditions['OR'] = [
                 {'title': {'contains': query, 'mode': 'insensitive'}},
                 {'description': {'contains': query, 'mode': 'insensitive'}},
@@ -420,7 +545,49 @@ async def retrieve_tours(query: str, datetime_filters: Dict, limit: int) -> List
         return format_tour_results(tours)
         
     except Exception as e:
-        print(f"Error retrieving tours: {e}")
+        logger.error(f"Error retrieving tours: {e}")
+        return []
+
+async def retrieve_available_tours(
+    query: str, datetime_filters: Dict, limit: int, place_filters: Optional[Dict] = None
+) -> List[Dict]:
+    """
+    Tours có ngày khởi hành trong khoảng thời gian và còn đủ chỗ
+    """
+    try:
+        start = datetime_filters.get('start_datetime') or datetime.now(timezone.utc)
+        end = datetime_filters.get('end_datetime') or start + timedelta(days=365)
+        rows = await find_available_tours(
+            start, end, place_filters, query=query, seats=party_size(query), limit=limit
+        )
+        if not rows:
+            return []
+
+        tours = await prisma.tour.find_many(
+            where={'id': {'in': [row['tourId'] for row in rows]}},
+            include={
+                'agency': True,
+                'location': True
+            }
+        )
+        formatted = {tour['id']: tour for tour in format_tour_results(tours)}
+
+        results = []
+        for row in rows:
+            tour = formatted.get(row['tourId'])
+            if tour is None:
+                continue
+            start_dates = [str(value)[:10] for value in row['startDates']]
+            results.append({
+                **tour,
+                'start_dates': start_dates,
+                'next_departure': start_dates[0] if start_dates else None,
+                'seats_left': row['seatsLeft'],
+            })
+        return results
+
+    except Exception as e:
+        logger.error(f"Error retrieving available tours: {e}")
         return []
 
 async def retrieve_agencies(query: str, limit: int) -> List[Dict]:
@@ -436,56 +603,64 @@ async def retrieve_agencies(query: str, limit: int) -> List[Dict]:
                 {'description': {'contains': query, 'mode': 'insensitive'}}
             ]
         
-        # Execute Prisma query
+        # Execute Prisma query, tours are only counted so they are not included
         agencies = await prisma.agency.find_many(
             where=where_conditions,
-            include={
-                'tours': True
-            },
             order=[
                 {'verified': 'desc'},
                 {'createdAt': 'desc'}
             ],
             take=limit
         )
+        tour_counts = await count_by(prisma.tour, 'agencyId', [agency.id for agency in agencies])
         
-        return format_agency_results(agencies)
+        return format_agency_results(agencies, tour_counts)
         
     except Exception as e:
-        print(f"Error retrieving agencies: {e}")
+        logger.error(f"Error retrieving agencies: {e}")
         return []
 
-async def retrieve_locations(query: str, limit: int) -> List[Dict]:
+async def retrieve_locations(query: str, limit: int, place_filters: Optional[Dict] = None) -> List[Dict]:
     """
     Truy vấn thông tin về locations sử dụng Prisma
     """
     try:
         where_conditions = {}
         
-        if query:
+        # province is an enum, so it is matched through the gazetteer, never with `contains`
+        place_filters = place_filters or {}
+        if place_filters:
+            where_conditions['OR'] = []
+            if 'location_ids' in place_filters:
+                where_conditions['OR'].append({'id': {'in': place_filters['location_ids']}})
+            if 'provinces' in place_filters:
+                where_conditions['OR'].append({'province': {'in': place_filters['provinces']}})
+        elif query:
             where_conditions['OR'] = [
                 {'name': {'contains': query, 'mode': 'insensitive'}},
-                {'province': {'contains': query, 'mode': 'insensitive'}},
                 {'district': {'contains': query, 'mode': 'insensitive'}}
             ]
         
-        # Execute Prisma query
+        # Execute Prisma query, trips and tours are only counted so they are not included
         locations = await prisma.location.find_many(
             where=where_conditions,
-            include={
-                'trips': True,
-                'tours': True
-            },
             take=limit
         )
+        location_ids = [location.id for location in locations]
+        trip_counts, tour_counts = await asyncio.gather(
+            count_by(prisma.trip, 'locationId', location_ids),
+            count_by(prisma.tour, 'locationId', location_ids),
+        )
         
-        return format_location_results(locations)
+        return format_location_results(locations, trip_counts, tour_counts)
         
     except Exception as e:
-        print(f"Error retrieving locations: {e}")
+        logger.error(f"Error retrieving locations: {e}")
         return []
 
-async def retrieve_general(query: str, user_id: Optional[str], datetime_filters: Dict, limit: int) -> List[Dict]:
+async def retrieve_general(
+    query: str, user_id: Optional[str], datetime_filters: Dict, limit: int, place_filters: Optional[Dict] = None
+) -> List[Dict]:
     """
     Truy vấn tổng hợp từ nhiều bảng sử dụng Prisma
     """
@@ -494,24 +669,24 @@ async def retrieve_general(query: str, user_id: Optional[str], datetime_filters:
     
     try:
         # Search in trips
-        trip_results = await retrieve_trips(query, user_id, datetime_filters, per_type_limit)
+        trip_results = await retrieve_trips(query, user_id, datetime_filters, per_type_limit, place_filters)
         results.extend([{**item, 'type': 'trip'} for item in trip_results])
         
         # Search in events
-        event_results = await retrieve_events(query, user_id, datetime_filters, per_type_limit)
+        event_results = await retrieve_events(query, user_id, datetime_filters, per_type_limit, place_filters)
         results.extend([{**item, 'type': 'event'} for item in event_results])
         
         # Search in tours
-        tour_results = await retrieve_tours(query, datetime_filters, per_type_limit)
+        tour_results = await retrieve_tours(query, datetime_filters, per_type_limit, place_filters)
         results.extend([{**item, 'type': 'tour'} for item in tour_results])
         
         return results[:limit]
         
     except Exception as e:
-        print(f"Error in general retrieval: {e}")
+        logger.error(f"Error in general retrieval: {e}")
         return []
 
-def format_trip_results(trips) -> List[Dict]:
+def format_trip_results(trips, participant_counts: Optional[Dict[str, int]] = None) -> List[Dict]:
     """
     Format trip results for chatbot response
     """
@@ -528,7 +703,7 @@ def format_trip_results(trips) -> List[Dict]:
             'district': trip.location.district if trip.location else None,
             'hotel_name': trip.hotelName,
             'hotel_address': trip.hotelAddress,
-            'participants_count': len(trip.tripParticipants) if trip.tripParticipants else 0,
+            'participants_count': (participant_counts or {}).get(trip.id, 0),
             'type': 'trip'
         })
     return formatted
@@ -541,8 +716,8 @@ def format_event_results(events) -> List[Dict]:
     for event in events:
         # Get all location names
         locations = []
-        if event.eventLocations:
-            locations = [el.location.name for el in event.eventLocations if el.location]
+        if event.locations:
+            locations = [el.location.name for el in event.locations if el.location]
         
         formatted.append({
             'id': event.id,
@@ -589,7 +764,7 @@ def format_tour_results(tours) -> List[Dict]:
         })
     return formatted
 
-def format_agency_results(agencies) -> List[Dict]:
+def format_agency_results(agencies, tour_counts: Optional[Dict[str, int]] = None) -> List[Dict]:
     """
     Format agency results for chatbot response
     """
@@ -604,12 +779,16 @@ def format_agency_results(agencies) -> List[Dict]:
             'phone_number': agency.phoneNumber,
             'address': agency.address,
             'verified': agency.verified,
-            'total_tours': len(agency.tours) if agency.tours else 0,
+            'total_tours': (tour_counts or {}).get(agency.id, 0),
             'type': 'agency'
         })
     return formatted
 
-def format_location_results(locations) -> List[Dict]:
+def format_location_results(
+    locations,
+    trip_counts: Optional[Dict[str, int]] = None,
+    tour_counts: Optional[Dict[str, int]] = None
+) -> List[Dict]:
     """
     Format location results for chatbot response
     """
@@ -620,8 +799,8 @@ def format_location_results(locations) -> List[Dict]:
             'name': location.name,
             'province': location.province,
             'district': location.district,
-            'total_trips': len(location.trips) if location.trips else 0,
-            'total_tours': len(location.tours) if location.tours else 0,
+            'total_trips': (trip_counts or {}).get(location.id, 0),
+            'total_tours': (tour_counts or {}).get(location.id, 0),
             'type': 'location'
         })
     return formatted
@@ -664,8 +843,8 @@ async def test_database_tool():
                 entity_type=intent.get('entity_type'),
                 limit=5
             )
-            print(f"Results count: {len(results)}")
-            print("Sample result:", results[0] if results else "No results")
+            print(f"Results chars: {len(results)}")
+            print("Results:", results)
             print("---")
         except Exception as e:
             print(f"Error testing {test['query']}: {e}")
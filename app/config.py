@@ -20,6 +20,92 @@ class Settings(BaseSettings):
     APP_NAME: str
     ENVIRONMENT: str
 
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_SAMPLE_RATES: str = "DEBUG=0.05"  # per-level keep probability, e.g. "DEBUG=0.05,INFO=0.5"
+    LOG_REDACT_FIELDS: str = "message,content,prompt,history,question,response,email,name,raw"
+    LOG_QUEUE_SIZE: int = 10000
+
+    # /metrics with several workers: each writes a registry snapshot here and scrapes merge them.
+    # gunicorn.conf.py sets the directory; empty means single process, the worker's own registry.
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_SNAPSHOT_SECONDS: float = 5.0
+
+    # Chat admission control
+    CHAT_MAX_CONCURRENCY: int = 8  # agent runs executing at once
+    CHAT_MAX_QUEUE: int = 32  # requests allowed to wait for a slot
+    CHAT_PER_USER_INFLIGHT: int = 2  # running + queued requests per user
+    CHAT_MAX_QUEUE_WAIT_SECONDS: float = 30.0
+    BLOCKING_EXECUTOR_WORKERS: int = 4  # threads for embedding / sync vector store calls
+
+    # Local time zone for dates in prompts and date expressions in questions
+    TIMEZONE: str = "Asia/Ho_Chi_Minh"
+
+    # Shared state (sessions, counters, caches): "memory" for one process, "redis" for several workers
+    STATE_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CHAT_SESSION_TTL_SECONDS: int = 60 * 60 * 24
+
+    # Conversation memory: the last N messages go into the prompt verbatim, older ones into a rolling summary
+    CHAT_HISTORY_WINDOW: int = 4
+    CHAT_SUMMARY_MAX_WORDS: int = 200
+
+    # Request time budget: tools and optional steps shrink to fit, the answer keeps a reserve
+    CHAT_DEADLINE_SECONDS: float = 60.0
+    CHAT_ANSWER_RESERVE_SECONDS: float = 8.0
+    CHAT_EXPANSION_TIMEOUT_SECONDS: float = 6.0
+    CHAT_EXPANSION_MIN_BUDGET_SECONDS: float = 25.0
+
+    # Idempotency-Key on POST /chatbot/chat: responses are replayed to retries for the TTL
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+    IDEMPOTENCY_SWEEP_SECONDS: float = 60 * 60
+    IDEMPOTENCY_POLL_SECONDS: float = 0.5
+
+    # Small talk and general FAQs skip the tool-calling agent (see app.chatbot.routing)
+    CHAT_ROUTING_ENABLED: bool = True
+
+    # Agent loop: tool calls of one turn run concurrently, each under its own timeout
+    AGENT_MAX_ITERATIONS: int = 5
+    TOOL_TIMEOUT_SECONDS: float = 20.0
+    TOOL_TIMEOUTS: str = "internet_search=12,attraction_tourisms_and_events_in_vietnam=15,events_tours=8,past_conversations=5"
+
+    # Place names in questions are resolved by an in-memory gazetteer of Location rows and provinces
+    GAZETTEER_REFRESH_SECONDS: float = 300.0  # reload changed Location rows at most this often
+
+    # External dependencies (openai, tavily, weaviate): client timeouts and circuit breakers.
+    # A breaker opens when, over the window, the error rate or the share of slow calls is too high.
+    OPENAI_TIMEOUT_SECONDS: float = 30.0
+    OPENAI_MAX_RETRIES: int = 1
+    TAVILY_TIMEOUT_SECONDS: float = 10.0
+    WEAVIATE_QUERY_TIMEOUT_SECONDS: float = 10.0
+    BREAKER_WINDOW_SECONDS: float = 60.0
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_ERROR_RATE: float = 0.5
+    BREAKER_SLOW_CALL_RATE: float = 0.8
+    BREAKER_SLOW_CALL_SECONDS: str = "openai=15,tavily=8,weaviate=5"
+    BREAKER_RESET_SECONDS: float = 30.0
+
+    # Knowledge-base vector store: "weaviate" (cloud) or "pgvector" (our Postgres)
+    VECTOR_BACKEND: str = "weaviate"
+    # Filtered HNSW scans: candidate list size and iterative scans ("off" for pgvector < 0.8)
+    PGVECTOR_EF_SEARCH: int = 100
+    PGVECTOR_ITERATIVE_SCAN: str = "strict_order"
+    # "auto": LLM infers metadata filters (VectorIndexAutoRetriever)
+    # "rerank": hybrid over-fetch + local cross-encoder, no LLM call
+    RETRIEVAL_MODE: str = "auto"
+    RERANK_MODEL: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # multilingual, covers Vietnamese
+    RERANK_CANDIDATES: int = 20
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_CACHE_SIZE: int = 20000
+
+    # Background jobs (chat titles, counters, summaries)
+    JOB_WORKERS: int = 2
+    JOB_POLL_SECONDS: float = 5.0
+    JOB_LEASE_SECONDS: float = 120.0  # RUNNING jobs older than this are retried
+    JOB_MAX_ATTEMPTS: int = 5
+
     class Config:
         env_file = ".env"  # Pydantic will automatically load variables from the .env file
 
@@ -264,11 +264,22 @@ class DashboardAnalytics:
                 for date, count in date_counts.items()
             ]
             daily_chats.sort(key=lambda x: x['date'])
+
+            # Per-day sessions and messages kept up to date by the chat_volume job
+            daily_stats = await prisma.chatdailystat.find_many(
+                order={'date': 'desc'},
+                take=90
+            )
+            daily_volume = [
+                {'date': stat.date.date(), 'sessions': stat.sessions, 'messages': stat.messages}
+                for stat in reversed(daily_stats)
+            ]
             
             return {
                 'total_sessions': total_sessions,
                 'total_messages': total_messages,
                 'avg_messages': round(avg_messages, 2),
                 'top_users': top_users,
-                'daily_chats': daily_chats
+                'daily_chats': daily_chats,
+                'daily_volume': daily_volume
             }
\ No newline at end of file
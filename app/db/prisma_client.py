@@ -1,8 +1,12 @@
+import logging
 from contextlib import asynccontextmanager
+from typing import Dict, List
 from prisma import Prisma
 
 prisma = Prisma()
 
+logger = logging.getLogger(__name__)
+
 async def initialize_prisma():
     await prisma.connect()
 
@@ -17,14 +21,14 @@ async def get_prisma():
         try:
             await prisma.connect()
         except Exception as e:
-            print(f"[Prisma] Reconnection error: {e}")
+            logger.error(f"[Prisma] Reconnection error: {e}")
             raise
 
     try:
         # Test connection with a lightweight query (optional, more reliable)
         await prisma.execute_raw('SELECT 1')
     except Exception as e:
-        print(f"[Prisma] Lost connection, reconnecting...: {e}")
+        logger.error(f"[Prisma] Lost connection, reconnecting...: {e}")
         await prisma.connect()
 
     try:
@@ -32,3 +36,28 @@ async def get_prisma():
     finally:
         # Keep the connection open for re-use
         pass
+
+
+async def count_by(actions, field: str, ids: List[str], where: Dict = None) -> Dict[str, int]:
+    """
+    Relation count aggregate: number of rows of a model per value of a foreign key.
+
+    Runs one grouped COUNT instead of hydrating the related rows, e.g.
+    count_by(prisma.tour, 'locationId', location_ids) -> {location_id: tours}
+    """
+    if not ids:
+        return {}
+
+    rows = await actions.group_by(
+        by=[field],
+        where={**(where or {}), field: {'in': list(ids)}},
+        count=True,
+    )
+
+    counts = {}
+    for row in rows:
+        count = row.get('_count', 0)
+        if isinstance(count, dict):
+            count = count.get('_all', 0)
+        counts[row[field]] = count
+    return counts
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from prisma.errors import UniqueViolationError
+
+from app.db.prisma_client import prisma
+from app.monitoring.metrics import get_registry
+from app.monitoring.tracing import start_trace
+
+# In-process background job queue backed by the BackgroundJob table.
+# Request handlers enqueue work (chat titles, counters, summaries, ...) and
+# return right away; worker tasks on the event loop pick due jobs up, run the
+# registered handler and retry failures with exponential backoff. Jobs are rows
+# in Postgres, so they survive restarts and any worker process can claim them:
+# a job is claimed by flipping PENDING -> RUNNING with a conditional update, so
+# two workers never run the same job. Jobs stuck in RUNNING (the process died
+# mid-run) are handed back after a lease expires.
+# A job enqueued with a dedupe key is stored at most once per key (unique
+# column): every worker process may schedule the same periodic job for the same
+# period and exactly one row results.
+
+logger = logging.getLogger(__name__)
+registry = get_registry()
+
+jobs_enqueued = registry.counter("jobs_enqueued_total", "Background jobs enqueued", labelnames=("type",))
+jobs_finished = registry.counter(
+    "jobs_finished_total", "Background job runs by outcome", labelnames=("type", "outcome")
+)
+job_duration = registry.histogram(
+    "job_duration_seconds", "Background job run time", labelnames=("type",)
+)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register_job(job_type: str):
+    """Register the coroutine that runs jobs of job_type; it receives the decoded payload"""
+    def decorator(fn: JobHandler) -> JobHandler:
+        _handlers[job_type] = fn
+        return fn
+    return decorator
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """Polls the BackgroundJob table and runs due jobs on a few worker tasks"""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        poll_interval: float = 5.0,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 5,
+        base_backoff: float = 2.0,
+        max_backoff: float = 300.0
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    # ---------- Producer side ----------
+
+    def _row(self, job_type: str, payload: Dict[str, Any], run_at: datetime, dedupe_key: Optional[str]) -> Dict[str, Any]:
+        if job_type not in _handlers:
+            logger.warning("Enqueued job has no registered handler", extra={"fields": {"type": job_type}})
+        return {
+            'type': job_type,
+            'payload': json.dumps(payload, default=str),
+            'maxAttempts': self.max_attempts,
+            'runAt': run_at,
+            'dedupeKey': dedupe_key,
+        }
+
+    def _wake(self, delay: float):
+        if self._wakeup is not None and delay <= 0:
+            self._wakeup.set()
+
+    async def enqueue(
+        self, job_type: str, payload: Dict[str, Any], delay: float = 0.0, dedupe_key: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Persist a job and wake a local worker; returns the job id (None if it could
+        not be stored, or a job with the same dedupe key already exists)
+        """
+        try:
+            job = await prisma.backgroundjob.create(
+                data=self._row(job_type, payload, _utcnow() + timedelta(seconds=delay), dedupe_key)
+            )
+        except UniqueViolationError:
+            logger.debug("Job already enqueued", extra={"fields": {"type": job_type, "dedupe_key": dedupe_key}})
+            return None
+        except Exception:
+            # Background work must never fail the request that produced it
+            logger.exception("Failed to enqueue background job", extra={"fields": {"type": job_type}})
+            return None
+        jobs_enqueued.inc(type=job_type)
+        self._wake(delay)
+        return job.id
+
+    async def enqueue_many(self, jobs: List[tuple], delay: float = 0.0) -> int:
+        """
+        Persist several (job_type, payload) or (job_type, payload, dedupe_key)
+        tuples with one INSERT; returns how many were stored (jobs whose dedupe
+        key already exists are skipped)
+        """
+        if not jobs:
+            return 0
+        run_at = _utcnow() + timedelta(seconds=delay)
+        rows = [
+            self._row(job_type, payload, run_at, dedupe[0] if dedupe else None)
+            for job_type, payload, *dedupe in jobs
+        ]
+        try:
+            created = await prisma.backgroundjob.create_many(data=rows, skip_duplicates=True)
+        except Exception:
+            logger.exception("Failed to enqueue background jobs")
+            return 0
+        for row in rows:
+            # Skipped rows can only be deduplicated ones
+            if created == len(rows) or not row['dedupeKey']:
+                jobs_enqueued.inc(type=row['type'])
+        if created:
+            self._wake(delay)
+        return created
+
+    # ---------- Lifecycle ----------
+
+    def start(self):
+        """Start the worker tasks on the running event loop"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(index), name=f"job-worker-{index}")
+            for index in range(self.workers)
+        ]
+        logger.info("Job queue started", extra={"fields": {"workers": self.workers}})
+
+    async def stop(self, timeout: float = 10.0):
+        """Let running jobs finish (up to timeout) and stop the workers"""
+        if not self._tasks:
+            return
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        # Cancelled jobs stay RUNNING and are picked up again once the lease expires
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        logger.info("Job queue stopped")
+
+    # ---------- Consumer side ----------
+
+    async def _worker(self, index: int):
+        # Spread the first polls so workers of several processes don't move in lockstep
+        await asyncio.sleep(random.uniform(0, min(self.poll_interval, 1.0)))
+        while not self._stopping:
+            try:
+                if index == 0:
+                    await self._release_expired_leases()
+                job = await self._claim_next()
+            except Exception:
+                logger.exception("Job queue poll failed")
+                job = None
+
+            if job is not None:
+                await self._run(job)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            if not self._stopping:
+                self._wakeup.clear()
+
+    async def _claim_next(self):
+        """Atomically move the oldest due PENDING job to RUNNING; None when nothing is due"""
+        candidates = await prisma.backgroundjob.find_many(
+            where={'status': 'PENDING', 'runAt': {'lte': _utcnow()}},
+            order={'runAt': 'asc'},
+            take=self.workers * 2
+        )
+        for job in candidates:
+            claimed = await prisma.backgroundjob.update_many(
+                where={'id': job.id, 'status': 'PENDING'},
+                data={'status': 'RUNNING', 'attempts': job.attempts + 1}
+            )
+            if claimed:
+                job.attempts += 1
+                return job
+        return None
+
+    async def _release_expired_leases(self):
+        """Hand jobs left RUNNING by a dead process back to the queue"""
+        expired_before = _utcnow() - timedelta(seconds=self.lease_seconds)
+        released = await prisma.backgroundjob.update_many(
+            where={'status': 'RUNNING', 'updatedAt': {'lt': expired_before}},
+            data={'status': 'PENDING'}
+        )
+        if released:
+            logger.warning("Released expired job leases", extra={"fields": {"count": released}})
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self, job):
+        handler = _handlers.get(job.type)
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job type {job.type!r}")
+            with start_trace(f"job.{job.type}", job_id=job.id, attempt=job.attempts):
+                await asyncio.wait_for(handler(json.loads(job.payload)), timeout=self.lease_seconds)
+        except Exception as e:
+            outcome = 'failed' if job.attempts >= job.maxAttempts or handler is None else 'retry'
+            data = {'lastError': f"{type(e).__name__}: {e}"[:1000]}
+            if outcome == 'failed':
+                data['status'] = 'FAILED'
+            else:
+                data['status'] = 'PENDING'
+                data['runAt'] = _utcnow() + timedelta(seconds=self._backoff(job.attempts))
+            logger.warning(
+                "Background job failed",
+                exc_info=True,
+                extra={"fields": {"job_id": job.id, "type": job.type, "attempt": job.attempts, "outcome": outcome}}
+            )
+            await self._finish(job, data)
+        else:
+            outcome = 'succeeded'
+            await self._finish(job, {'status': 'SUCCEEDED', 'lastError': None})
+        jobs_finished.inc(type=job.type, outcome=outcome)
+        job_duration.observe(time.perf_counter() - started, type=job.type)
+
+    async def _finish(self, job, data: Dict[str, Any]):
+        try:
+            await prisma.backgroundjob.update(where={'id': job.id}, data=data)
+        except Exception:
+            # The lease sweep will retry the job if the status could not be written
+            logger.exception("Failed to record job outcome", extra={"fields": {"job_id": job.id}})
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue configured from settings"""
+    global _queue
+    if _queue is None:
+        from app.config import settings
+        _queue = JobQueue(
+            workers=settings.JOB_WORKERS,
+            poll_interval=settings.JOB_POLL_SECONDS,
+            lease_seconds=settings.JOB_LEASE_SECONDS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+        )
+    return _queue
+
+
+async def enqueue(
+    job_type: str, payload: Dict[str, Any], delay: float = 0.0, dedupe_key: Optional[str] = None
+) -> Optional[str]:
+    return await get_job_queue().enqueue(job_type, payload, delay=delay, dedupe_key=dedupe_key)
+
+
+async def enqueue_many(jobs: List[tuple], delay: float = 0.0) -> int:
+    return await get_job_queue().enqueue_many(jobs, delay=delay)
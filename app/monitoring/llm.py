@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMChatStartEvent,
+    LLMCompletionEndEvent,
+    LLMCompletionStartEvent,
+)
+
+from app.monitoring.tracing import close_span, discard_span, get_current_span, get_current_trace, open_span, Span
+
+# Turns LlamaIndex LLM events into "llm" spans carrying token usage, nested
+# under whatever stage (query expansion, agent, tool) triggered the call, and
+# exported through OpenTelemetry like every other span.
+
+_START_EVENTS = (LLMChatStartEvent, LLMCompletionStartEvent)
+_END_EVENTS = (LLMChatEndEvent, LLMCompletionEndEvent)
+
+# LlamaIndex span id -> open llm span, oldest first. Calls that fail never send
+# an end event, so past _MAX_PENDING the oldest spans are given up on; calls
+# still in flight keep theirs.
+_pending: "OrderedDict[str, Span]" = OrderedDict()
+_pending_lock = threading.Lock()
+_MAX_PENDING = 1024
+
+
+def extract_token_usage(response: Any) -> Tuple[int, int]:
+    """Read prompt/completion tokens from an OpenAI raw response object or dict"""
+    raw = getattr(response, "raw", None)
+    if raw is None:
+        return 0, 0
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+
+class ChatTraceEventHandler(BaseEventHandler):
+    """Records every LLM call as an `llm` span of the current request trace"""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ChatTraceEventHandler"
+
+    def handle(self, event, **kwargs) -> Optional[Any]:
+        if isinstance(event, _START_EVENTS):
+            trace = get_current_trace()
+            parent = get_current_span()
+            if trace is None:
+                return None
+            model = getattr(event, "model_dict", {}) or {}
+            llm_span = open_span(trace, "llm", parent, model=model.get("model", ""))
+            with _pending_lock:
+                _pending[event.span_id] = llm_span
+                stale = [_pending.popitem(last=False)[1] for _ in range(len(_pending) - _MAX_PENDING)]
+            for abandoned in stale:
+                discard_span(abandoned, "no_end_event")
+        elif isinstance(event, _END_EVENTS):
+            with _pending_lock:
+                llm_span = _pending.pop(event.span_id, None)
+            if llm_span is None:
+                return None
+            prompt_tokens, completion_tokens = extract_token_usage(event.response)
+            llm_span.add_tokens(prompt_tokens, completion_tokens)
+            close_span(llm_span)
+        return None
+
+
+_installed = False
+
+
+def install_llm_tracing():
+    """Register the event handler on the root LlamaIndex dispatcher (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    get_dispatcher().add_event_handler(ChatTraceEventHandler())
+    _installed = True
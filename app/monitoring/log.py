@@ -0,0 +1,193 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Optional
+
+from app.monitoring.metrics import get_registry
+from app.monitoring.tracing import get_current_trace
+
+# Structured logging for the whole app, configured once from Settings.
+# Records are JSON, user content is redacted, low levels are sampled and the
+# actual write to stdout happens on a background thread behind a bounded queue
+# so request handlers never block on I/O.
+
+dropped_records = get_registry().counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+)
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "fields", "color_message"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; structured data goes in extra={'fields': {...}}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            payload["trace_id"] = trace_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key != "trace_id" and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class TraceContextFilter(logging.Filter):
+    """Attach the current request trace id; must run on the caller's thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = get_current_trace()
+        record.trace_id = trace.trace_id if trace else None
+        return True
+
+
+class RedactionFilter(logging.Filter):
+    """Replace user content fields with their length so nothing personal reaches the log pipeline"""
+
+    def __init__(self, fields: Iterable[str]):
+        super().__init__()
+        self.fields = {field.lower() for field in fields}
+
+    def _redact(self, value: Any) -> Any:
+        if value is None:
+            return None
+        return f"<redacted len={len(str(value))}>"
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            record.fields = {
+                key: self._redact(value) if key.lower() in self.fields else value
+                for key, value in fields.items()
+            }
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a level's records with the configured probability (warnings and above are never sampled)"""
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep structured attributes; only freeze the message and exception text
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """Parse 'DEBUG=0.05,INFO=0.5' into {logging.DEBUG: 0.05, logging.INFO: 0.5}"""
+    rates = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        level, rate = part.split("=", 1)
+        levelno = logging.getLevelName(level.strip().upper())
+        if isinstance(levelno, int):
+            rates[levelno] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+_output: Optional[logging.Handler] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_format: bool = True,
+    sample_rates: str = "",
+    redact_fields: Iterable[str] = (),
+    queue_size: int = 10000,
+):
+    """Install the queue handler on the root logger and start the writer thread (idempotent)"""
+    global _listener, _handler, _output
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if json_format:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s %(fields)s", defaults={"fields": ""}))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+    handler.addFilter(RedactionFilter(redact_fields))
+    handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    # uvicorn configures its own handlers; route them through the queue as well
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _handler, _output = handler, output
+    _listener = QueueListener(handler.queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    # The writer thread does not survive fork (gunicorn preload): restart it in workers
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def _restart_after_fork():
+    global _listener
+    if _handler is None or _listener is None:
+        return
+    _handler.queue = queue.Queue(maxsize=_handler.queue.maxsize)
+    _listener = QueueListener(_handler.queue, _output, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush the queue and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,108 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.monitoring.metrics import get_registry, merge_snapshots
+
+# /metrics across gunicorn workers.
+# Every worker process has its own Registry, so a scrape answered by one worker
+# only saw that worker's requests. With METRICS_MULTIPROC_DIR set (gunicorn.conf.py
+# sets it), each worker writes a JSON snapshot of its registry to <dir>/<pid>.json
+# every METRICS_SNAPSHOT_SECONDS and before answering a scrape, and /metrics
+# merges every snapshot in the directory: counters and histograms are summed,
+# gauges get one series per live worker (label worker="<pid>").
+# gunicorn's child_exit hook renames an exited worker's file to <pid>.dead.json:
+# its counters keep counting in the totals, its gauges are dropped.
+
+logger = logging.getLogger(__name__)
+
+DEAD_SUFFIX = ".dead.json"
+
+_task: Optional[asyncio.Task] = None
+
+
+def enabled() -> bool:
+    return bool(settings.METRICS_MULTIPROC_DIR)
+
+
+def _path(pid: int) -> str:
+    return os.path.join(settings.METRICS_MULTIPROC_DIR, f"{pid}.json")
+
+
+def write_snapshot():
+    """Publish this worker's registry; written to a temp file and renamed, so readers never see half of it"""
+    path = _path(os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(get_registry().snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _read_snapshots() -> List[Tuple[str, dict, bool]]:
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, "*.json")):
+        name = os.path.basename(path)
+        alive = not name.endswith(DEAD_SUFFIX)
+        worker = name[:-len(".json")] if alive else name[:-len(DEAD_SUFFIX)]
+        try:
+            with open(path) as f:
+                snapshots.append((worker, json.load(f), alive))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping metrics snapshot {name}: {e}")
+    return snapshots
+
+
+def render() -> str:
+    """The exposition text for /metrics: this worker alone, or every worker merged"""
+    if not enabled():
+        return get_registry().render()
+    write_snapshot()
+    return merge_snapshots(_read_snapshots()).render()
+
+
+def mark_dead(pid: int):
+    """Called by gunicorn's child_exit hook in the master"""
+    path = _path(pid)
+    if os.path.exists(path):
+        os.replace(path, path[:-len(".json")] + DEAD_SUFFIX)
+
+
+def clear():
+    """Drop snapshots left by a previous run; called by the master before forking workers"""
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, "*.json*")):
+        os.remove(path)
+
+
+async def _snapshot_loop():
+    while True:
+        await asyncio.sleep(settings.METRICS_SNAPSHOT_SECONDS)
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.error(f"Metrics snapshot failed: {e}")
+
+
+def start():
+    global _task
+    if enabled() and _task is None:
+        os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+        write_snapshot()
+        _task = asyncio.create_task(_snapshot_loop(), name="metrics-snapshot")
+
+
+async def stop():
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+    write_snapshot()  # the final counts, kept once child_exit marks the file dead
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.monitoring import multiprocess
+from app.resilience.dependencies import dependency_status
+
+router = APIRouter(tags=["monitoring"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint; merges every gunicorn worker's metrics"""
+    return PlainTextResponse(
+        multiprocess.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get("/status/dependencies")
+async def dependencies():
+    """Circuit breaker state, recent error rate and latency of OpenAI, Tavily and Weaviate"""
+    status = dependency_status()
+    return {
+        "degraded": any(entry["state"] != "closed" for entry in status.values()),
+        "dependencies": status,
+    }
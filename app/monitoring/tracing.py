@@ -0,0 +1,230 @@
+import functools
+import inspect
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from app.monitoring.metrics import get_registry
+
+# Request-scoped tracing of the chat pipeline.
+# Every request gets a Trace; stages open nested spans with `span(...)` or the
+# `traced(...)` decorator. Finished spans feed the per-stage latency histograms
+# served on /metrics and, when the OpenTelemetry API is installed, are mirrored
+# as OpenTelemetry spans so any configured exporter receives them. Stages that
+# start and end in callbacks (LLM calls) use open_span() / close_span().
+
+try:
+    from opentelemetry import trace as otel_trace
+    _otel_tracer = otel_trace.get_tracer("vonder.chat")
+except ImportError:  # OpenTelemetry is optional
+    otel_trace = None
+    _otel_tracer = None
+
+registry = get_registry()
+
+stage_duration = registry.histogram(
+    "chat_stage_duration_seconds",
+    "Duration of each stage of the chat pipeline",
+    labelnames=("stage",),
+)
+stage_errors = registry.counter(
+    "chat_stage_errors_total",
+    "Stages of the chat pipeline that raised",
+    labelnames=("stage",),
+)
+llm_tokens = registry.counter(
+    "chat_llm_tokens_total",
+    "Tokens used by LLM calls, per stage and kind (prompt/completion)",
+    labelnames=("stage", "kind"),
+)
+
+
+class Span:
+    """One timed stage of a trace"""
+
+    def __init__(self, trace: "Trace", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.otel_span = None  # mirror of a detached span, see open_span()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_tokens(self, prompt_tokens: int = 0, completion_tokens: int = 0):
+        """Accumulate token usage on the span"""
+        self.attributes["prompt_tokens"] = self.attributes.get("prompt_tokens", 0) + (prompt_tokens or 0)
+        self.attributes["completion_tokens"] = self.attributes.get("completion_tokens", 0) + (completion_tokens or 0)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """All spans recorded for one request"""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.spans: List[Span] = []
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("chat_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("chat_span", default=None)
+
+
+def get_current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def get_current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+_span_listeners: List[Callable[[Span], None]] = []
+
+
+def add_span_listener(listener: Callable[[Span], None]):
+    """Call listener with every finished span (used by the load-test harness)"""
+    _span_listeners.append(listener)
+
+
+def record_span(span: Span):
+    """Feed a finished span into the metrics and listeners"""
+    for listener in _span_listeners:
+        listener(span)
+    stage_duration.observe(span.duration, stage=span.name)
+    if span.error:
+        stage_errors.inc(stage=span.name)
+    if "prompt_tokens" in span.attributes:
+        llm_tokens.inc(span.attributes["prompt_tokens"], stage=span.name, kind="prompt")
+    if "completion_tokens" in span.attributes:
+        llm_tokens.inc(span.attributes["completion_tokens"], stage=span.name, kind="completion")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage of the current request.
+
+    Works without an active trace too (the span then only feeds the histograms),
+    so library code can be instrumented unconditionally.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        trace = Trace(name)
+    current = Span(trace, name, _current_span.get(), attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+
+    otel_cm = _otel_tracer.start_as_current_span(name) if _otel_tracer else None
+    otel_span = otel_cm.__enter__() if otel_cm else None
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        record_span(current)
+        if otel_cm:
+            _export_attributes(current, otel_span)
+            otel_cm.__exit__(None, None, None)
+
+
+def _export_attributes(current: Span, otel_span):
+    for key, value in current.attributes.items():
+        if isinstance(value, (str, bool, int, float)):
+            otel_span.set_attribute(key, value)
+    if current.error:
+        otel_span.set_attribute("error.type", current.error)
+
+
+def open_span(trace: Trace, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+    """
+    Start a span that is finished later by close_span() or discard_span(),
+    for stages reported by callbacks instead of a `with` block (LLM events).
+
+    The OpenTelemetry mirror is parented to the OpenTelemetry span current
+    where the stage starts, like the spans opened by `span(...)`.
+    """
+    current = Span(trace, name, parent, attributes)
+    trace.spans.append(current)
+    if _otel_tracer:
+        current.otel_span = _otel_tracer.start_span(name)
+    return current
+
+
+def close_span(current: Span):
+    """Finish a span from open_span(): metrics, listeners and the OpenTelemetry exporter"""
+    current.finish()
+    record_span(current)
+    if current.otel_span is not None:
+        _export_attributes(current, current.otel_span)
+        current.otel_span.end()
+
+
+def discard_span(current: Span, reason: str):
+    """End a span from open_span() that will never finish; it is exported as an error, not timed"""
+    current.error = reason
+    if current.otel_span is not None:
+        _export_attributes(current, current.otel_span)
+        current.otel_span.end()
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Open the root span of a request and make its trace current"""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _current_trace.reset(token)
+
+
+def traced(name: str):
+    """Decorator opening a span around a sync or async function"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+from app.monitoring.metrics import get_registry
+
+# Circuit breaker: after `failure_threshold` consecutive failures the circuit
+# opens and calls are refused for `reset_timeout` seconds; then one trial call
+# is let through (half-open) and its outcome closes or re-opens the circuit.
+
+registry = get_registry()
+
+breaker_state = registry.gauge(
+    "circuit_breaker_open", "1 while a circuit breaker refuses calls", labelnames=("name",)
+)
+breaker_rejections = registry.counter(
+    "circuit_breaker_rejected_total", "Calls refused by an open circuit", labelnames=("name",)
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is temporarily unavailable (retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker, safe to share between threads"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def retry_in(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; reserves the single half-open trial"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # A trial that never reported back (e.g. cancelled) is abandoned after reset_timeout
+            if self._trial_in_flight and time.monotonic() - self._trial_started < self.reset_timeout:
+                return False
+            self._state = HALF_OPEN
+            self._trial_in_flight = True
+            self._trial_started = time.monotonic()
+            return True
+
+    def available(self) -> bool:
+        """Whether allow() would let a call through now; read-only, reserves nothing"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at < self.reset_timeout:
+                return False
+            return not (self._trial_in_flight and now - self._trial_started < self.reset_timeout)
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through"""
+        if not self.allow():
+            breaker_rejections.inc(name=self.name)
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def fail_fast(self):
+        """
+        Raise CircuitOpenError while calls are refused, without taking the half-open trial.
+
+        For early checks ahead of the guarded call itself: check() there would
+        reserve the trial, and the real call would then always be refused.
+        """
+        if not self.available():
+            breaker_rejections.inc(name=self.name)
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != CLOSED:
+                self._state = CLOSED
+                breaker_state.set(0, name=self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                breaker_state.set(1, name=self.name)
+
+
+class DependencyBreaker(CircuitBreaker):
+    """
+    Circuit breaker for an external dependency, driven by its recent error rate and latency.
+
+    Outcomes of the last `window` seconds are kept; once at least `min_calls` were
+    seen, the circuit opens when the share of failed calls reaches `error_rate` or
+    the share of calls slower than `slow_call_seconds` reaches `slow_call_rate`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 60.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate: float = 0.8,
+        reset_timeout: float = 30.0
+    ):
+        super().__init__(name, failure_threshold=1, reset_timeout=reset_timeout)
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self._calls: Deque[Tuple[float, bool, float]] = deque()
+
+    def _prune(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def record(self, ok: bool, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            trial = self._state == HALF_OPEN
+            self._trial_in_flight = False
+            self._calls.append((now, ok, latency))
+            self._prune(now)
+
+            if trial:
+                should_open = not ok or latency >= self.slow_call_seconds
+            elif self._state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+                slow = sum(1 for _, _, call_latency in self._calls if call_latency >= self.slow_call_seconds)
+                should_open = (
+                    failures / len(self._calls) >= self.error_rate
+                    or slow / len(self._calls) >= self.slow_call_rate
+                )
+            else:
+                should_open = False
+
+            if should_open:
+                self._state = OPEN
+                self._opened_at = now
+                # Start the next evaluation from a clean window
+                self._calls.clear()
+                breaker_state.set(1, name=self.name)
+            elif trial:
+                self._state = CLOSED
+                self._calls.clear()
+                breaker_state.set(0, name=self.name)
+
+    def record_success(self, latency: float = 0.0):
+        self.record(True, latency)
+
+    def record_failure(self, latency: float = 0.0):
+        self.record(False, latency)
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = list(self._calls)
+        latencies = sorted(latency for _, _, latency in calls)
+        return {
+            "state": state,
+            "calls": len(calls),
+            "error_rate": round(sum(1 for _, ok, _ in calls if not ok) / len(calls), 3) if calls else 0.0,
+            "p95_latency_seconds": round(latencies[int(0.95 * (len(latencies) - 1))], 3) if latencies else None,
+            "retry_in_seconds": round(self.retry_in(), 1) if state != CLOSED else 0.0,
+        }
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.resilience.breaker import DependencyBreaker
+
+# Circuit breakers for the external services the chatbot depends on.
+# Every call to OpenAI, Tavily and Weaviate goes through guard() / guard_sync()
+# (see llm_integration/), which refuses it with CircuitOpenError while that
+# dependency's circuit is open and otherwise records its outcome and latency.
+# get_answer asks unavailable_tools() before building the agent, drops tools
+# whose dependency is down and tells the model so, instead of letting every
+# request wait for the same timeout.
+# A cancelled call isn't recorded by guard() itself: the client going away or the
+# request deadline say nothing about the dependency. The agent's per-tool timeout
+# does, so calls it cuts off are collected with cut_off_calls() and recorded as
+# slow by record_cut_off() once they ran past the slow-call threshold.
+
+logger = logging.getLogger(__name__)
+
+OPENAI = "openai"
+TAVILY = "tavily"
+WEAVIATE = "weaviate"
+DEPENDENCIES = (OPENAI, TAVILY, WEAVIATE)
+
+# Agent tool -> dependencies it cannot work without
+TOOL_DEPENDENCIES: Dict[str, tuple] = {
+    "internet_search": (TAVILY,),
+    "attraction_tourisms_and_events_in_vietnam": (WEAVIATE,),
+}
+
+
+def _parse_seconds(spec: str) -> Dict[str, float]:
+    values = {}
+    for part in (spec or "").split(","):
+        if "=" in part:
+            name, seconds = part.split("=", 1)
+            values[name.strip()] = float(seconds)
+    return values
+
+
+def _build_breakers() -> Dict[str, DependencyBreaker]:
+    slow = _parse_seconds(settings.BREAKER_SLOW_CALL_SECONDS)
+    return {
+        name: DependencyBreaker(
+            f"dependency.{name}",
+            window=settings.BREAKER_WINDOW_SECONDS,
+            min_calls=settings.BREAKER_MIN_CALLS,
+            error_rate=settings.BREAKER_ERROR_RATE,
+            slow_call_seconds=slow.get(name, 10.0),
+            slow_call_rate=settings.BREAKER_SLOW_CALL_RATE,
+            reset_timeout=settings.BREAKER_RESET_SECONDS,
+        )
+        for name in DEPENDENCIES
+    }
+
+
+_breakers = _build_breakers()
+
+
+def get_dependency_breaker(name: str) -> DependencyBreaker:
+    return _breakers[name]
+
+
+# Calls cancelled in flight under cut_off_calls(): (dependency, seconds it had run)
+_cut_off: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("dependency_cut_off", default=None)
+
+
+def _record(name: str, ok: bool, started: float):
+    _record_latency(name, ok, time.perf_counter() - started)
+
+
+def _record_latency(name: str, ok: bool, latency: float):
+    breaker = _breakers[name]
+    was_closed = breaker.state == "closed"
+    breaker.record(ok, latency)
+    if was_closed and breaker.state != "closed":
+        logger.warning("Dependency circuit opened", extra={"fields": {"dependency": name}})
+
+
+@asynccontextmanager
+async def guard(name: str):
+    """Fail fast while `name` is unavailable; otherwise record the call's outcome and latency"""
+    _breakers[name].check()
+    started = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        # Left to whoever cancelled it (see cut_off_calls)
+        cut_off = _cut_off.get()
+        if cut_off is not None:
+            cut_off.append((name, time.perf_counter() - started))
+        raise
+    except Exception:
+        _record(name, False, started)
+        raise
+    _record(name, True, started)
+
+
+@contextmanager
+def cut_off_calls() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the guarded calls cancelled inside the block (tasks it spawns included)"""
+    calls: List[Tuple[str, float]] = []
+    token = _cut_off.set(calls)
+    try:
+        yield calls
+    finally:
+        _cut_off.reset(token)
+
+
+def record_cut_off(calls: Iterable[Tuple[str, float]]):
+    """
+    Record calls cut off by a timeout of their own as slow calls.
+
+    Only those that already ran past their dependency's slow-call threshold:
+    a shorter cut-off doesn't tell how long the call would have taken.
+    """
+    for name, latency in calls:
+        if latency >= _breakers[name].slow_call_seconds:
+            _record_latency(name, True, latency)
+
+
+@contextmanager
+def guard_sync(name: str):
+    """guard() for blocking calls (sync LLM calls, Weaviate queries in the executor)"""
+    _breakers[name].check()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _record(name, False, started)
+        raise
+    _record(name, True, started)
+
+
+def is_available(name: str) -> bool:
+    return _breakers[name].state != "open"
+
+
+def unavailable_tools(tool_names: Iterable[str]) -> Dict[str, List[str]]:
+    """Tools whose dependencies have an open circuit, with the dependencies that are down"""
+    down = {}
+    for tool in tool_names:
+        missing = [dep for dep in TOOL_DEPENDENCIES.get(tool, ()) if not is_available(dep)]
+        if missing:
+            down[tool] = missing
+    return down
+
+
+def dependency_status() -> Dict[str, Any]:
+    """Breaker state and recent error rate / latency per dependency"""
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,159 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Shared key-value store for state that must agree across worker processes
+# (chat sessions, admission counters, caches). The in-memory backend is for a
+# single process; with several gunicorn workers use STATE_BACKEND=redis.
+
+
+class StateStore(ABC):
+    """Async key-value store with TTLs; values are strings"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Set key only if it does not exist; returns whether it was set"""
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add amount to an integer key and return the new value"""
+        ...
+
+    @abstractmethod
+    async def keys(self, prefix: str) -> List[str]:
+        ...
+
+    async def close(self):
+        pass
+
+    async def get_json(self, key: str) -> Any:
+        value = await self.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.set(key, json.dumps(value, default=str, ensure_ascii=False), ttl)
+
+
+class InMemoryStore(StateStore):
+    """Process-local store; expired keys are dropped lazily on access"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    def _alive(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._alive(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._data[key] = (value, self._expiry(ttl))
+
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        if self._alive(key) is not None:
+            return False
+        self._data[key] = (value, self._expiry(ttl))
+        return True
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        existing = self._alive(key)
+        # Like Redis: the expiry is set when the key is created, not refreshed
+        expires_at = self._data[key][1] if existing is not None else self._expiry(ttl)
+        current = int(existing or 0) + amount
+        self._data[key] = (str(current), expires_at)
+        return current
+
+    async def keys(self, prefix: str) -> List[str]:
+        return [key for key in list(self._data) if key.startswith(prefix) and self._alive(key) is not None]
+
+
+class RedisStore(StateStore):
+    """Redis-backed store shared by every worker"""
+
+    def __init__(self, url: str, namespace: str = "vonder:"):
+        import redis.asyncio as redis  # optional dependency, only needed for multi-worker mode
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return self._namespace + key
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(self._key(key))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        await self._redis.set(self._key(key), value, px=int(ttl * 1000) if ttl else None)
+
+    async def set_if_absent(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return bool(await self._redis.set(self._key(key), value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    async def delete(self, key: str):
+        await self._redis.delete(self._key(key))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incrby(self._key(key), amount)
+            if ttl:
+                # Only sets an expiry when the key has none yet
+                pipe.expire(self._key(key), int(ttl), nx=True)
+            results = await pipe.execute()
+        return int(results[0])
+
+    async def keys(self, prefix: str) -> List[str]:
+        start = len(self._namespace)
+        return [key[start:] async for key in self._redis.scan_iter(match=self._key(prefix) + "*")]
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+_store: Optional[StateStore] = None
+
+
+def get_store() -> StateStore:
+    """Process-wide store selected by STATE_BACKEND"""
+    global _store
+    if _store is None:
+        if settings.STATE_BACKEND == "redis":
+            _store = RedisStore(settings.REDIS_URL)
+        else:
+            _store = InMemoryStore()
+    return _store
+
+
+async def close_store():
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
@@ -0,0 +1,132 @@
+"""
+Load knowledge-base collections into the pgvector backend (KnowledgeChunk).
+
+    # copy the VietnamTourism collection from Weaviate Cloud, vectors included
+    python -m app.vector.ingest weaviate --collection VietnamTourism
+
+    # chunk, embed and upsert documents from JSONL / CSV / Markdown files or folders
+    python -m app.vector.ingest files data/tourism/ --workers 4 --checkpoint .ingest-checkpoint.json
+
+Objects keep the VietnamTourism schema (content, title, document_title, date,
+source) and their ids, so re-running a command updates rows in place. File
+ingestion only re-embeds documents whose content changed (see app.vector.pipeline);
+with --prune it also deletes documents that are gone from the given paths.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from app.db.prisma_client import prisma
+from app.vector.pgvector import PgVectorStore
+from app.vector.pipeline import IngestionPipeline
+
+logger = logging.getLogger(__name__)
+
+
+def weaviate_object_to_node(obj, text_key: str = "content") -> TextNode:
+    """Rebuild the LlamaIndex node written by WeaviateVectorStore, falling back to the raw properties"""
+    properties = dict(obj.properties)
+    text = properties.pop(text_key, "") or ""
+    vector = obj.vector.get("default") if isinstance(obj.vector, dict) else obj.vector
+
+    node = None
+    if properties.get("_node_content"):
+        try:
+            node = metadata_dict_to_node(properties)
+            node.set_content(text)
+        except (ValueError, json.JSONDecodeError):
+            node = None
+    if node is None:
+        metadata = {key: value for key, value in properties.items() if not key.startswith("_") and value is not None}
+        node = TextNode(id_=str(obj.uuid), text=text, metadata=metadata)
+    node.embedding = list(vector) if vector is not None else None
+    return node
+
+
+async def copy_from_weaviate(collection: str, batch_size: int) -> int:
+    """Stream every object of a Weaviate collection into KnowledgeChunk"""
+    from llm_integration.weaviate_client import get_weaviate_client
+
+    store = PgVectorStore(collection=collection)
+    source = get_weaviate_client().collections.get(collection)
+
+    copied = skipped = 0
+    batch = []
+    started = time.perf_counter()
+    for obj in source.iterator(include_vector=True):
+        node = weaviate_object_to_node(obj)
+        if not node.embedding:
+            skipped += 1
+            continue
+        batch.append(node)
+        if len(batch) >= batch_size:
+            await store.async_add(batch, batch_size=batch_size)
+            copied += len(batch)
+            batch = []
+            logger.info("Copied objects", extra={"fields": {"collection": collection, "copied": copied}})
+    if batch:
+        await store.async_add(batch, batch_size=batch_size)
+        copied += len(batch)
+
+    logger.info(
+        "Weaviate copy finished",
+        extra={"fields": {
+            "collection": collection, "copied": copied, "skipped": skipped,
+            "seconds": round(time.perf_counter() - started, 1),
+        }}
+    )
+    return copied
+
+
+async def main(args):
+    await prisma.connect()
+    try:
+        if args.command == "weaviate":
+            copied = await copy_from_weaviate(args.collection, args.batch_size)
+            print(f"{args.collection}: {copied} objects copied to KnowledgeChunk")
+        elif args.command == "files":
+            pipeline = IngestionPipeline(
+                collection=args.collection,
+                chunk_size=args.chunk_size,
+                chunk_overlap=args.chunk_overlap,
+                batch_size=args.batch_size,
+                workers=args.workers,
+                checkpoint_path=args.checkpoint,
+                force=args.force,
+                prune=args.prune,
+            )
+            stats = await pipeline.run(args.paths)
+            print(f"{args.collection}: " + ", ".join(f"{key}={value}" for key, value in vars(stats).items()))
+    finally:
+        await prisma.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    weaviate_parser = subcommands.add_parser("weaviate", help="copy a collection from Weaviate Cloud")
+    weaviate_parser.add_argument("--collection", default="VietnamTourism")
+    weaviate_parser.add_argument("--batch-size", type=int, default=200)
+
+    files_parser = subcommands.add_parser("files", help="ingest JSONL / CSV / Markdown documents from disk")
+    files_parser.add_argument("paths", nargs="+", help="files or directories (searched recursively)")
+    files_parser.add_argument("--collection", default="VietnamTourism")
+    files_parser.add_argument("--chunk-size", type=int, default=512, help="tokens per chunk")
+    files_parser.add_argument("--chunk-overlap", type=int, default=64)
+    files_parser.add_argument("--batch-size", type=int, default=256, help="chunks embedded per batch")
+    files_parser.add_argument("--workers", type=int, default=2, help="embedding processes (0 = in-process)")
+    files_parser.add_argument("--checkpoint", default=None, help="progress file to resume an interrupted run")
+    files_parser.add_argument("--force", action="store_true", help="ignore stored hashes and the checkpoint")
+    files_parser.add_argument(
+        "--prune", action="store_true",
+        help="the paths are the whole source: delete stored documents not found in them"
+    )
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,365 @@
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode, TextNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import metadata_dict_to_node, node_to_metadata_dict
+
+from app.db.prisma_client import prisma
+
+# LlamaIndex vector store over the KnowledgeChunk table (pgvector) in our own
+# Postgres. It is a drop-in for WeaviateVectorStore: same metadata keys as the
+# VietnamTourism collection (title, document_title, date, source), HNSW cosine
+# search, and a hybrid mode that fuses vector similarity with full-text rank the
+# way Weaviate's relativeScoreFusion does, weighted by the query's `alpha`
+# (1 = pure vector, 0 = pure keyword).
+# The collection and metadata filters are applied after the HNSW index scan, which
+# only yields `hnsw.ef_search` candidates (40 by default): a selective filter or a
+# small collection in the shared table would leave fewer than k rows, or none.
+# Vector queries therefore run in a transaction that raises ef_search and turns
+# on iterative index scans (pgvector >= 0.8), which keep scanning until the LIMIT
+# is filled.
+
+logger = logging.getLogger(__name__)
+
+# Metadata keys stored in their own columns; anything else is read from the metadata JSON
+COLUMN_FOR_KEY = {
+    'title': '"title"',
+    'document_title': '"documentTitle"',
+    'date': '"date"',
+    'source': '"source"',
+}
+
+COMPARISON_SQL = {
+    FilterOperator.EQ: '=',
+    FilterOperator.NE: '<>',
+    FilterOperator.GT: '>',
+    FilterOperator.GTE: '>=',
+    FilterOperator.LT: '<',
+    FilterOperator.LTE: '<=',
+}
+
+SELECT_COLUMNS = '"id", "content", "metadata", "title", "documentTitle", "date", "source"'
+
+ITERATIVE_SCAN_MODES = ("off", "strict_order", "relaxed_order")
+MAX_EF_SEARCH = 1000  # pgvector's upper bound
+
+
+def vector_literal(vector: Sequence[float]) -> str:
+    """pgvector text input format, cast with ::vector in SQL"""
+    return "[" + ",".join(f"{value:.6f}" for value in vector) + "]"
+
+
+def keyword_tsquery(text: str) -> str:
+    """OR of the query's words for to_tsquery: ranking, not matching, decides the order"""
+    words = dict.fromkeys(re.findall(r'\w+', (text or '').lower()))
+    return ' | '.join(words)
+
+
+class _Params:
+    """Collects positional $n parameters while a statement is being built"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+
+    def add(self, value: Any) -> str:
+        self.values.append(value)
+        return f"${len(self.values)}"
+
+
+class PgVectorStore(BasePydanticVectorStore):
+    """pgvector + full-text hybrid store over one collection of the KnowledgeChunk table"""
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+    collection: str = "VietnamTourism"
+    text_search_config: str = "simple"  # Postgres ships no Vietnamese config; "simple" keeps diacritics intact
+    hybrid_candidates: int = 50  # rows fetched per branch before fusion
+    ef_search: int = 100  # HNSW candidate list for filtered queries, at least the rows asked for
+    iterative_scan: str = "strict_order"  # "off" on pgvector < 0.8, which lacks hnsw.iterative_scan
+
+    _loop: Optional[asyncio.AbstractEventLoop] = PrivateAttr(default=None)
+
+    def __init__(self, collection: str = "VietnamTourism", loop: Optional[asyncio.AbstractEventLoop] = None, **kwargs):
+        super().__init__(collection=collection, **kwargs)
+        # Prisma's connection lives on the app's event loop; the sync API (used by
+        # retrievers running on the blocking executor) hops back onto it
+        self._loop = loop
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PgVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return prisma
+
+    # ---------- Sync API ----------
+
+    def _run(self, coro):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            coro.close()
+            raise RuntimeError("PgVectorStore sync methods cannot run on the event loop, use the async ones")
+        if self._loop is not None and self._loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+        return asyncio.run(coro)
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        return self._run(self.async_add(nodes, **add_kwargs))
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        return self._run(self.adelete(ref_doc_id, **delete_kwargs))
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        return self._run(self.aquery(query, **kwargs))
+
+    # ---------- Writes ----------
+
+    def _row(self, node: BaseNode, with_embedding: bool = True) -> List[Any]:
+        metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=self.flat_metadata)
+        row = [
+            node.node_id,
+            self.collection,
+            node.ref_doc_id,
+            node.get_content(metadata_mode=MetadataMode.NONE),
+            node.metadata.get('title'),
+            node.metadata.get('document_title'),
+            str(node.metadata['date']) if node.metadata.get('date') is not None else None,
+            node.metadata.get('source') or node.metadata.get('src_url'),
+            json.dumps(metadata, ensure_ascii=False, default=str),
+        ]
+        if with_embedding:
+            row.append(vector_literal(node.get_embedding()))
+        return row
+
+    async def async_add(self, nodes: List[BaseNode], batch_size: int = 200, **add_kwargs: Any) -> List[str]:
+        """Upsert nodes (with embeddings) in multi-row INSERT ... ON CONFLICT batches"""
+        ids = []
+        for start in range(0, len(nodes), batch_size):
+            batch = nodes[start:start + batch_size]
+            params = _Params()
+            rows = []
+            for node in batch:
+                values = self._row(node)
+                placeholders = [params.add(value) for value in values]
+                placeholders[8] += '::jsonb'
+                placeholders[9] += '::vector'
+                rows.append("(" + ", ".join(placeholders) + ", NOW())")
+                ids.append(node.node_id)
+            await prisma.execute_raw(
+                'INSERT INTO "KnowledgeChunk" ("id", "collection", "refDocId", "content", "title", "documentTitle", '
+                '"date", "source", "metadata", "embedding", "updatedAt") '
+                f'VALUES {", ".join(rows)} '
+                'ON CONFLICT ("id") DO UPDATE SET "refDocId" = EXCLUDED."refDocId", "content" = EXCLUDED."content", '
+                '"title" = EXCLUDED."title", "documentTitle" = EXCLUDED."documentTitle", "date" = EXCLUDED."date", '
+                '"source" = EXCLUDED."source", "metadata" = EXCLUDED."metadata", "embedding" = EXCLUDED."embedding", '
+                '"updatedAt" = NOW()',
+                *params.values
+            )
+        return ids
+
+    async def async_update_metadata(self, nodes: List[BaseNode]) -> None:
+        """Rewrite text and metadata of stored nodes, keeping their embeddings"""
+        if not nodes:
+            return
+        columns = list(zip(*(self._row(node, with_embedding=False) for node in nodes)))
+        await prisma.execute_raw(
+            'UPDATE "KnowledgeChunk" AS c SET "refDocId" = u."refDocId", "content" = u."content", "title" = u."title", '
+            '"documentTitle" = u."documentTitle", "date" = u."date", "source" = u."source", '
+            '"metadata" = u."metadata"::jsonb, "updatedAt" = NOW() '
+            'FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::text[], $7::text[], '
+            '$8::text[], $9::text[]) AS u("id", "collection", "refDocId", "content", "title", "documentTitle", '
+            '"date", "source", "metadata") '
+            'WHERE c."id" = u."id" AND c."collection" = u."collection"',
+            *[list(column) for column in columns]
+        )
+
+    async def adelete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        await prisma.execute_raw(
+            'DELETE FROM "KnowledgeChunk" WHERE "collection" = $1 AND "refDocId" = $2',
+            self.collection, ref_doc_id
+        )
+
+    # ---------- Queries ----------
+
+    def _filter_sql(self, filters: Optional[MetadataFilters], params: _Params) -> str:
+        if filters is None or not filters.filters:
+            return ''
+        clauses = []
+        for item in filters.filters:
+            if isinstance(item, MetadataFilters):
+                clause = self._filter_sql(item, params)
+            else:
+                clause = self._single_filter_sql(item, params)
+            if clause:
+                clauses.append(clause)
+        if not clauses:
+            return ''
+        if filters.condition == FilterCondition.NOT:
+            return "NOT (" + " AND ".join(clauses) + ")"
+        joiner = " OR " if filters.condition == FilterCondition.OR else " AND "
+        return "(" + joiner.join(clauses) + ")"
+
+    def _single_filter_sql(self, item: MetadataFilter, params: _Params) -> str:
+        column = COLUMN_FOR_KEY.get(item.key)
+        if column is None:
+            column = f'("metadata" ->> {params.add(item.key)})'
+        operator = item.operator
+
+        if operator in COMPARISON_SQL:
+            return f"{column} {COMPARISON_SQL[operator]} {params.add(str(item.value))}"
+        if operator in (FilterOperator.IN, FilterOperator.NIN):
+            values = item.value if isinstance(item.value, list) else [item.value]
+            clause = f"{column} = ANY({params.add([str(value) for value in values])}::text[])"
+            return clause if operator == FilterOperator.IN else f"NOT ({clause})"
+        if operator == FilterOperator.TEXT_MATCH:
+            return f"{column} LIKE {params.add(f'%{item.value}%')}"
+        if operator in (FilterOperator.TEXT_MATCH_INSENSITIVE, FilterOperator.CONTAINS):
+            return f"{column} ILIKE {params.add(f'%{item.value}%')}"
+        if operator == FilterOperator.IS_EMPTY:
+            return f"({column} IS NULL OR {column} = '')"
+        logger.warning("Unsupported metadata filter operator ignored", extra={"fields": {"operator": str(operator)}})
+        return ''
+
+    def _alpha(self, query: VectorStoreQuery) -> float:
+        if query.mode in (VectorStoreQueryMode.SPARSE, VectorStoreQueryMode.TEXT_SEARCH):
+            return 0.0
+        if query.mode == VectorStoreQueryMode.HYBRID:
+            return 0.5 if query.alpha is None else float(query.alpha)
+        return 1.0
+
+    def build_query(self, query: VectorStoreQuery) -> Tuple[str, List[Any]]:
+        """SQL and parameters for a vector, keyword or fused hybrid search"""
+        params = _Params()
+        alpha = self._alpha(query)
+        terms = keyword_tsquery(query.query_str) if alpha < 1 else ''
+        use_vector = alpha > 0 and query.query_embedding is not None
+        use_keyword = bool(terms)
+        if not use_vector and not use_keyword:
+            # Keyword-only mode with no usable words: fall back to vector search
+            alpha, use_vector = 1.0, query.query_embedding is not None
+
+        where = [f'"collection" = {params.add(self.collection)}']
+        filter_sql = self._filter_sql(query.filters, params)
+        if filter_sql:
+            where.append(filter_sql)
+        if query.doc_ids:
+            where.append(f'"refDocId" = ANY({params.add(list(query.doc_ids))}::text[])')
+        if query.node_ids:
+            where.append(f'"id" = ANY({params.add(list(query.node_ids))}::text[])')
+        where_sql = " AND ".join(where)
+        top_k = params.add(query.similarity_top_k)
+
+        if use_vector and not use_keyword:
+            embedding = params.add(vector_literal(query.query_embedding))
+            sql = (
+                f'SELECT {SELECT_COLUMNS}, 1 - ("embedding" <=> {embedding}::vector) AS "score" '
+                f'FROM "KnowledgeChunk" WHERE {where_sql} '
+                f'ORDER BY "embedding" <=> {embedding}::vector LIMIT {top_k}'
+            )
+            return sql, params.values
+
+        candidates = params.add(max(self.hybrid_candidates, query.similarity_top_k))
+        tsquery = f"to_tsquery('{self.text_search_config}', {params.add(terms)})"
+        branches = [
+            f'SELECT "id", NULL::float8 AS "vscore", ts_rank_cd("searchVector", {tsquery})::float8 AS "kscore" '
+            f'FROM "KnowledgeChunk" WHERE {where_sql} AND "searchVector" @@ {tsquery} '
+            f'ORDER BY "kscore" DESC LIMIT {candidates}'
+        ]
+        if use_vector:
+            embedding = params.add(vector_literal(query.query_embedding))
+            branches.append(
+                f'SELECT "id", (1 - ("embedding" <=> {embedding}::vector))::float8 AS "vscore", NULL::float8 AS "kscore" '
+                f'FROM "KnowledgeChunk" WHERE {where_sql} '
+                f'ORDER BY "embedding" <=> {embedding}::vector LIMIT {candidates}'
+            )
+        weight = params.add(alpha)
+        # Min-max normalise each branch over the candidates, missing scores count as 0
+        sql = (
+            'WITH "candidates" AS ('
+            'SELECT "id", MAX("vscore") AS "vscore", MAX("kscore") AS "kscore" FROM ('
+            + " UNION ALL ".join(f"({branch})" for branch in branches) +
+            ') AS "hits" GROUP BY "id"), '
+            '"normalised" AS (SELECT "id", '
+            'COALESCE(("vscore" - MIN("vscore") OVER ()) / NULLIF(MAX("vscore") OVER () - MIN("vscore") OVER (), 0), '
+            'CASE WHEN "vscore" IS NULL THEN 0 ELSE 1 END) AS "v", '
+            'COALESCE(("kscore" - MIN("kscore") OVER ()) / NULLIF(MAX("kscore") OVER () - MIN("kscore") OVER (), 0), '
+            'CASE WHEN "kscore" IS NULL THEN 0 ELSE 1 END) AS "k" '
+            'FROM "candidates") '
+            f'SELECT {", ".join(f"c.{column}" for column in SELECT_COLUMNS.split(", "))}, '
+            f'({weight}::float8 * n."v" + (1 - {weight}::float8) * n."k") AS "score" '
+            'FROM "normalised" n JOIN "KnowledgeChunk" c ON c."id" = n."id" '
+            f'ORDER BY "score" DESC LIMIT {top_k}'
+        )
+        return sql, params.values
+
+    def _to_node(self, row: Dict[str, Any]) -> BaseNode:
+        metadata = row.get('metadata') or {}
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata)
+        try:
+            node = metadata_dict_to_node(metadata)
+            node.set_content(row['content'])
+        except Exception:
+            # Rows written outside LlamaIndex carry no serialized node
+            node = TextNode(
+                id_=row['id'],
+                text=row['content'],
+                metadata={
+                    key: value for key, value in {
+                        'title': row.get('title'),
+                        'document_title': row.get('documentTitle'),
+                        'date': row.get('date'),
+                        'source': row.get('source'),
+                        **{k: v for k, v in metadata.items() if not k.startswith('_')},
+                    }.items() if value is not None
+                },
+            )
+        return node
+
+    def scan_settings(self, query: VectorStoreQuery) -> List[str]:
+        """SET LOCAL statements that let filtered HNSW scans fill the LIMIT"""
+        if query.query_embedding is None or self._alpha(query) == 0:
+            return []
+        if self.iterative_scan not in ITERATIVE_SCAN_MODES:
+            raise ValueError(f"Unknown hnsw.iterative_scan mode: {self.iterative_scan}")
+        wanted = max(query.similarity_top_k, self.hybrid_candidates if self._alpha(query) < 1 else 0)
+        statements = [f"SET LOCAL hnsw.ef_search = {min(MAX_EF_SEARCH, max(self.ef_search, int(wanted)))}"]
+        if self.iterative_scan != "off":
+            statements.append(f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan}")
+        return statements
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        sql, values = self.build_query(query)
+        statements = self.scan_settings(query)
+        if statements:
+            # SET LOCAL only lasts for the transaction, so the pooled connection is left as it was
+            async with prisma.tx() as transaction:
+                for statement in statements:
+                    await transaction.execute_raw(statement)
+                rows = await transaction.query_raw(sql, *values)
+        else:
+            rows = await prisma.query_raw(sql, *values)
+        nodes = [self._to_node(row) for row in rows]
+        return VectorStoreQueryResult(
+            nodes=nodes,
+            similarities=[float(row['score']) for row in rows],
+            ids=[row['id'] for row in rows],
+        )
@@ -0,0 +1,429 @@
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+
+from app.db.prisma_client import prisma
+from app.vector.pgvector import PgVectorStore
+
+# Bulk ingestion of knowledge-base documents from disk into KnowledgeChunk.
+#
+#   read (JSONL / CSV / Markdown, streamed) -> skip unchanged / duplicate docs
+#   -> chunk -> embed only chunks not stored yet (process pool) -> bulk upsert
+#   -> record the document hash -> advance the checkpoint
+#
+# Documents are identified by `id` (or `source`/`url`, or file + position) and
+# fingerprinted by a hash of their text and metadata: a re-run only re-chunks
+# documents whose hash changed, and within those only re-embeds chunks whose
+# text is new. The checkpoint file remembers how far each input file got, so an
+# interrupted run resumes without re-reading what was already committed.
+# A document edited into a copy of another one is retired (its chunks and hash
+# row deleted) rather than skipped, and with `prune` a run that read every input
+# from the start deletes documents that are no longer in the source.
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ('title', 'document_title', 'date', 'source')
+TEXT_FIELDS = ('content', 'text', 'body')
+SUPPORTED_SUFFIXES = ('.jsonl', '.csv', '.md', '.markdown')
+
+
+@dataclass
+class SourceDocument:
+    doc_id: str
+    text: str
+    metadata: Dict[str, Any]
+    path: str
+    position: int  # record index inside its file
+
+    @property
+    def content_hash(self) -> str:
+        payload = json.dumps([self.text, self.metadata], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class IngestStats:
+    documents: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    indexed: int = 0
+    chunks_embedded: int = 0
+    chunks_reused: int = 0
+    chunks_deleted: int = 0
+    documents_removed: int = 0
+    seconds: float = 0.0
+
+
+# ---------- Reading ----------
+
+def _record_to_document(record: Dict[str, Any], path: Path, position: int) -> Optional[SourceDocument]:
+    text = next((record[key] for key in TEXT_FIELDS if record.get(key)), None)
+    if not text or not str(text).strip():
+        return None
+    metadata = {key: record[key] for key in METADATA_FIELDS if record.get(key) not in (None, '')}
+    if 'source' not in metadata and record.get('url'):
+        metadata['source'] = record['url']
+    doc_id = str(record.get('id') or metadata.get('source') or f"{path.name}:{position}")
+    return SourceDocument(doc_id=doc_id, text=str(text), metadata=metadata, path=str(path), position=position)
+
+
+def _read_markdown(path: Path) -> Iterator[Dict[str, Any]]:
+    text = path.read_text(encoding='utf-8')
+    title = next((line.lstrip('#').strip() for line in text.splitlines() if line.startswith('# ')), path.stem)
+    yield {'id': str(path), 'content': text, 'title': title, 'source': str(path)}
+
+
+def read_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """Stream raw records from one input file"""
+    suffix = path.suffix.lower()
+    if suffix == '.jsonl':
+        with path.open(encoding='utf-8') as handle:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+    elif suffix == '.csv':
+        with path.open(encoding='utf-8', newline='') as handle:
+            yield from csv.DictReader(handle)
+    elif suffix in ('.md', '.markdown'):
+        yield from _read_markdown(path)
+
+
+def discover_files(paths: Iterable[str]) -> List[Path]:
+    """Input files under the given files/directories, in a stable order"""
+    files = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob('*') if p.suffix.lower() in SUPPORTED_SUFFIXES))
+        elif path.suffix.lower() in SUPPORTED_SUFFIXES:
+            files.append(path)
+    return files
+
+
+# ---------- Checkpoints ----------
+
+class Checkpoint:
+    """Per-file progress, only trusted while the file's size and mtime are unchanged"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if self.path and self.path.exists():
+            self.files = json.loads(self.path.read_text(encoding='utf-8')).get('files', {})
+
+    @staticmethod
+    def _fingerprint(path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    def resume_position(self, path: Path) -> int:
+        entry = self.files.get(str(path))
+        if not entry or {k: entry.get(k) for k in ('size', 'mtime')} != self._fingerprint(path):
+            return 0
+        return entry.get('done', 0)
+
+    def advance(self, path: str, done: int):
+        entry = self.files.setdefault(path, self._fingerprint(Path(path)))
+        entry['done'] = max(entry.get('done', 0), done)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp.write_text(json.dumps({'files': self.files}, indent=1), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+# ---------- Embedding workers ----------
+
+_worker_model = None
+
+
+def _init_embed_worker(threads: int, batch_size: int):
+    """Load the embedding model once per worker process"""
+    global _worker_model
+    import torch
+    from llm_integration.embedding_client import get_embed_model
+    torch.set_num_threads(threads)
+    _worker_model = get_embed_model()
+    _worker_model.embed_batch_size = batch_size
+
+
+def _embed_in_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_model.get_text_embedding_batch(texts)
+
+
+def make_embed_executor(workers: int, batch_size: int) -> Executor:
+    """Process pool sharing the CPU cores between workers; workers=0 embeds on one thread"""
+    if workers <= 0:
+        _init_embed_worker(os.cpu_count() or 1, batch_size)
+        return ThreadPoolExecutor(max_workers=1)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),  # no torch / prisma state inherited from the parent
+        initializer=_init_embed_worker,
+        initargs=(threads, batch_size),
+    )
+
+
+# ---------- Pipeline ----------
+
+@dataclass
+class _Batch:
+    sequence: int
+    documents: List[SourceDocument] = field(default_factory=list)
+    end_positions: Dict[str, int] = field(default_factory=dict)
+
+
+class IngestionPipeline:
+    """Streams documents from disk into one collection of the pgvector store"""
+
+    def __init__(
+        self,
+        collection: str = "VietnamTourism",
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        batch_size: int = 256,
+        workers: int = 2,
+        checkpoint_path: Optional[str] = None,
+        force: bool = False,
+        prune: bool = False
+    ):
+        self.collection = collection
+        self.splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.force = force
+        self.prune = prune
+        self.store = PgVectorStore(collection=collection)
+        self.stats = IngestStats()
+        self._seen_hashes: Set[str] = set()
+        self._seen_doc_ids: Set[str] = set()
+        self._resumed = False  # some file was read from a checkpoint, not from the start
+
+    def iter_documents(self, files: List[Path]) -> Iterator[SourceDocument]:
+        for path in files:
+            start = 0 if self.force else self.checkpoint.resume_position(path)
+            self._resumed = self._resumed or start > 0
+            for position, record in enumerate(read_records(path)):
+                if position < start:
+                    continue
+                document = _record_to_document(record, path, position)
+                if document is not None:
+                    yield document
+                else:
+                    logger.debug("Skipped record without text", extra={"fields": {"path": str(path), "position": position}})
+
+    def iter_batches(self, documents: Iterator[SourceDocument]) -> Iterator[_Batch]:
+        """Group documents so each batch carries roughly batch_size chunks"""
+        batch = _Batch(sequence=0)
+        estimated_chunks = 0
+        for document in documents:
+            batch.documents.append(document)
+            batch.end_positions[document.path] = document.position + 1
+            estimated_chunks += max(1, len(document.text) // 1500)
+            if estimated_chunks >= self.batch_size:
+                yield batch
+                batch = _Batch(sequence=batch.sequence + 1)
+                estimated_chunks = 0
+        if batch.documents:
+            yield batch
+
+    async def _changed_documents(self, documents: List[SourceDocument]) -> List[SourceDocument]:
+        """Drop documents whose stored hash is unchanged and in-run / cross-document duplicates"""
+        hashes = {document.doc_id: document.content_hash for document in documents}
+        existing = await prisma.knowledgedocument.find_many(
+            where={
+                'collection': self.collection,
+                'OR': [
+                    {'docId': {'in': list(hashes)}},
+                    {'contentHash': {'in': list(hashes.values())}},
+                ],
+            }
+        )
+        stored_hash = {row.docId: row.contentHash for row in existing}
+        hash_owner = {row.contentHash: row.docId for row in existing}
+
+        changed = []
+        retired = []
+        for document in documents:
+            self._seen_doc_ids.add(document.doc_id)
+            content_hash = hashes[document.doc_id]
+            if not self.force and stored_hash.get(document.doc_id) == content_hash:
+                self.stats.unchanged += 1
+                continue
+            owner = hash_owner.get(content_hash)
+            if content_hash in self._seen_hashes or (owner is not None and owner != document.doc_id):
+                self.stats.duplicates += 1
+                if document.doc_id in stored_hash:
+                    # Edited into a copy of another document: its old text must not stay retrievable
+                    retired.append(document.doc_id)
+                continue
+            self._seen_hashes.add(content_hash)
+            changed.append(document)
+        await self._remove_documents(retired)
+        return changed
+
+    async def _remove_documents(self, doc_ids: List[str]):
+        """Delete documents' chunks and hash rows"""
+        if not doc_ids:
+            return
+        deleted = await prisma.execute_raw(
+            'DELETE FROM "KnowledgeChunk" WHERE "collection" = $1 AND "refDocId" = ANY($2::text[])',
+            self.collection, doc_ids
+        )
+        await prisma.execute_raw(
+            'DELETE FROM "KnowledgeDocument" WHERE "collection" = $1 AND "docId" = ANY($2::text[])',
+            self.collection, doc_ids
+        )
+        self.stats.documents_removed += len(doc_ids)
+        self.stats.chunks_deleted += deleted or 0
+
+    async def _prune_missing(self):
+        """Delete stored documents that the source no longer has (after a complete run only)"""
+        rows = await prisma.query_raw(
+            'SELECT "docId" FROM "KnowledgeDocument" WHERE "collection" = $1 AND NOT ("docId" = ANY($2::text[]))',
+            self.collection, sorted(self._seen_doc_ids)
+        )
+        missing = [row['docId'] for row in rows]
+        for start in range(0, len(missing), 1000):
+            await self._remove_documents(missing[start:start + 1000])
+        if missing:
+            logger.info("Pruned documents missing from the source", extra={"fields": {"documents": len(missing)}})
+
+    def _chunk(self, document: SourceDocument) -> List[TextNode]:
+        nodes = {}
+        for text in self.splitter.split_text(document.text):
+            # Stable ids: the same chunk text in the same document keeps its row and embedding
+            chunk_id = f"{document.doc_id}#{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}"
+            nodes[chunk_id] = TextNode(
+                id_=chunk_id,
+                text=text,
+                metadata=dict(document.metadata),
+                relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=document.doc_id)},
+            )
+        return list(nodes.values())
+
+    async def _process(self, batch: _Batch, executor: Executor):
+        documents = await self._changed_documents(batch.documents)
+        if not documents:
+            return
+
+        chunks = {document.doc_id: self._chunk(document) for document in documents}
+        rows = await prisma.query_raw(
+            'SELECT "id", "refDocId" FROM "KnowledgeChunk" WHERE "collection" = $1 AND "refDocId" = ANY($2::text[])',
+            self.collection, list(chunks)
+        )
+        stored_ids = {row['id'] for row in rows}
+        current_ids = {node.node_id for nodes in chunks.values() for node in nodes}
+        stale_ids = sorted(stored_ids - current_ids)
+
+        new_nodes = [node for nodes in chunks.values() for node in nodes if node.node_id not in stored_ids]
+        if new_nodes:
+            loop = asyncio.get_running_loop()
+            vectors = await loop.run_in_executor(executor, _embed_in_worker, [node.text for node in new_nodes])
+            for node, vector in zip(new_nodes, vectors):
+                node.embedding = vector
+            await self.store.async_add(new_nodes)
+
+        # Reused chunks may carry updated metadata
+        reused = [node for nodes in chunks.values() for node in nodes if node.node_id in stored_ids]
+        await self.store.async_update_metadata(reused)
+        if stale_ids:
+            await prisma.execute_raw('DELETE FROM "KnowledgeChunk" WHERE "id" = ANY($1::text[])', stale_ids)
+
+        params = []
+        values = []
+        for document in documents:
+            base = len(params)
+            values.append(f"(${base + 1}, ${base + 2}, ${base + 3}, ${base + 4}, ${base + 5}, NOW())")
+            params.extend([
+                self.collection, document.doc_id, document.content_hash,
+                len(chunks[document.doc_id]), document.metadata.get('source'),
+            ])
+        await prisma.execute_raw(
+            'INSERT INTO "KnowledgeDocument" ("collection", "docId", "contentHash", "chunkCount", "source", "updatedAt") '
+            f'VALUES {", ".join(values)} ON CONFLICT ("collection", "docId") DO UPDATE SET '
+            '"contentHash" = EXCLUDED."contentHash", "chunkCount" = EXCLUDED."chunkCount", '
+            '"source" = EXCLUDED."source", "updatedAt" = NOW()',
+            *params
+        )
+
+        self.stats.indexed += len(documents)
+        self.stats.chunks_embedded += len(new_nodes)
+        self.stats.chunks_reused += len(reused)
+        self.stats.chunks_deleted += len(stale_ids)
+
+    async def run(self, paths: Iterable[str]) -> IngestStats:
+        files = discover_files(paths)
+        started = time.perf_counter()
+        # Keep every embed worker busy while earlier batches are being written
+        in_flight = max(1, self.workers) * 2
+        semaphore = asyncio.Semaphore(in_flight)
+        pending: Dict[int, asyncio.Task] = {}
+        batches: Dict[int, _Batch] = {}
+        finished: Set[int] = set()
+        next_to_commit = 0
+
+        async def worker(batch: _Batch, executor: Executor):
+            try:
+                await self._process(batch, executor)
+            finally:
+                semaphore.release()
+
+        def commit_finished():
+            # Checkpoints only advance over a contiguous prefix of finished batches
+            nonlocal next_to_commit
+            advanced = False
+            while next_to_commit in finished:
+                finished.discard(next_to_commit)
+                for path, done in batches.pop(next_to_commit).end_positions.items():
+                    self.checkpoint.advance(path, done)
+                next_to_commit += 1
+                advanced = True
+            if advanced:
+                self.checkpoint.save()
+
+        with make_embed_executor(self.workers, min(self.batch_size, 64)) as executor:
+            for batch in self.iter_batches(self.iter_documents(files)):
+                await semaphore.acquire()
+                self.stats.documents += len(batch.documents)
+                batches[batch.sequence] = batch
+                pending[batch.sequence] = asyncio.create_task(worker(batch, executor))
+
+                for sequence, task in list(pending.items()):
+                    if task.done():
+                        task.result()  # a failed batch stops the run; the checkpoint stays before it
+                        del pending[sequence]
+                        finished.add(sequence)
+                commit_finished()
+                if batch.sequence % 20 == 0:
+                    logger.info("Ingestion progress", extra={"fields": dict(vars(self.stats))})
+
+            for sequence, task in list(pending.items()):
+                await task
+                finished.add(sequence)
+            commit_finished()
+
+        if self.prune:
+            if self._resumed:
+                logger.warning("Prune skipped: the run resumed from a checkpoint, not every document was read")
+            else:
+                await self._prune_missing()
+
+        self.stats.seconds = round(time.perf_counter() - started, 1)
+        return self.stats
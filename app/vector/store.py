@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+from app.config import settings
+
+# Which vector database backs the knowledge-base tools. Both backends are
+# LlamaIndex vector stores, so indexes and retrievers work unchanged on either:
+#   weaviate - the VietnamTourism collection on Weaviate Cloud
+#   pgvector - the KnowledgeChunk table in our own Postgres (see app.vector.pgvector)
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("weaviate", "pgvector")
+
+
+def get_vector_store(index_name: str = "VietnamTourism"):
+    """Build the configured vector store for a collection"""
+    backend = settings.VECTOR_BACKEND.lower()
+    if backend == "pgvector":
+        from app.vector.pgvector import PgVectorStore
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        return PgVectorStore(
+            collection=index_name,
+            loop=loop,
+            ef_search=settings.PGVECTOR_EF_SEARCH,
+            iterative_scan=settings.PGVECTOR_ITERATIVE_SCAN,
+        )
+    if backend == "weaviate":
+        from llm_integration.weaviate_client import GuardedWeaviateVectorStore, get_weaviate_client
+        return GuardedWeaviateVectorStore(
+            weaviate_client=get_weaviate_client(), index_name=index_name, text_key="content"
+        )
+    raise ValueError(f"Unknown VECTOR_BACKEND {settings.VECTOR_BACKEND!r}, expected one of {VECTOR_BACKENDS}")
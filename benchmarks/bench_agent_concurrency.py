@@ -0,0 +1,82 @@
+"""
+Load test: concurrent chat sessions through get_answer.
+
+Runs `--sessions` questions with at most `--concurrency` in flight and
+reports sessions/second, latency percentiles and event loop lag (how late a
+10 ms ticker fires). Loop lag is what the old nest_asyncio + sync tool path
+inflated: every sync tool call froze all other sessions. Run it on the
+commit before and after a change to compare.
+
+    python -m benchmarks.bench_agent_concurrency --sessions 40 --concurrency 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.db.prisma_client import prisma
+from app.chatbot.service import get_answer
+
+QUESTIONS = [
+    "Đà Lạt có gì chơi vào tháng 7?",
+    "Tour Hạ Long 2 ngày 1 đêm",
+    "What to eat in Hội An?",
+    "Sự kiện sắp tới ở Hà Nội?",
+    "Best time to visit Phú Quốc?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def monitor_loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def main(args):
+    await prisma.connect()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors, lag = [], 0, []
+
+    async def session(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await get_answer(QUESTIONS[i % len(QUESTIONS)], chat_id="", user_id=args.user_id)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors += 1
+                print(f"session {i} failed: {e}")
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(monitor_loop_lag(stop, lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    await prisma.disconnect()
+
+    print(f"sessions      {args.sessions} ({errors} failed), concurrency {args.concurrency}")
+    print(f"throughput    {len(latencies) / elapsed:.2f} sessions/s over {elapsed:.1f}s")
+    if latencies:
+        print(f"latency s     p50 {statistics.median(latencies):.2f}  p95 {percentile(latencies, 95):.2f}  max {max(latencies):.2f}")
+    if lag:
+        print(f"loop lag ms   p50 {statistics.median(lag) * 1000:.1f}  p99 {percentile(lag, 99) * 1000:.1f}  max {max(lag) * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--user-id", default="benchmark")
+    asyncio.run(main(parser.parse_args()))
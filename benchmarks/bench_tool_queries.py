@@ -0,0 +1,164 @@
+"""
+Benchmark: relation includes vs relation count aggregates in the DB tool queries.
+
+Seeds a scratch Postgres (DATABASE_URL) with locations, agencies, tours, trips
+and participants, then runs the old `include`-everything queries next to the
+`count_by` queries used by app/chatbot/tools/tools.py and reports rows
+transferred and latency. Seeded rows are removed at the end.
+
+    python -m benchmarks.bench_tool_queries --locations 50 --children 200 --runs 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from app.db.prisma_client import prisma, count_by
+
+MARKER = "bench-"
+
+
+async def seed(locations: int, children: int):
+    """Seed locations with `children` trips and tours each, every trip with participants"""
+    tag = MARKER + uuid.uuid4().hex[:8]
+    user = await prisma.user.create(data={"name": tag, "email": f"{tag}@bench.local"})
+    agency = await prisma.agency.create(data={"name": tag, "email": f"{tag}@agency.local", "password": "-"})
+
+    location_ids = []
+    for i in range(locations):
+        location = await prisma.location.create(data={
+            "name": f"{tag} location {i}",
+            "description": "benchmark",
+            "coverImage": "",
+            "category": "other",
+            "province": "HA_NOI",
+        })
+        location_ids.append(location.id)
+
+        await prisma.tour.create_many(data=[
+            {
+                "title": f"{tag} tour {i}-{j}",
+                "description": "benchmark " * 50,
+                "price": 1000000,
+                "duration": 3,
+                "maxCapacity": 20,
+                "itinerary": "[]",
+                "agencyId": agency.id,
+                "locationId": location.id,
+            }
+            for j in range(children)
+        ])
+        await prisma.trip.create_many(data=[
+            {
+                "name": f"{tag} trip {i}-{j}",
+                "description": "benchmark " * 50,
+                "startDate": "2025-01-01T00:00:00Z",
+                "endDate": "2025-01-03T00:00:00Z",
+                "locationId": location.id,
+            }
+            for j in range(children)
+        ])
+
+    trips = await prisma.trip.find_many(where={"locationId": {"in": location_ids}})
+    await prisma.tripparticipants.create_many(data=[
+        {"tripId": trip.id, "userId": user.id} for trip in trips
+    ])
+    return tag, user.id, agency.id, location_ids
+
+
+async def cleanup(user_id: str, agency_id: str, location_ids):
+    # Trips, tours and participants cascade from their parents
+    await prisma.location.delete_many(where={"id": {"in": location_ids}})
+    await prisma.agency.delete_many(where={"id": agency_id})
+    await prisma.user.delete_many(where={"id": user_id})
+
+
+async def locations_with_include(tag: str):
+    locations = await prisma.location.find_many(
+        where={"name": {"startswith": tag}},
+        include={"trips": True, "tours": True},
+    )
+    rows = len(locations) + sum(len(l.trips) + len(l.tours) for l in locations)
+    return rows
+
+
+async def locations_with_count(tag: str):
+    locations = await prisma.location.find_many(where={"name": {"startswith": tag}})
+    ids = [l.id for l in locations]
+    trip_counts, tour_counts = await asyncio.gather(
+        count_by(prisma.trip, "locationId", ids),
+        count_by(prisma.tour, "locationId", ids),
+    )
+    return len(locations) + len(trip_counts) + len(tour_counts)
+
+
+async def agencies_with_include(tag: str):
+    agencies = await prisma.agency.find_many(where={"name": tag}, include={"tours": True})
+    return len(agencies) + sum(len(a.tours) for a in agencies)
+
+
+async def agencies_with_count(tag: str):
+    agencies = await prisma.agency.find_many(where={"name": tag})
+    tour_counts = await count_by(prisma.tour, "agencyId", [a.id for a in agencies])
+    return len(agencies) + len(tour_counts)
+
+
+async def trips_with_include(tag: str):
+    trips = await prisma.trip.find_many(
+        where={"name": {"startswith": tag}},
+        include={"location": True, "participants": True},
+        take=10,
+    )
+    return len(trips) * 2 + sum(len(t.participants) for t in trips)
+
+
+async def trips_with_count(tag: str):
+    trips = await prisma.trip.find_many(
+        where={"name": {"startswith": tag}},
+        include={"location": True},
+        take=10,
+    )
+    participant_counts = await count_by(prisma.tripparticipants, "tripId", [t.id for t in trips])
+    return len(trips) * 2 + len(participant_counts)
+
+
+async def measure(fn, tag: str, runs: int):
+    timings = []
+    rows = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = await fn(tag)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return rows, statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)]
+
+
+async def main(args):
+    await prisma.connect()
+    user_id = agency_id = None
+    location_ids = []
+    try:
+        tag, user_id, agency_id, location_ids = await seed(args.locations, args.children)
+        pairs = [
+            ("retrieve_locations", locations_with_include, locations_with_count),
+            ("retrieve_agencies", agencies_with_include, agencies_with_count),
+            ("retrieve_trips", trips_with_include, trips_with_count),
+        ]
+        print(f"{'query':<20}{'mode':<10}{'rows':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, include_fn, count_fn in pairs:
+            for mode, fn in (("include", include_fn), ("_count", count_fn)):
+                rows, p50, p95 = await measure(fn, tag, args.runs)
+                print(f"{name:<20}{mode:<10}{rows:>8}{p50:>10.1f}{p95:>10.1f}")
+    finally:
+        if user_id:
+            await cleanup(user_id, agency_id, location_ids)
+        await prisma.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--children", type=int, default=200, help="trips and tours seeded per location")
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+"""
+Fake OpenAI-compatible server for load tests.
+
+Implements POST /v1/chat/completions with a configurable latency. When the
+request offers tools, the first assistant turn calls one of them (with
+probability `tool_call_rate`) so the agent loop and the tools are exercised;
+auto-retriever prompts get an empty structured query spec back.
+Faults can be injected: `error_rate` of the requests get a 503, `stall_rate`
+of them are held for `stall_ms` first.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class FakeOpenAIConfig:
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        tool_call_rate: float = 0.7,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_ms: float = 0.0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tool_call_rate = tool_call_rate
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+
+
+def _text_of(message) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _completion(model: str, message: dict, finish_reason: str, prompt_chars: int) -> dict:
+    completion_chars = len(json.dumps(message))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": completion_chars // 4,
+            "total_tokens": (prompt_chars + completion_chars) // 4,
+        },
+    }
+
+
+def create_app(config: FakeOpenAIConfig) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "gpt-4o-mini")
+        prompt_text = "\n".join(_text_of(message) for message in messages)
+
+        delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        if random.random() < config.stall_rate:
+            delay += config.stall_ms / 1000
+        await asyncio.sleep(delay)
+
+        if random.random() < config.error_rate:
+            return JSONResponse(
+                status_code=503,
+                content={"error": {"message": "injected failure", "type": "server_error", "code": None}},
+            )
+
+        if "Structured Request" in prompt_text or "structured request" in prompt_text:
+            spec = {"query": messages[-1].get("content", "")[:200] if messages else "", "filters": [], "top_k": None}
+            message = {"role": "assistant", "content": "```json\n" + json.dumps(spec, ensure_ascii=False) + "\n```"}
+            return _completion(model, message, "stop", len(prompt_text))
+
+        tools = body.get("tools") or []
+        already_called = any(message.get("role") == "tool" for message in messages)
+        if tools and not already_called and random.random() < config.tool_call_rate:
+            tool = random.choice(tools)["function"]
+            question = next((_text_of(m) for m in reversed(messages) if m.get("role") == "user"), "")
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{uuid.uuid4().hex[:8]}",
+                    "type": "function",
+                    "function": {"name": tool["name"], "arguments": json.dumps({"query": question[-200:]}, ensure_ascii=False)},
+                }],
+            }
+            return _completion(model, message, "tool_calls", len(prompt_text))
+
+        message = {"role": "assistant", "content": "Đây là câu trả lời thử nghiệm [TO1]. Source: benchmark"}
+        return _completion(model, message, "stop", len(prompt_text))
+
+    return app
+
+
+def start_in_thread(config: FakeOpenAIConfig, host: str = "127.0.0.1", port: int = 8765) -> uvicorn.Server:
+    """Serve the fake API on a background thread; returns the server (set should_exit to stop)"""
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
@@ -0,0 +1,232 @@
+"""
+Load-test harness for the chatbot API with stubbed LLM, vector store and search.
+
+Boots the FastAPI app from main.py in-process, backed by:
+  - a fake OpenAI-compatible server with configurable latency (fake_openai.py)
+  - an in-memory vector store instead of Weaviate and a mock embedding model
+  - a fake Tavily client
+  - a seeded local Postgres (DATABASE_URL, schema applied with `prisma db push`)
+
+and drives /ai/chatbot/chat, /ai/chatbot/history and /ai/dashboard/* at the
+requested concurrency. Reports throughput, p50/p95/p99 per endpoint and
+per-stage timings from the tracing spans.
+
+    DATABASE_URL=postgresql://localhost/vonder_bench \\
+        python -m benchmarks.chat_load.run --scenarios chat,history,dashboard \\
+        --requests 200 --concurrency 16 --llm-latency-ms 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+
+from benchmarks.chat_load.fake_openai import FakeOpenAIConfig, start_in_thread
+from benchmarks.chat_load.stand_ins import Faults, configure_environment, install_stand_ins
+
+# Settings fields the harness never talks to
+PLACEHOLDER_ENV = {
+    "JWT_SECRET": "benchmark-secret",
+    "GOOGLE_CLIENT_ID": "-",
+    "GOOGLE_CLIENT_SECRET": "-",
+    "GOOGLE_CALLBACK_URL": "-",
+    "FRONTEND_URL": "http://localhost:3000",
+    "CLOUDINARY_CLOUD_NAME": "-",
+    "CLOUDINARY_API_KEY": "-",
+    "CLOUDINARY_API_SECRET": "-",
+    "WEAVIATE_URL": "-",
+    "WEAVIATE_API_KEY": "-",
+    "TAVILY_API_KEY": "-",
+    "APP_NAME": "vonder-benchmark",
+    "ENVIRONMENT": "benchmark",
+    "LOG_LEVEL": "WARNING",
+}
+
+QUESTIONS = [
+    "Đà Lạt có gì chơi vào tháng 7?",
+    "Tour Đà Lạt 3 ngày còn chỗ không?",
+    "What to eat in Hội An?",
+    "Sự kiện sắp tới ở Hà Nội?",
+    "Best time to visit Phú Quốc?",
+    "xin chào",
+]
+
+DASHBOARD_PATHS = [
+    "/ai/dashboard/user-growth",
+    "/ai/dashboard/top-locations",
+    "/ai/dashboard/blog-engagement",
+    "/ai/dashboard/trip-analytics",
+    "/ai/dashboard/chatbot-usage",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(values) * 1000, 1) if values else 0.0,
+    }
+
+
+def build_request(scenario: str, i: int):
+    if scenario == "chat":
+        question = QUESTIONS[i % len(QUESTIONS)]
+        return "POST", "/ai/chatbot/chat", {"message": {"message": question, "sessionId": None}}
+    if scenario == "history":
+        return "GET", "/ai/chatbot/history?page=1&limit=20", None
+    if scenario == "dashboard":
+        return "GET", DASHBOARD_PATHS[i % len(DASHBOARD_PATHS)], None
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def run_scenario(client, scenario: str, tokens, requests: int, concurrency: int):
+    latencies = defaultdict(list)
+    statuses = defaultdict(int)
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            method, path, body = build_request(scenario, i)
+            headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                statuses[response.status_code] += 1
+            except Exception:
+                statuses["error"] += 1
+                continue
+            latencies[path.split("?")[0]].append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "scenario": scenario,
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "statuses": dict(statuses),
+        "endpoints": {path: summarize(values) for path, values in latencies.items()},
+    }
+
+
+async def main(args):
+    import httpx
+
+    from app.auth.dependencies import create_access_token
+    from app.db.prisma_client import prisma
+    from app.monitoring.tracing import add_span_listener
+    from app.resilience.dependencies import dependency_status
+    from benchmarks.chat_load.seed import seed, cleanup
+    from main import app
+
+    install_stand_ins(
+        args.tavily_latency_ms,
+        tavily_faults=Faults(args.tavily_error_rate, args.tavily_stall_rate, args.stall_ms),
+        vector_faults=Faults(args.vector_error_rate, args.vector_stall_rate, args.stall_ms),
+    )
+
+    stage_timings = defaultdict(list)
+    add_span_listener(lambda span: stage_timings[span.name].append(span.duration))
+
+    await prisma.connect()
+    users, agency_id, location_id = [], None, None
+    try:
+        _, users, agency_id, location_id = await seed(args.users, args.sessions_per_user, args.messages_per_session, args.tours)
+        tokens = [create_access_token({"sub": user.email, "email": user.email}) for user in users]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout) as client:
+            reports = []
+            for scenario in args.scenarios.split(","):
+                stage_timings.clear()
+                report = await run_scenario(client, scenario.strip(), tokens, args.requests, args.concurrency)
+                report["stages"] = {name: summarize(values) for name, values in sorted(stage_timings.items())}
+                report["dependencies"] = dependency_status()
+                reports.append(report)
+                print_report(report)
+    finally:
+        if users:
+            await cleanup(users, agency_id, location_id)
+        await prisma.disconnect()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+
+
+def print_report(report):
+    print(f"\n== {report['scenario']}: {report['requests']} requests, concurrency {report['concurrency']} ==")
+    print(f"throughput {report['throughput_rps']} req/s in {report['elapsed_s']} s, statuses {report['statuses']}")
+    open_circuits = [name for name, entry in report["dependencies"].items() if entry["state"] != "closed"]
+    if open_circuits:
+        print(f"circuits not closed at the end: {', '.join(open_circuits)}")
+    print(f"{'endpoint / stage':<40}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in list(report["endpoints"].items()) + [("  " + k, v) for k, v in report["stages"].items()]:
+        print(f"{name:<40}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="chat,history,dashboard")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=8, help="distinct users the requests are spread over")
+    parser.add_argument("--sessions-per-user", type=int, default=20)
+    parser.add_argument("--messages-per-session", type=int, default=10)
+    parser.add_argument("--tours", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--tool-call-rate", type=float, default=0.7)
+    parser.add_argument("--tavily-latency-ms", type=float, default=500.0)
+    parser.add_argument("--fake-openai-port", type=int, default=8765)
+    # Fault injection: share of calls failing / stalling for --stall-ms, per dependency
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-stall-rate", type=float, default=0.0)
+    parser.add_argument("--tavily-error-rate", type=float, default=0.0)
+    parser.add_argument("--tavily-stall-rate", type=float, default=0.0)
+    parser.add_argument("--vector-error-rate", type=float, default=0.0)
+    parser.add_argument("--vector-stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-ms", type=float, default=20000.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="write the reports as JSON")
+    args = parser.parse_args()
+
+    for key, value in PLACEHOLDER_ENV.items():
+        os.environ.setdefault(key, value)
+    if "DATABASE_URL" not in os.environ:
+        parser.error("DATABASE_URL must point at a local Postgres with the schema applied (prisma db push)")
+
+    fake_server = start_in_thread(
+        FakeOpenAIConfig(
+            args.llm_latency_ms, args.llm_jitter_ms, args.tool_call_rate,
+            error_rate=args.llm_error_rate, stall_rate=args.llm_stall_rate, stall_ms=args.stall_ms,
+        ),
+        port=args.fake_openai_port,
+    )
+    configure_environment(f"http://127.0.0.1:{args.fake_openai_port}/v1")
+    try:
+        asyncio.run(main(args))
+    finally:
+        fake_server.should_exit = True
@@ -0,0 +1,67 @@
+"""Seed and remove the benchmark data set (users, locations, tours, chat sessions)"""
+import uuid
+from datetime import datetime, timedelta
+
+from app.db.prisma_client import prisma
+
+TAG_PREFIX = "bench-"
+
+
+async def seed(users: int, sessions_per_user: int, messages_per_session: int, tours: int):
+    tag = TAG_PREFIX + uuid.uuid4().hex[:8]
+    created_users = []
+    for i in range(users):
+        user = await prisma.user.create(data={
+            "name": f"{tag} user {i}",
+            "email": f"{tag}-{i}@bench.local",
+            "role": "ADMIN",
+        })
+        created_users.append(user)
+
+    agency = await prisma.agency.create(data={"name": tag, "email": f"{tag}@agency.local", "password": "-"})
+    location = await prisma.location.create(data={
+        "name": f"{tag} Đà Lạt",
+        "description": "benchmark",
+        "coverImage": "",
+        "category": "mountain",
+        "province": "LAM_DONG",
+    })
+    now = datetime.now()
+    await prisma.tour.create_many(data=[
+        {
+            "title": f"{tag} tour Đà Lạt {i}",
+            "description": "Tour benchmark " * 20,
+            "price": 1500000 + i * 1000,
+            "duration": 3,
+            "maxCapacity": 20,
+            "itinerary": "[]",
+            "agencyId": agency.id,
+            "locationId": location.id,
+            "province": "LAM_DONG",
+            "startDates": [now + timedelta(days=d) for d in (7, 14, 21)],
+        }
+        for i in range(tours)
+    ])
+
+    for user in created_users:
+        for s in range(sessions_per_user):
+            title_chat = await prisma.titlechat.create(data={"title": f"{tag} session {s}", "userId": user.id})
+            await prisma.chat.create_many(data=[
+                {
+                    "role": "USER" if m % 2 == 0 else "ASSISTANT",
+                    "content": f"benchmark message {m}",
+                    "titleChatId": title_chat.id,
+                }
+                for m in range(messages_per_session)
+            ])
+
+    return tag, created_users, agency.id, location.id
+
+
+async def cleanup(users, agency_id: str, location_id: str):
+    user_ids = [user.id for user in users]
+    await prisma.chat.delete_many(where={"titleChat": {"userId": {"in": user_ids}}})
+    await prisma.titlechat.delete_many(where={"userId": {"in": user_ids}})
+    await prisma.location.delete_many(where={"id": location_id})
+    await prisma.agency.delete_many(where={"id": agency_id})
+    await prisma.user.delete_many(where={"id": {"in": user_ids}})
@@ -0,0 +1,110 @@
+"""
+Local stand-ins for the external dependencies of the chat pipeline.
+
+`configure_environment` must run before anything under `app` is imported: it
+points the OpenAI clients at the fake server and swaps the HuggingFace
+embedding model for a deterministic mock. `install_stand_ins` runs after the
+import and replaces the Weaviate index with an in-memory vector store and the
+Tavily client with a canned-response fake. Both can inject faults (errors and
+stalls) and sit behind the same circuit breakers as the real clients, so the
+breakers and the degraded answers can be load-tested locally.
+"""
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import ClassVar
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQueryMode
+
+EMBED_DIM = 768
+
+DOCUMENTS = [
+    ("Đà Lạt", "Đà Lạt nổi tiếng với khí hậu mát mẻ, hồ Xuân Hương, đồi chè Cầu Đất và chợ đêm."),
+    ("Hạ Long", "Vịnh Hạ Long có hàng nghìn đảo đá vôi, du thuyền qua đêm và hang Sửng Sốt."),
+    ("Hội An", "Phố cổ Hội An với đèn lồng, chùa Cầu, cao lầu và bánh mì Phượng."),
+    ("Sa Pa", "Sa Pa có ruộng bậc thang, đỉnh Fansipan và chợ phiên vùng cao."),
+    ("Phú Quốc", "Phú Quốc có bãi Sao, làng chài Hàm Ninh và mùa khô từ tháng 11 đến tháng 4."),
+    ("Huế", "Huế có Đại Nội, lăng tẩm các vua Nguyễn và ẩm thực cung đình."),
+]
+
+
+def configure_environment(openai_base_url: str):
+    os.environ["OPENAI_API_BASE"] = openai_base_url
+    os.environ["OPENAI_BASE_URL"] = openai_base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    from llm_integration import embedding_client
+    embedding_client.embed_model = MockEmbedding(embed_dim=EMBED_DIM)
+
+
+@dataclass
+class Faults:
+    """Share of calls that fail, and share that stall for stall_ms before answering"""
+    error_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_ms: float = 0.0
+
+    def stall_seconds(self) -> float:
+        return self.stall_ms / 1000 if random.random() < self.stall_rate else 0.0
+
+    def maybe_fail(self, name: str):
+        if random.random() < self.error_rate:
+            raise ConnectionError(f"injected {name} failure")
+
+
+class InMemoryVectorStore(SimpleVectorStore):
+    """SimpleVectorStore that accepts the hybrid queries the tools issue (served dense-only)"""
+
+    faults: ClassVar[Faults] = Faults()
+
+    def query(self, query, **kwargs):
+        from app.resilience.dependencies import WEAVIATE, guard_sync
+
+        # Stands in for Weaviate, so it answers to (and trips) the weaviate breaker
+        with guard_sync(WEAVIATE):
+            time.sleep(self.faults.stall_seconds())
+            self.faults.maybe_fail("vector store")
+            if query.mode == VectorStoreQueryMode.HYBRID:
+                query.mode = VectorStoreQueryMode.DEFAULT
+            return super().query(query, **kwargs)
+
+
+class FakeTavilyClient:
+    def __init__(self, latency_ms: float, faults: Faults = None):
+        self.latency_ms = latency_ms
+        self.faults = faults or Faults()
+
+    async def search(self, query: str, **kwargs):
+        await asyncio.sleep(self.latency_ms / 1000 * random.uniform(0.5, 1.5) + self.faults.stall_seconds())
+        self.faults.maybe_fail("tavily")
+        return {
+            "results": [
+                {"title": f"Kết quả {i} cho {query[:40]}", "content": text, "url": f"https://example.com/{i}"}
+                for i, (_, text) in enumerate(DOCUMENTS[:3])
+            ]
+        }
+
+
+def build_in_memory_index() -> VectorStoreIndex:
+    from llm_integration.embedding_client import get_embed_model
+
+    nodes = [
+        TextNode(text=text, metadata={"title": title, "document_title": title, "date": "2025-01-01", "source": "benchmark"})
+        for title, text in DOCUMENTS
+    ]
+    return VectorStoreIndex(nodes, vector_store=InMemoryVectorStore(), embed_model=get_embed_model())
+
+
+def install_stand_ins(tavily_latency_ms: float, tavily_faults: Faults = None, vector_faults: Faults = None):
+    from app.chatbot.tools import tools
+    from llm_integration import tavily_client
+
+    InMemoryVectorStore.faults = vector_faults or Faults()
+    tools._loaded_index = build_in_memory_index()
+    tavily_client.tavily_client = tavily_client.GuardedTavilyClient(FakeTavilyClient(tavily_latency_ms, tavily_faults))
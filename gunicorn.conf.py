@@ -0,0 +1,60 @@
+# Multi-process serving: gunicorn manages uvicorn workers sized to the cores.
+#
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# preload_app imports main.py once in the master, so the halong embedding model
+# is loaded a single time and shared copy-on-write by every forked worker.
+# Per-process resources (Prisma connection, Weaviate client, executors) are
+# created lazily or on startup inside each worker. Shared state (sessions,
+# admission counters, caches) needs STATE_BACKEND=redis when workers > 1.
+# Metrics are per worker too: each worker writes its registry to
+# METRICS_MULTIPROC_DIR and /metrics merges them (app.monitoring.multiprocess),
+# so a scrape sees every worker whichever one answers it.
+import multiprocessing
+import os
+import tempfile
+
+# Set before app.config is imported: workers inherit the environment and the settings
+os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "chatbot-metrics"))
+
+from app.config import settings
+from app.monitoring import multiprocess as metrics_multiprocess
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# One worker per core once state is shared; a single worker otherwise
+workers = int(os.getenv(
+    "WEB_CONCURRENCY",
+    multiprocessing.cpu_count() if settings.STATE_BACKEND == "redis" else 1
+))
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    if workers > 1 and settings.STATE_BACKEND != "redis":
+        server.log.warning(
+            "Running %s workers with STATE_BACKEND=%s: sessions, admission limits and caches "
+            "are per worker. Set STATE_BACKEND=redis to share them.", workers, settings.STATE_BACKEND
+        )
+    # Metrics don't depend on STATE_BACKEND: /metrics merges the workers' snapshots
+    # from this directory; gauges carry a worker="<pid>" label
+    metrics_multiprocess.clear()
+    server.log.info("Worker metrics are merged from %s", settings.METRICS_MULTIPROC_DIR)
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters in the totals, drop its gauges
+    metrics_multiprocess.mark_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # Split the cores between the workers' torch thread pools instead of every
+    # worker spinning up cpu_count threads for the embedding model
+    try:
+        import torch
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // workers))
+    except ImportError:
+        pass
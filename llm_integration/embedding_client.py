@@ -2,8 +2,11 @@
 
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 
-# Create and store the embed model
-embed_model = HuggingFaceEmbedding(model_name="hiieu/halong_embedding")
+# Loaded on first use, so tools and scripts that never embed don't pay for it
+embed_model = None
 
 def get_embed_model():
+    global embed_model
+    if embed_model is None:
+        embed_model = HuggingFaceEmbedding(model_name="hiieu/halong_embedding")
     return embed_model
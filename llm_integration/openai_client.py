@@ -3,31 +3,67 @@ import os
 import openai
 from dotenv import load_dotenv
 
+from app.config import settings
+from app.resilience.dependencies import OPENAI, guard, guard_sync
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Get the API key from environment
 api_key = os.getenv("OPENAI_API_KEY")
 
-llmTitle = OpenAI(        
+# Fail fast instead of the SDK default (600s timeout, 3 retries); the breaker does the rest
+timeout = settings.OPENAI_TIMEOUT_SECONDS
+max_retries = settings.OPENAI_MAX_RETRIES
+
+
+class GuardedOpenAI(OpenAI):
+    """OpenAI LLM whose calls go through the openai circuit breaker"""
+
+    def _chat(self, messages, **kwargs):
+        with guard_sync(OPENAI):
+            return super()._chat(messages, **kwargs)
+
+    def _complete(self, prompt, **kwargs):
+        with guard_sync(OPENAI):
+            return super()._complete(prompt, **kwargs)
+
+    async def _achat(self, messages, **kwargs):
+        async with guard(OPENAI):
+            return await super()._achat(messages, **kwargs)
+
+    async def _acomplete(self, prompt, **kwargs):
+        async with guard(OPENAI):
+            return await super()._acomplete(prompt, **kwargs)
+
+
+llmTitle = GuardedOpenAI(        
         temperature=0.2,
         model="gpt-4o-mini",
-        api_key=api_key)
+        api_key=api_key,
+        timeout=timeout,
+        max_retries=max_retries)
 
-llmAgent = OpenAI(
+llmAgent = GuardedOpenAI(
         temperature=0.1,
         model="gpt-4o-mini",
-        api_key=api_key)
+        api_key=api_key,
+        timeout=timeout,
+        max_retries=max_retries)
 
-llmRetriever = OpenAI(
+llmRetriever = GuardedOpenAI(
         temperature=0,
         model="gpt-4o-mini",
-        api_key=api_key)
+        api_key=api_key,
+        timeout=timeout,
+        max_retries=max_retries)
 
-llmTransform = OpenAI(
+llmTransform = GuardedOpenAI(
         temperature=0.2,
         model="gpt-4o-mini",
-        api_key=api_key)
+        api_key=api_key,
+        timeout=timeout,
+        max_retries=max_retries)
 
 
 def get_llmTitle():
@@ -40,4 +76,4 @@ def get_llmRetriever():
     return llmRetriever
 
 def get_llmTransform():
-    return llmTransform
\ No newline at end of file
+    return llmTransform
@@ -0,0 +1,31 @@
+from tavily import AsyncTavilyClient
+from dotenv import load_dotenv
+import os
+
+from app.config import settings
+from app.resilience.dependencies import TAVILY, guard
+
+# Load environment variables from .env file
+load_dotenv()
+
+api_key = os.getenv("TAVILY_API_KEY")
+timeout = settings.TAVILY_TIMEOUT_SECONDS
+
+
+class GuardedTavilyClient:
+    """Tavily client whose searches go through the tavily circuit breaker"""
+
+    def __init__(self, client, timeout: float = timeout):
+        self.client = client
+        self.timeout = timeout
+
+    async def search(self, query: str, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        async with guard(TAVILY):
+            return await self.client.search(query, **kwargs)
+
+
+tavily_client = GuardedTavilyClient(AsyncTavilyClient(api_key=api_key))
+
+def get_tavily_client():
+    return tavily_client
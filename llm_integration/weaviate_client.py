@@ -1,19 +1,41 @@
 from llama_index.vector_stores.weaviate import WeaviateVectorStore
 import weaviate
+from weaviate.classes.init import AdditionalConfig, Timeout
 from dotenv import load_dotenv
 import os 
 
+from app.config import settings
+from app.resilience.dependencies import WEAVIATE, guard, guard_sync
+
 # Load environment variables from .env file
 load_dotenv()
 
 cluster_url = os.getenv("WEAVIATE_URL")
 api_key = os.getenv("WEAVIATE_API_KEY")
+query_timeout = int(settings.WEAVIATE_QUERY_TIMEOUT_SECONDS)
 
-weaviate_client = weaviate.connect_to_weaviate_cloud(
-    cluster_url=cluster_url,
-    auth_credentials=weaviate.auth.AuthApiKey(api_key),
-    skip_init_checks=True,
-)
+# Connected on first use so importing the app never opens a WAN connection
+weaviate_client = None
 
 def get_weaviate_client () :
-    return weaviate_client
\ No newline at end of file
+    global weaviate_client
+    if weaviate_client is None:
+        weaviate_client = weaviate.connect_to_weaviate_cloud(
+            cluster_url=cluster_url,
+            auth_credentials=weaviate.auth.AuthApiKey(api_key),
+            skip_init_checks=True,
+            additional_config=AdditionalConfig(timeout=Timeout(init=10, query=query_timeout, insert=60)),
+        )
+    return weaviate_client
+
+
+class GuardedWeaviateVectorStore(WeaviateVectorStore):
+    """WeaviateVectorStore whose queries go through the weaviate circuit breaker"""
+
+    def query(self, query, **kwargs):
+        with guard_sync(WEAVIATE):
+            return super().query(query, **kwargs)
+
+    async def aquery(self, query, **kwargs):
+        async with guard(WEAVIATE):
+            return await super().aquery(query, **kwargs)
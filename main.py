@@ -1,14 +1,23 @@
 import asyncio
 import os
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from app.config import settings
 from app.db.prisma_client import initialize_prisma, close_prisma
+from app.state.store import close_store
 from app.auth.router import router as auth_router
 from app.chatbot.router import router as chatbot_router
 from app.dashboard.router import router as dashboard_router
+from app.monitoring.router import router as monitoring_router
+from app.monitoring import multiprocess as metrics_multiprocess
+from app.monitoring.tracing import start_trace
+from app.monitoring.log import setup_logging, shutdown_logging
+from app.jobs.queue import get_job_queue
+import app.chatbot.jobs  # registers the chat background job handlers
+from app.chatbot.idempotency import schedule_idempotency_sweep
+from app.chatbot.tools.gazetteer import gazetteer
 from dotenv import load_dotenv
 import os
 import sys
@@ -18,6 +27,15 @@ if sys.platform.startswith("win"):
 # Load environment variables from the .env file
 load_dotenv()
 
+# Structured, sampled, non-blocking logging for the whole process
+setup_logging(
+    level=settings.LOG_LEVEL,
+    json_format=settings.LOG_JSON,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    redact_fields=[field.strip() for field in settings.LOG_REDACT_FIELDS.split(",") if field.strip()],
+    queue_size=settings.LOG_QUEUE_SIZE,
+)
+
 # Get the frontend URL from the environment variable
 frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
@@ -44,16 +62,36 @@ app.add_middleware(
 app.include_router(auth_router, prefix='/ai')
 app.include_router(chatbot_router, prefix='/ai')
 app.include_router(dashboard_router, prefix='/ai')
+app.include_router(monitoring_router)
+
+# Request-scoped trace: every stage span of the request nests under this root
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    with start_trace("request", method=request.method, path=request.url.path) as root:
+        response = await call_next(request)
+        root.set_attribute("status_code", response.status_code)
+        response.headers["X-Trace-Id"] = root.trace.trace_id
+        return response
 
 # Startup event
 @app.on_event("startup")
 async def startup():
     await initialize_prisma()
+    get_job_queue().start()
+    await schedule_idempotency_sweep()
+    await gazetteer.refresh(full=True)
+    metrics_multiprocess.start()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown():
+    await get_job_queue().stop()
+    await metrics_multiprocess.stop()
     await close_prisma()
+    await close_store()
+    shutdown_logging()
 
 # Root endpoint
 @app.get("/")
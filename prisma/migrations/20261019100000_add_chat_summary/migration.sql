@@ -0,0 +1,3 @@
+-- AlterTable
+ALTER TABLE "TitleChat" ADD COLUMN     "summarizedUntil" TIMESTAMP(3),
+ADD COLUMN     "summary" TEXT;
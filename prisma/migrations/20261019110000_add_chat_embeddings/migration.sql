@@ -0,0 +1,23 @@
+-- CreateExtension
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- CreateTable
+CREATE TABLE "ChatEmbedding" (
+    "chatId" TEXT NOT NULL,
+    "userId" TEXT NOT NULL,
+    "titleChatId" TEXT,
+    "role" "ChatRole" NOT NULL,
+    "content" TEXT NOT NULL,
+    "embedding" vector(768) NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "ChatEmbedding_pkey" PRIMARY KEY ("chatId")
+);
+
+-- CreateIndex
+-- Searches are always scoped to one user, so the planner narrows by this index
+-- and ranks that user's rows exactly; no ANN index is needed at per-user scale.
+CREATE INDEX "ChatEmbedding_userId_createdAt_idx" ON "ChatEmbedding"("userId", "createdAt");
+
+-- AddForeignKey
+ALTER TABLE "ChatEmbedding" ADD CONSTRAINT "ChatEmbedding_chatId_fkey" FOREIGN KEY ("chatId") REFERENCES "Chat"("id") ON DELETE CASCADE ON UPDATE CASCADE;
@@ -0,0 +1,32 @@
+-- CreateExtension
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- CreateTable
+CREATE TABLE "KnowledgeChunk" (
+    "id" TEXT NOT NULL,
+    "collection" TEXT NOT NULL,
+    "refDocId" TEXT,
+    "content" TEXT NOT NULL,
+    "title" TEXT,
+    "documentTitle" TEXT,
+    "date" TEXT,
+    "source" TEXT,
+    "metadata" JSONB NOT NULL DEFAULT '{}',
+    "embedding" vector(768) NOT NULL,
+    "searchVector" tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', coalesce("title", '') || ' ' || coalesce("documentTitle", '') || ' ' || "content")
+    ) STORED,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "KnowledgeChunk_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "KnowledgeChunk_collection_refDocId_idx" ON "KnowledgeChunk"("collection", "refDocId");
+
+-- CreateIndex
+CREATE INDEX "KnowledgeChunk_embedding_hnsw_idx" ON "KnowledgeChunk" USING hnsw ("embedding" vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- CreateIndex
+CREATE INDEX "KnowledgeChunk_searchVector_idx" ON "KnowledgeChunk" USING gin ("searchVector");
@@ -0,0 +1,15 @@
+-- CreateTable
+CREATE TABLE "KnowledgeDocument" (
+    "collection" TEXT NOT NULL,
+    "docId" TEXT NOT NULL,
+    "contentHash" TEXT NOT NULL,
+    "chunkCount" INTEGER NOT NULL,
+    "source" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "KnowledgeDocument_pkey" PRIMARY KEY ("collection","docId")
+);
+
+-- CreateIndex
+CREATE INDEX "KnowledgeDocument_collection_contentHash_idx" ON "KnowledgeDocument"("collection", "contentHash");
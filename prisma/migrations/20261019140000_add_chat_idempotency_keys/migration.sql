@@ -0,0 +1,19 @@
+-- CreateEnum
+CREATE TYPE "IdempotencyStatus" AS ENUM ('IN_PROGRESS', 'COMPLETED');
+
+-- CreateTable
+CREATE TABLE "ChatIdempotencyKey" (
+    "userId" TEXT NOT NULL,
+    "key" TEXT NOT NULL,
+    "requestHash" TEXT NOT NULL,
+    "status" "IdempotencyStatus" NOT NULL DEFAULT 'IN_PROGRESS',
+    "response" TEXT,
+    "expiresAt" TIMESTAMP(3) NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "ChatIdempotencyKey_pkey" PRIMARY KEY ("userId","key")
+);
+
+-- CreateIndex
+CREATE INDEX "ChatIdempotencyKey_expiresAt_idx" ON "ChatIdempotencyKey"("expiresAt");
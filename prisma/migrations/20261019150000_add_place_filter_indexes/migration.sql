@@ -0,0 +1,14 @@
+-- CreateIndex
+CREATE INDEX "Location_province_idx" ON "Location"("province");
+
+-- CreateIndex
+CREATE INDEX "Trip_locationId_idx" ON "Trip"("locationId");
+
+-- CreateIndex
+CREATE INDEX "EventLocation_locationId_idx" ON "EventLocation"("locationId");
+
+-- CreateIndex
+CREATE INDEX "Tour_locationId_idx" ON "Tour"("locationId");
+
+-- CreateIndex
+CREATE INDEX "Tour_province_idx" ON "Tour"("province");
@@ -0,0 +1,40 @@
+-- CreateTable
+-- One row per element of "Tour"."startDates", kept in sync by the trigger below,
+-- so departures inside a date window are a B-tree range scan
+CREATE TABLE "TourDeparture" (
+    "tourId" TEXT NOT NULL,
+    "startDate" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "TourDeparture_pkey" PRIMARY KEY ("tourId","startDate")
+);
+
+-- CreateIndex
+CREATE INDEX "TourDeparture_startDate_tourId_idx" ON "TourDeparture"("startDate", "tourId");
+
+-- CreateIndex
+CREATE INDEX "TourBooking_tourId_status_idx" ON "TourBooking"("tourId", "status");
+
+-- AddForeignKey
+ALTER TABLE "TourDeparture" ADD CONSTRAINT "TourDeparture_tourId_fkey" FOREIGN KEY ("tourId") REFERENCES "Tour"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- Backfill
+INSERT INTO "TourDeparture" ("tourId", "startDate")
+SELECT DISTINCT "id", unnest("startDates") FROM "Tour"
+ON CONFLICT DO NOTHING;
+
+-- CreateTrigger
+-- Tours are written by the agency app as well, so the table follows "startDates" in the database
+CREATE OR REPLACE FUNCTION "sync_tour_departures"() RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM "TourDeparture"
+    WHERE "tourId" = NEW."id" AND NOT ("startDate" = ANY(COALESCE(NEW."startDates", '{}')));
+    INSERT INTO "TourDeparture" ("tourId", "startDate")
+    SELECT DISTINCT NEW."id", unnest(COALESCE(NEW."startDates", '{}'))
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Tour_sync_departures"
+AFTER INSERT OR UPDATE OF "startDates" ON "Tour"
+FOR EACH ROW EXECUTE FUNCTION "sync_tour_departures"();
@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "BackgroundJob" ADD COLUMN "dedupeKey" TEXT;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "BackgroundJob_dedupeKey_key" ON "BackgroundJob"("dedupeKey");
@@ -0,0 +1,5 @@
+-- CreateIndex
+CREATE INDEX "Chat_createdAt_idx" ON "Chat"("createdAt");
+
+-- CreateIndex
+CREATE INDEX "TitleChat_createdAt_idx" ON "TitleChat"("createdAt");
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.chatbot import jobs as chat_jobs
+from app.jobs import queue
+
+
+class FakeBackgroundJobs:
+    def __init__(self):
+        self.calls = []
+
+    async def create_many(self, data, skip_duplicates=False):
+        self.calls.append((data, skip_duplicates))
+        return len(data)
+
+
+class FakeRows:
+    """count() over rows' createdAt, honouring the gte / lt window"""
+
+    def __init__(self, *created_at):
+        self.created_at = created_at
+        self.windows = []
+
+    async def count(self, where):
+        window = where['createdAt']
+        self.windows.append(window)
+        return sum(1 for at in self.created_at if window['gte'] <= at < window['lt'])
+
+
+class FakeDailyStats:
+    def __init__(self):
+        self.rows = {}
+
+    async def upsert(self, where, data):
+        row = self.rows.get(where['date'])
+        if row is None:
+            self.rows[where['date']] = dict(data['create'])
+        else:
+            row.update(data['update'])
+
+
+def test_enqueue_many_is_one_insert(monkeypatch):
+    backgroundjob = FakeBackgroundJobs()
+    monkeypatch.setattr(queue, "prisma", SimpleNamespace(backgroundjob=backgroundjob))
+
+    created = asyncio.run(queue.JobQueue().enqueue_many([
+        ("chat_volume", {"date": "2026-10-19"}),
+        ("chat_embed", {"chat_ids": ["a", "b"]}),
+        ("chat_summary", {"session_id": "s"}, "summary:s"),
+    ]))
+
+    assert created == 3
+    assert len(backgroundjob.calls) == 1
+    rows, skip_duplicates = backgroundjob.calls[0]
+    assert skip_duplicates
+    assert [row['dedupeKey'] for row in rows] == [None, None, "summary:s"]
+
+
+def test_chat_volume_job_can_run_twice(monkeypatch):
+    day = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    stats = FakeDailyStats()
+    titlechat = FakeRows(day - timedelta(seconds=1), day, day + timedelta(hours=23))
+    chat = FakeRows(day, day + timedelta(hours=12), day + timedelta(days=1), day + timedelta(days=1, hours=1))
+    monkeypatch.setattr(chat_jobs, "prisma", SimpleNamespace(titlechat=titlechat, chat=chat, chatdailystat=stats))
+
+    for _ in range(2):
+        asyncio.run(chat_jobs.record_chat_volume_job({"date": "2026-10-19"}))
+
+    assert titlechat.windows[0] == chat.windows[0] == {'gte': day, 'lt': day + timedelta(days=1)}
+    assert stats.rows == {day: {'date': day, 'sessions': 2, 'messages': 2}}
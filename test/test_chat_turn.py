@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.chatbot import router
+from app.chatbot.deadline import ClientDisconnected, DeadlineExceeded
+from app.db import prisma_client
+
+USER = {'id': 'user-1'}
+
+
+class FakeDatabase:
+    """TitleChat and Chat rows, with the Chat -> TitleChat cascade"""
+
+    def __init__(self):
+        self.sessions, self.messages = {}, {}
+        ids = itertools.count(1)
+        self.titlechat = SimpleNamespace(
+            create=self._creator(self.sessions, ids),
+            find_first=self._find_first,
+            update=self._noop,
+            delete_many=self._delete_sessions,
+        )
+        self.chat = SimpleNamespace(create=self._creator(self.messages, ids), delete_many=self._delete_messages)
+
+    @staticmethod
+    def _creator(table, ids):
+        async def create(data):
+            row = SimpleNamespace(id=f"id-{next(ids)}", **data)
+            table[row.id] = row
+            return row
+        return create
+
+    async def _find_first(self, where):
+        row = self.sessions.get(where['id'])
+        return row if row is not None and row.userId == where['userId'] else None
+
+    async def _noop(self, **kwargs):
+        return None
+
+    async def _delete_sessions(self, where):
+        session = self.sessions.pop(where['id'], None)
+        for message_id in [m.id for m in self.messages.values() if session and m.titleChatId == session.id]:
+            del self.messages[message_id]
+
+    async def _delete_messages(self, where):
+        self.messages.pop(where['id'], None)
+
+
+class FailingEngine:
+    def __init__(self, error):
+        self.error = error
+
+    @asynccontextmanager
+    async def admit(self, user_id):
+        yield
+
+    async def chat(self, user_id, message, session_id=None):
+        raise self.error
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+
+    @asynccontextmanager
+    async def get_prisma():
+        yield database
+
+    monkeypatch.setattr(prisma_client, "get_prisma", get_prisma)
+    return database
+
+
+def send(session_id=None):
+    return asyncio.run(router.process_chat_message(USER, "Tour Đà Lạt tháng 12?", session_id, time.monotonic()))
+
+
+@pytest.mark.parametrize("error", [DeadlineExceeded("budget"), RuntimeError("agent failed")])
+def test_failed_run_in_a_new_session_leaves_nothing(database, monkeypatch, error):
+    monkeypatch.setattr(router, "chatbot_engine", FailingEngine(error))
+
+    for _ in range(2):  # the client's retry
+        with pytest.raises(type(error)):
+            send()
+
+    assert database.sessions == {}
+    assert database.messages == {}
+
+
+def test_failed_run_in_an_existing_session_keeps_the_session(database, monkeypatch):
+    session = asyncio.run(database.titlechat.create({'title': 'Đà Lạt', 'userId': USER['id']}))
+    monkeypatch.setattr(router, "chatbot_engine", FailingEngine(DeadlineExceeded("budget")))
+
+    with pytest.raises(DeadlineExceeded):
+        send(session.id)
+
+    assert list(database.sessions) == [session.id]
+    assert database.messages == {}
+
+
+@pytest.mark.parametrize("error", [ClientDisconnected(), asyncio.CancelledError()])
+def test_cancelled_run_leaves_no_unanswered_question(database, monkeypatch, error):
+    session = asyncio.run(database.titlechat.create({'title': 'Đà Lạt', 'userId': USER['id']}))
+    monkeypatch.setattr(router, "chatbot_engine", FailingEngine(error))
+
+    with pytest.raises(type(error)):
+        send(session.id)
+    with pytest.raises(type(error)):
+        send()
+
+    assert list(database.sessions) == [session.id]
+    assert database.messages == {}
@@ -0,0 +1,45 @@
+from datetime import date
+
+import pytest
+
+from app.chatbot.tools.dates import parse_date_range, strip_phrase
+
+TODAY = date(2026, 10, 19)  # a Monday
+
+
+@pytest.mark.parametrize("question, start, end", [
+    # Tết: the next Lunar New Year, 28 Tết to mùng 4
+    ("Đi đâu dịp Tết?", date(2027, 2, 4), date(2027, 2, 9)),
+    ("Lễ hội Tết Nguyên Đán 2026", date(2026, 2, 15), date(2026, 2, 20)),
+    ("cuối tuần này", date(2026, 10, 24), date(2026, 10, 25)),
+    ("events next weekend", date(2026, 10, 31), date(2026, 11, 1)),
+    # dd/mm range that crosses the new year
+    ("Tour từ 28/12 đến 2/1", date(2026, 12, 28), date(2027, 1, 2)),
+    ("sự kiện tháng 7", date(2027, 7, 1), date(2027, 7, 31)),
+    ("thứ 7 tuần sau", date(2026, 10, 31), date(2026, 10, 31)),
+    # "thu nam" is also Thursday, but not after "mùa"
+    ("mùa thu năm nay", date(2026, 1, 1), date(2026, 12, 31)),
+])
+def test_parse_date_range(question, start, end):
+    date_range = parse_date_range(question, today=TODAY)
+
+    assert (date_range.start, date_range.end) == (start, end)
+
+
+@pytest.mark.parametrize("question", ["Du lịch Việt Nam 2025", "Tour 3-4 ngày cho 1-2 người", ""])
+def test_no_date(question):
+    assert parse_date_range(question, today=TODAY) is None
+
+
+@pytest.mark.parametrize("question, phrase, rest", [
+    ("Lễ hội hoa vào cuối tuần này", "cuối tuần này", "Lễ hội hoa"),
+    # The connecting word also goes at the start of the question
+    ("Vào tháng 7 Đà Lạt có gì?", "tháng 7", "Đà Lạt có gì?"),
+    ("Từ 28/12 đến 2/1 có tour Sapa không", "28/12 đến 2/1", "có tour Sapa không"),
+    ("Hội An tháng 7", "tháng 7", "Hội An"),
+    # Only stop words left: no text filter
+    ("Sự kiện nào vào cuối tuần này?", "cuối tuần này", ""),
+    ("Có tour nào dịp Tết không?", "Tết", ""),
+])
+def test_strip_phrase(question, phrase, rest):
+    assert strip_phrase(question, phrase) == rest
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.chatbot import service
+from app.chatbot.agent import ParallelToolAgent
+from app.resilience import dependencies
+from app.resilience.breaker import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, DependencyBreaker
+from app.resilience.dependencies import OPENAI, TAVILY, guard
+
+RESET_SECONDS = 0.05
+
+
+class FakeLLM:
+    """Stands in for GuardedOpenAI: every call goes through guard(OPENAI)"""
+
+    async def apredict(self, prompt, **kwargs):
+        async with guard(OPENAI):
+            return "similar question"
+
+
+class FakeAgent:
+    def __init__(self, tools, **kwargs):
+        pass
+
+    async def achat(self, message):
+        async with guard(OPENAI):
+            return SimpleNamespace(response="answer", sources=[])
+
+
+@pytest.fixture
+def openai_breaker(monkeypatch):
+    breaker = DependencyBreaker(f"dependency.{OPENAI}", min_calls=1, reset_timeout=RESET_SECONDS)
+    monkeypatch.setitem(dependencies._breakers, OPENAI, breaker)
+    monkeypatch.setattr(service, "get_llmAgent", lambda: FakeLLM())
+    monkeypatch.setattr(service, "get_llmTransform", lambda: FakeLLM())
+    monkeypatch.setattr(service, "ParallelToolAgent", FakeAgent)
+    return breaker
+
+
+def ask():
+    return asyncio.run(service.get_answer("Hà Nội có gì vui?", chat_id=None, user_id=None, personal=False))
+
+
+def test_fail_fast_does_not_take_the_half_open_trial():
+    breaker = DependencyBreaker("test", min_calls=1, reset_timeout=RESET_SECONDS)
+    breaker.record_failure()
+    time.sleep(RESET_SECONDS * 2)
+
+    for _ in range(3):
+        breaker.fail_fast()
+    assert breaker.allow()  # the trial is still there for the real call
+    assert not breaker.allow()
+
+
+def test_get_answer_open_half_open_closed(openai_breaker):
+    openai_breaker.record_failure()
+    assert openai_breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        ask()
+
+    time.sleep(RESET_SECONDS * 2)
+    assert openai_breaker.state == HALF_OPEN
+    # The first request after the reset timeout is the trial, and it closes the circuit
+    assert ask() == "answer"
+    assert openai_breaker.state == CLOSED
+    assert ask() == "answer"
+
+
+def test_get_answer_failed_trial_reopens(openai_breaker, monkeypatch):
+    class FailingLLM(FakeLLM):
+        async def apredict(self, prompt, **kwargs):
+            async with guard(OPENAI):
+                raise RuntimeError("503 from upstream")
+
+    openai_breaker.record_failure()
+    time.sleep(RESET_SECONDS * 2)
+    monkeypatch.setattr(service, "get_llmTransform", lambda: FailingLLM())
+    with pytest.raises(RuntimeError):
+        ask()
+    assert openai_breaker.state == OPEN
+
+
+class HangingSearch:
+    """A tool whose Tavily call never comes back"""
+
+    metadata = SimpleNamespace(name="hanging_search")
+
+    async def acall(self, **kwargs):
+        async with guard(TAVILY):
+            await asyncio.sleep(10)
+
+
+@pytest.fixture
+def tavily_breaker(monkeypatch):
+    breaker = DependencyBreaker(f"dependency.{TAVILY}", min_calls=1, slow_call_seconds=0.05, slow_call_rate=0.5)
+    monkeypatch.setitem(dependencies._breakers, TAVILY, breaker)
+    return breaker
+
+
+def call_tool(timeout):
+    agent = ParallelToolAgent([HangingSearch()], llm=None, tool_timeout=timeout, answer_reserve=0)
+    return agent._call_tool(SimpleNamespace(tool_name="hanging_search", tool_kwargs={}))
+
+
+def test_call_cut_off_by_the_tool_timeout_counts_as_slow(tavily_breaker):
+    output = asyncio.run(call_tool(timeout=0.1))
+
+    assert output.is_error
+    assert tavily_breaker.state == OPEN
+
+
+def test_call_cut_off_before_the_slow_threshold_is_not_recorded(tavily_breaker):
+    asyncio.run(call_tool(timeout=0.01))
+
+    assert tavily_breaker.state == CLOSED
+    assert tavily_breaker.stats()["calls"] == 0
+
+
+def test_cancellation_from_outside_is_not_recorded(tavily_breaker):
+    async def disconnect():
+        task = asyncio.ensure_future(call_tool(timeout=5))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(disconnect())
+
+    assert tavily_breaker.state == CLOSED
+    assert tavily_breaker.stats()["calls"] == 0
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.chatbot.tools import gazetteer as gazetteer_module
+from app.chatbot.tools.gazetteer import LOCATION, Gazetteer, place_filters
+
+T0 = datetime(2026, 10, 19, 8, 0)
+
+
+class FakeLocations:
+    def __init__(self, rows):
+        self.rows = {row.id: row for row in rows}
+
+    async def find_many(self, where, order):
+        since = where.get('updatedAt', {}).get('gt')
+        rows = [row for row in self.rows.values() if since is None or row.updatedAt > since]
+        return sorted(rows, key=lambda row: row.updatedAt)
+
+
+def location(location_id, name, minutes):
+    return SimpleNamespace(id=location_id, name=name, province="LAM_DONG", updatedAt=T0 + timedelta(minutes=minutes))
+
+
+def fake_prisma(locations):
+    async def query_raw(sql, *args):
+        return [{'id': location_id} for location_id in locations.rows]
+    return SimpleNamespace(location=locations, query_raw=query_raw)
+
+
+def location_ids(gazetteer, text):
+    return {place.id for match in gazetteer.extract(text) for place in match.places if place.kind == LOCATION}
+
+
+def test_incremental_refresh_drops_rows_deleted_alongside_an_insert(monkeypatch):
+    locations = FakeLocations([location("l1", "Hồ Xuân Hương", 0), location("l2", "Thung Lũng Tình Yêu", 1)])
+    monkeypatch.setattr(gazetteer_module, "prisma", fake_prisma(locations))
+    gazetteer = Gazetteer()
+    asyncio.run(gazetteer.refresh(full=True))
+
+    # Same row count as before: one delete, one insert
+    del locations.rows["l1"]
+    locations.rows["l3"] = location("l3", "Đồi Chè Cầu Đất", 2)
+    asyncio.run(gazetteer.refresh())
+
+    assert location_ids(gazetteer, "Hồ Xuân Hương có đẹp không") == set()
+    assert location_ids(gazetteer, "đi Đồi Chè Cầu Đất") == {"l3"}
+    assert location_ids(gazetteer, "thung lung tinh yeu") == {"l2"}
+
+
+@pytest.mark.parametrize("question", [
+    "có tổ chức lễ hội không",  # "co to" is Cô Tô once folded
+    "tour for me and my son next week",  # Mỹ Sơn
+    "mua con dao ở đâu",  # Côn Đảo
+    "Thủ đô có gì vui",
+])
+def test_everyday_phrases_are_not_places(question):
+    assert place_filters(Gazetteer().extract(question)) == {}
+
+
+@pytest.mark.parametrize("question, provinces", [
+    ("Sự kiện nào có tổ chức ở Huế", ["THUA_THIEN_HUE"]),
+    ("Đi Cô Tô mùa nào đẹp", ["QUANG_NINH"]),
+    ("Mỹ Sơn có gì", ["QUANG_NAM"]),
+    ("Sài Gòn và da lat", ["HO_CHI_MINH", "LAM_DONG"]),
+])
+def test_places(question, provinces):
+    assert place_filters(Gazetteer().extract(question)) == {"provinces": provinces}
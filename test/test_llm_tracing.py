@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.monitoring import llm, tracing
+from app.monitoring.tracing import span, start_trace
+
+
+class FakeStart(SimpleNamespace):
+    pass
+
+
+class FakeEnd(SimpleNamespace):
+    pass
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(llm, "_START_EVENTS", (FakeStart,))
+    monkeypatch.setattr(llm, "_END_EVENTS", (FakeEnd,))
+    monkeypatch.setattr(llm, "_MAX_PENDING", 2)
+    monkeypatch.setattr(llm, "_pending", llm.OrderedDict())
+    return llm.ChatTraceEventHandler()
+
+
+def start(handler, span_id):
+    handler.handle(FakeStart(span_id=span_id, model_dict={"model": "gpt-4o-mini"}))
+
+
+def end(handler, span_id):
+    response = SimpleNamespace(raw={"usage": {"prompt_tokens": 120, "completion_tokens": 30}})
+    handler.handle(FakeEnd(span_id=span_id, response=response))
+
+
+def test_full_map_evicts_the_oldest_span_only(handler):
+    with start_trace("request") as root:
+        for span_id in ("a", "b", "c"):
+            start(handler, span_id)
+
+    assert list(llm._pending) == ["b", "c"]
+    evicted = [s for s in root.trace.spans if s.name == "llm" and s.error]
+    assert len(evicted) == 1
+
+
+def test_llm_span_is_recorded_under_the_calling_stage(handler, monkeypatch):
+    finished = []
+    monkeypatch.setattr(tracing, "_span_listeners", [finished.append])
+
+    with start_trace("request"):
+        with span("agent") as stage:
+            start(handler, "call")
+            end(handler, "call")
+
+    (llm_span,) = [s for s in finished if s.name == "llm"]
+    assert llm_span.parent_id == stage.span_id
+    assert llm_span.attributes["prompt_tokens"] == 120
+    assert llm_span.duration is not None
+    assert not llm._pending
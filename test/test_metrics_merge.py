@@ -0,0 +1,34 @@
+from app.monitoring.metrics import Registry, merge_snapshots
+
+
+def worker_registry(requests: int, latency: float, inflight: int) -> Registry:
+    registry = Registry()
+    registry.counter("requests_total", "Requests", labelnames=("path",)).inc(requests, path="/chat")
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(latency)
+    registry.gauge("inflight", "Requests running").set(inflight)
+    return registry
+
+
+def test_counters_and_histograms_are_summed_gauges_labelled_per_worker():
+    merged = merge_snapshots([
+        ("101", worker_registry(3, 0.05, 2).snapshot(), True),
+        ("102", worker_registry(4, 0.5, 1).snapshot(), True),
+    ]).render()
+
+    assert 'requests_total{path="/chat"} 7.0' in merged
+    assert 'latency_seconds_bucket{le="0.1"} 1' in merged
+    assert 'latency_seconds_bucket{le="1.0"} 2' in merged
+    assert "latency_seconds_count 2" in merged
+    assert 'inflight{worker="101"} 2' in merged
+    assert 'inflight{worker="102"} 1' in merged
+
+
+def test_exited_workers_keep_their_counts_but_not_their_gauges():
+    merged = merge_snapshots([
+        ("101", worker_registry(3, 0.05, 2).snapshot(), False),
+        ("102", worker_registry(4, 0.5, 1).snapshot(), True),
+    ]).render()
+
+    assert 'requests_total{path="/chat"} 7.0' in merged
+    assert 'worker="101"' not in merged
+    assert 'inflight{worker="102"} 1' in merged
@@ -0,0 +1,62 @@
+import json
+import re
+from datetime import datetime
+
+import pytest
+import pytz
+
+from app.chatbot.prompts import assembly
+from app.chatbot.prompts.assembly import VolatileContext, prefix_fingerprint, render_user_message, static_system_prompt, tool_schemas
+from app.chatbot.service import build_tools
+
+DATE_OR_TIME = re.compile(r"\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}:\d{2}\b")
+
+TZ = pytz.timezone("Asia/Ho_Chi_Minh")
+MORNING = TZ.localize(datetime(2026, 10, 19, 8, 5))
+NEXT_EVENING = TZ.localize(datetime(2026, 10, 20, 21, 40))
+
+
+def cached_prefix(tools) -> bytes:
+    """What the provider caches ahead of the messages: tool schemas, then the system prompt"""
+    schemas = json.dumps(tool_schemas(tools), ensure_ascii=False, sort_keys=True)
+    return (schemas + "\n" + static_system_prompt()).encode("utf-8")
+
+
+def build_at(monkeypatch, now, chat_id, user_id, personal):
+    monkeypatch.setattr(assembly, "local_now", lambda: now)
+    static_system_prompt.cache_clear()
+    return cached_prefix(build_tools(chat_id=chat_id, user_id=user_id, personal=personal))
+
+
+@pytest.mark.parametrize("personal", [False, True])
+def test_prefix_is_byte_identical_across_users_sessions_and_time(monkeypatch, personal):
+    first = build_at(monkeypatch, MORNING, "session-a", "user-a", personal)
+    second = build_at(monkeypatch, NEXT_EVENING, "session-b", "user-b", personal)
+
+    assert first == second
+    assert not DATE_OR_TIME.search(first.decode("utf-8"))
+
+
+def test_fingerprint_depends_only_on_the_prefix():
+    tools = build_tools(chat_id="session-a", user_id="user-a", personal=True)
+    rebuilt = build_tools(chat_id="session-b", user_id="user-b", personal=True)
+
+    assert prefix_fingerprint(tools) == prefix_fingerprint(rebuilt)
+    assert prefix_fingerprint(tools) != prefix_fingerprint(tools[:-1])
+
+
+def test_volatile_message_carries_the_clock_and_ends_with_the_question():
+    question = "Cuối tuần này ở Đà Lạt có sự kiện gì?"
+    message = render_user_message(VolatileContext(
+        question=question,
+        conversation_summary="Khách đang lên kế hoạch đi Đà Lạt.",
+        history=["customer: xin chào"],
+        notes=["### Unavailable Tools:\ninternet_search"],
+        now=MORNING,
+    ))
+
+    assert "2026-10-19 08:05" in message
+    # Nothing request-specific may follow the question: only the answer cue
+    head, tail = message.split(question)
+    assert head.rstrip().endswith("### Customer Question:")
+    assert tail.strip().strip("-").strip() == "### Answer:"
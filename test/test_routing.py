@@ -0,0 +1,37 @@
+import pytest
+
+from app.chatbot.coalesce import needs_personal_context
+from app.chatbot.routing import FAQ, PERSONAL, RESEARCH, SMALL_TALK, classify
+
+
+@pytest.mark.parametrize("message, route, intent", [
+    ("xin chào", SMALL_TALK, "greeting"),
+    ("Ở Việt Nam có cần tip không?", FAQ, "tipping"),
+    ("Việt Nam dùng ổ cắm loại nào?", FAQ, "power plug"),
+    ("Đổi tiền ở đâu, có ATM không?", FAQ, "currency"),
+    # Tied to a place: the agent looks for local answers
+    ("tip ăn uống ở Hà Nội", RESEARCH, None),
+    ("ATM ở Hội An", RESEARCH, None),
+    ("Sim 4G mua ở Sài Gòn chỗ nào?", RESEARCH, None),
+    ("Visa tháng 12", RESEARCH, None),
+])
+def test_classify(message, route, intent):
+    decision = classify(message)
+
+    assert decision.route == route
+    assert decision.intent == intent
+
+
+@pytest.mark.parametrize("question, personal", [
+    ("lần trước bạn gợi ý tour gì", True),
+    ("lan truoc ban goi y tour gi", True),
+    ("Chuyến đi của tôi tháng sau", True),
+    ("chuyen di cua toi thang sau", True),
+    ("hom qua ban da noi gi ve Da Lat", True),
+    ("What did you suggest last time?", True),
+    ("tour da lat thang 12", False),
+    ("Hà Nội có gì vui?", False),
+])
+def test_personal_cues_match_with_or_without_diacritics(question, personal):
+    assert needs_personal_context(question) is personal
+    assert (classify(question).route == PERSONAL) is personal